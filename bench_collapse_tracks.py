@@ -0,0 +1,72 @@
+import io
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+from collapse_tracks import collapse_iso_paths, collapse_iso_tracks, CollapseStats
+from path_stream import write_paths
+from synthetic_library import iter_iso_library_paths
+
+def legacy_collapse(all_filenames):
+    """
+    The original per-line rsplit/isdigit loop from collapse_iso_tracks, without the I/O.
+    """
+    filenames = []
+    seen = set()
+    for filename in all_filenames:
+        if ';' in filename:
+            parts = filename.rsplit(';', 1)
+            if len(parts) == 2:
+                base_filename = parts[0]
+                suffix = parts[1]
+                if suffix.isdigit():
+                    if base_filename not in seen:
+                        filenames.append(base_filename)
+                        seen.add(base_filename)
+                else:
+                    filenames.append(filename)
+            else:
+                filenames.append(filename)
+        else:
+            filenames.append(filename)
+    return filenames
+
+def time_it(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:7.2f}s")
+    return result, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ISO/SACD track collapse stage.")
+    parser.add_argument("--entries", type=int, default=2_000_000, help="Number of library entries (default: 2000000).")
+    args = parser.parse_args()
+    
+    paths = list(iter_iso_library_paths(args.entries))
+    print(f"{len(paths)} entries")
+    
+    legacy, legacy_time = time_it("legacy loop", lambda: legacy_collapse(paths))
+    stats = CollapseStats()
+    current, current_time = time_it("collapse_iso_paths", lambda: list(collapse_iso_paths(paths, stats)))
+    if legacy != current:
+        print("ERROR: collapse results differ")
+    print(f"Collapsed {stats.collapsed} entries into {len(stats.tracks)} images; speedup {legacy_time / current_time:.2f}x")
+    
+    work_dir = tempfile.mkdtemp(prefix="fileslist_bench_")
+    try:
+        lib_json = os.path.join(work_dir, 'lib.json')
+        write_paths(paths, lib_json)
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            collapse_iso_tracks(lib_json, lib_json)
+            file_time = time.perf_counter() - start
+        print(f"{'collapse_iso_tracks (file)':<28} {file_time:7.2f}s  ({len(paths) / file_time:.0f} entries/s)")
+    finally:
+        shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import io
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+from compare_json import compare_json_files, compare_sorted_files
+from path_stream import write_paths
+from synthetic_library import iter_library_paths
+
+def measure(label, func):
+    """
+    Run func twice: once for wall time, once under tracemalloc for peak memory.
+    """
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    
+    print(f"{label:<22} {elapsed:8.2f}s  peak {peak / 2**20:8.1f} MB")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the merge-join comparison against the set-based comparison.")
+    parser.add_argument("--entries", type=int, default=1_000_000, help="Number of paths in each list (default: 1000000).")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="fileslist_bench_")
+    old_cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        print(f"Writing two lists of about {args.entries} paths...")
+        write_paths(iter_library_paths(args.entries, skip_every=50), 'lib.json')
+        write_paths(iter_library_paths(args.entries + 1000, skip_every=70), 'file_paths.json')
+        
+        set_time = measure("sets (compare_json)", lambda: compare_json_files('lib.json', 'file_paths.json'))
+        merge_time = measure("merge join (--merge)", lambda: compare_sorted_files('lib.json', 'file_paths.json', presorted=True))
+        print(f"Speedup: {set_time / merge_time:.2f}x")
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
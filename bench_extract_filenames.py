@@ -0,0 +1,60 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from extract_filenames import iter_library_items, ENGINES
+from synthetic_library import write_library_xml
+
+def legacy_filenames(xml_file):
+    """
+    The original extraction loop: 'start' and 'end' events, findall on every Item, root never cleared.
+    """
+    filenames = []
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        if event == 'end' and elem.tag == 'Item':
+            for field in elem.findall('Field'):
+                if field.get('Name') == 'Filename':
+                    if field.text:
+                        filenames.append(field.text)
+                    break
+            elem.clear()
+    return filenames
+
+def measure(label, func, size):
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    print(f"{label:<24} {elapsed:7.2f}s  {size / 2**20 / elapsed:7.1f} MB/s  peak {peak / 2**20:7.1f} MB  ({count} items)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure lib.xml extraction throughput on a generated library.")
+    parser.add_argument("--items", type=int, default=500_000, help="Number of Items in the generated lib.xml (default: 500000).")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="fileslist_bench_")
+    try:
+        xml_file = os.path.join(work_dir, 'lib.xml')
+        size = write_library_xml(xml_file, args.items)
+        print(f"Generated {xml_file}: {args.items} items, {size / 2**20:.1f} MB")
+        
+        # The legacy loop keeps the whole list; the new engines are only iterated
+        measure("legacy (start+end)", lambda: len(legacy_filenames(xml_file)), size)
+        for engine in ENGINES:
+            measure(engine, lambda: sum(1 for _ in iter_library_items(xml_file, engine=engine)), size)
+            measure(f"{engine} + 2 fields", lambda: sum(1 for _ in iter_library_items(
+                xml_file, ('Filename', 'File Size', 'Date Modified'), engine)), size)
+    finally:
+        shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
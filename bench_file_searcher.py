@@ -0,0 +1,72 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+from file_searcher import iter_file_paths, list_directory
+from scan_index import ScanIndex
+from synthetic_library import make_music_tree
+
+def legacy_file_paths(directory):
+    """
+    The original two-pass walk: os.walk, then os.listdir plus os.path.isfile on every entry.
+    """
+    directories = []
+    for root, _, files in os.walk(directory):
+        if files:
+            directories.append(root)
+    directories.sort()
+    
+    file_paths = []
+    for directory in directories:
+        files = sorted([f for f in os.listdir(directory)
+                       if os.path.isfile(os.path.join(directory, f))])
+        for file in files:
+            file_paths.append(os.path.join(directory, file))
+    return file_paths
+
+def time_it(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20} {elapsed:8.2f}s  ({len(result)} files)")
+    return result, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scandir scanner (sequential and parallel) against the original os.walk/listdir scan.")
+    parser.add_argument("--files", type=int, default=1_000_000, help="Number of files in the synthetic tree (default: 1000000).")
+    parser.add_argument("--workers", type=int, default=8, help="Thread count for the parallel scan (default: 8).")
+    parser.add_argument("--dir", help="Reuse or create the synthetic tree in this directory instead of a temporary one.")
+    args = parser.parse_args()
+    
+    root = args.dir or tempfile.mkdtemp(prefix="fileslist_bench_")
+    try:
+        if not os.listdir(root):
+            print(f"Creating {args.files} files under {root}...")
+            make_music_tree(root, args.files)
+        
+        legacy, legacy_time = time_it("os.walk + listdir", lambda: legacy_file_paths(root))
+        current, current_time = time_it("os.scandir", lambda: list(iter_file_paths(root)))
+        parallel, _ = time_it(f"os.scandir x{args.workers}", lambda: list(iter_file_paths(root, args.workers)))
+        
+        
+        # Directories touched in the last couple of seconds are never cached, so age the tree first
+        yesterday = time.time() - 86400
+        for dirpath, _, _ in os.walk(root):
+            os.utime(dirpath, (yesterday, yesterday))
+        index_file = os.path.join(tempfile.mkdtemp(prefix="fileslist_index_"), "index.sqlite")
+        for label in ["index (first run)", "index (rescan)"]:
+            with ScanIndex(index_file) as index:
+                indexed, _ = time_it(label, lambda: list(iter_file_paths(root, lister=index.lister(list_directory))))
+        shutil.rmtree(os.path.dirname(index_file))
+        
+        if legacy != current or legacy != parallel or legacy != indexed:
+            print("ERROR: scanners produced different output")
+        print(f"Speedup: {legacy_time / current_time:.2f}x")
+    finally:
+        if not args.dir:
+            shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import io
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+import json_backend
+from path_stream import write_paths, iter_paths, _iter_json_array
+from compare_json import compare_json_files
+from collapse_tracks import collapse_iso_tracks
+from synthetic_library import iter_library_paths, iter_iso_library_paths
+
+def timed(func):
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+def drain(iterable):
+    for _ in iterable:
+        pass
+
+def read_chunked(filename):
+    """
+    The reader before the line-based fast path: stdlib raw_decode over 64 KB chunks.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        drain(_iter_json_array(f))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark path list reading and writing with each installed JSON backend.")
+    parser.add_argument("--entries", type=int, default=1_000_000, help="Number of paths in each list (default: 1000000).")
+    args = parser.parse_args()
+
+    backends = json_backend.available()
+    print(f"Installed backends: {', '.join(backends)}")
+
+    work_dir = tempfile.mkdtemp(prefix="fileslist_bench_")
+    old_cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        print(f"Writing lists of about {args.entries} paths...")
+        write_paths(iter_library_paths(args.entries, skip_every=50, realistic=True), 'lib.json')
+        write_paths(iter_library_paths(args.entries + args.entries // 100, skip_every=70, realistic=True), 'file_paths.json')
+        write_paths(iter_iso_library_paths(args.entries, realistic=True), 'lib_iso.json')
+        paths = list(iter_paths('lib.json'))
+
+        print(f"{'':<10} {'write':>8} {'read':>8} {'ndjson':>8} {'compare':>8} {'collapse':>8}")
+        print(f"{'chunked':<10} {'':>8} {timed(lambda: read_chunked('lib.json')):7.2f}s")
+        results = {}
+        try:
+            for name in backends:
+                json_backend.use(name)
+                row = [
+                    timed(lambda: write_paths(paths, 'out.json')),
+                    timed(lambda: drain(iter_paths('lib.json'))),
+                    timed(lambda: write_paths(paths, 'out.ndjson') and drain(iter_paths('out.ndjson'))),
+                    timed(lambda: compare_json_files('lib.json', 'file_paths.json')),
+                    timed(lambda: collapse_iso_tracks('lib_iso.json', 'lib_collapsed.json')),
+                ]
+                results[name] = row
+                print(f"{name:<10} " + ' '.join(f"{seconds:7.2f}s" for seconds in row))
+        finally:
+            json_backend.use()
+
+        if len(results) > 1 and json_backend.STDLIB in results:
+            fastest = backends[0]
+            speedups = [base / seconds for base, seconds in zip(results[json_backend.STDLIB], results[fastest])]
+            print(f"{fastest} vs json: " + ' '.join(f"{speedup:7.2f}x" for speedup in speedups))
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
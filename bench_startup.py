@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from path_stream import write_paths
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MODULES = ('file_searcher', 'extract_filenames', 'collapse_tracks', 'compare_json', 'reconcile', 'snapshot')
+
+def timed_runs(args, runs, stdin=None):
+    """
+    Best wall time of runs executions of a command, in seconds.
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=os.getcwd(), input=stdin, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       check=True, text=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure interpreter plus import startup per tool, and what batch mode saves over one process per job.")
+    parser.add_argument("--jobs", type=int, default=50, help="Number of small compare jobs (default: 50).")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement; the best is kept (default: 5).")
+    args = parser.parse_args()
+
+    python = sys.executable
+    env_path = os.environ.get('PYTHONPATH')
+    os.environ['PYTHONPATH'] = HERE + (os.pathsep + env_path if env_path else '')
+
+    work_dir = tempfile.mkdtemp(prefix="fileslist_bench_")
+    old_cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        base = timed_runs([python, '-c', 'pass'], args.runs)
+        print(f"{'interpreter':<24} {base * 1000:7.1f} ms")
+        cli = timed_runs([python, os.path.join(HERE, 'fileslist.py'), '--help'], args.runs)
+        print(f"{'fileslist --help':<24} {cli * 1000:7.1f} ms  (+{(cli - base) * 1000:.1f} ms)")
+        for module in MODULES:
+            seconds = timed_runs([python, '-c', f'import {module}'], args.runs)
+            print(f"{'import ' + module:<24} {seconds * 1000:7.1f} ms  (+{(seconds - base) * 1000:.1f} ms)")
+
+        # Per-folder checks: many compares of tiny lists
+        for i in range(args.jobs):
+            write_paths([f'd:\\music\\{i}\\{n:02d}.flac' for n in range(10)], f'lib{i}.json')
+            write_paths([f'd:\\music\\{i}\\{n:02d}.flac' for n in range(1, 11)], f'disk{i}.json')
+        script = os.path.join(HERE, 'compare_json.py')
+        start = time.perf_counter()
+        for i in range(args.jobs):
+            subprocess.run([python, script, f'lib{i}.json', f'disk{i}.json'], stdout=subprocess.DEVNULL, check=True)
+        separate = time.perf_counter() - start
+
+        jobs = ''.join(f'compare lib{i}.json disk{i}.json\n' for i in range(args.jobs))
+        batch = timed_runs([python, os.path.join(HERE, 'fileslist.py'), 'batch'], 1, stdin=jobs)
+        print(f"{args.jobs} compares: {separate:.2f}s as separate processes, {batch:.2f}s in one batch "
+              f"({separate / batch:.1f}x faster, {(separate - batch) / args.jobs * 1000:.1f} ms saved per job)")
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+from file_searcher import search_files
+from extract_filenames import extract_filenames_to_json
+from collapse_tracks import collapse_iso_tracks
+from compare_json import compare_json_files
+from path_stream import write_paths
+from synthetic_library import make_music_tree, write_library_xml, iter_library_paths, iter_iso_library_paths
+
+DEFAULT_BASELINE = 'bench_baseline.json'
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+
+BENCHMARKS = ('search_files', 'extract_filenames', 'collapse_tracks', 'compare_json')
+
+# A result this much slower or bigger than its baseline is a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Differences smaller than this are noise, whatever the ratio
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 1.0
+
+def prepare(count, benchmarks):
+    """
+    Generate the synthetic inputs for the selected benchmarks in the current directory:
+    a music tree, lib.xml, an ISO track list and two path lists to compare, all with realistic names.
+    Returns {benchmark: function running it}.
+    """
+    jobs = {}
+    if 'search_files' in benchmarks:
+        make_music_tree('music', count, realistic=True)
+        jobs['search_files'] = lambda: search_files('music', 'file_paths_scan.json', quiet=True)
+    if 'extract_filenames' in benchmarks:
+        write_library_xml('lib.xml', count, realistic=True)
+        jobs['extract_filenames'] = lambda: extract_filenames_to_json('lib.xml', 'lib_extracted.json')
+    if 'collapse_tracks' in benchmarks:
+        write_paths(iter_iso_library_paths(count, realistic=True), 'lib_iso.json')
+        jobs['collapse_tracks'] = lambda: collapse_iso_tracks('lib_iso.json', 'lib_collapsed.json')
+    if 'compare_json' in benchmarks:
+        write_paths(iter_library_paths(count, skip_every=50, realistic=True), 'lib.json')
+        write_paths(iter_library_paths(count + count // 100, skip_every=70, realistic=True), 'file_paths.json')
+        jobs['compare_json'] = lambda: compare_json_files('lib.json', 'file_paths.json')
+    return jobs
+
+def measure(func, repeat=3):
+    """
+    Best wall time of repeat runs, then one more run under tracemalloc for the peak of Python allocations.
+    """
+    times = []
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {'seconds': round(min(times), 4), 'peak_mb': round(peak / 2**20, 2)}
+
+def find_regressions(name, result, baseline, tolerance):
+    """
+    Compare one result against its baseline entry. Returns a list of messages, empty if none regressed.
+    """
+    messages = []
+    for metric, floor, unit in [('seconds', MIN_SECONDS, 's'), ('peak_mb', MIN_PEAK_MB, ' MB')]:
+        old, new = baseline[metric], result[metric]
+        if new > old * (1 + tolerance) and new - old > floor:
+            messages.append(f"{name}: {metric} {old}{unit} -> {new}{unit} (+{(new / old - 1) * 100:.0f}%)")
+    return messages
+
+def load_baseline(filename):
+    if not os.path.exists(filename):
+        return {'results': {}}
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baseline(filename, baseline, results):
+    baseline['machine'] = {'python': platform.python_version(), 'platform': platform.platform(),
+                           'processor': platform.processor() or platform.machine()}
+    baseline['results'].update(results)
+    baseline['results'] = dict(sorted(baseline['results'].items()))
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile the main tools on synthetic libraries and check for regressions against stored baselines.")
+    parser.add_argument("--sizes", nargs='+', choices=SIZES, default=['10k', '100k'], help="Library sizes to run (default: 10k 100k). 1M creates a million files on disk.")
+    parser.add_argument("--benchmarks", nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS), help="Benchmarks to run (default: all).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark; the best one counts (default: 3).")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results file (default: %(default)s).")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run's results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown or memory growth before a result is a regression (default: 0.25 = 25%%).")
+    args = parser.parse_args()
+
+    baseline_file = os.path.abspath(args.baseline)
+    baseline = load_baseline(baseline_file)
+    results = {}
+    regressions = []
+    compared = 0
+
+    old_cwd = os.getcwd()
+    for size in args.sizes:
+        work_dir = tempfile.mkdtemp(prefix="fileslist_bench_")
+        os.chdir(work_dir)
+        try:
+            print(f"Generating {size} inputs in {work_dir}...")
+            jobs = prepare(SIZES[size], args.benchmarks)
+
+            for benchmark, func in jobs.items():
+                name = f"{benchmark}/{size}"
+                result = results[name] = measure(func, args.repeat)
+                line = f"{name:<24} {result['seconds']:8.3f}s  peak {result['peak_mb']:8.1f} MB"
+                previous = baseline['results'].get(name)
+                if previous:
+                    compared += 1
+                    line += f"  (baseline {previous['seconds']:.3f}s, {previous['peak_mb']:.1f} MB)"
+                    regressions += find_regressions(name, result, previous, args.tolerance)
+                print(line)
+        finally:
+            os.chdir(old_cwd)
+            shutil.rmtree(work_dir)
+
+    if args.update_baseline:
+        save_baseline(baseline_file, baseline, results)
+        print(f"Baseline saved to {baseline_file}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%}:")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+    elif compared:
+        print(f"\nNo regressions in {compared} results compared to the baseline.")
+
+if __name__ == '__main__':
+    main()
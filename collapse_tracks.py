@@ -1,131 +1,138 @@
-import json
+import os
 
-def collapse_iso_tracks_text(input_txt, output_txt):
+import json_backend
+from path_stream import iter_paths, write_paths, TEXT
+from external_sort import ExternalSorter
+from path_keys import split_iso_track, ISO_TRACK_SEPARATOR
+
+# ISOs listed individually on screen up to this many
+DISPLAY_LIMIT = 20
+
+class CollapseStats:
     """
-    Collapse ISO/SACD track entries (filename;1, filename;2, etc.) in a text file into single base filename.
+    Counters filled in by collapse_iso_paths, including the number of tracks seen for each ISO/SACD image.
+    """
+
+    def __init__(self):
+        self.original = 0
+        self.entries = 0
+        self.collapsed = 0
+        self.tracks = {}
+
+def collapse_iso_paths(paths, stats=None):
     """
-    filenames = []
-    seen = set()
-    original_count = 0
-    collapsed_count = 0
-    
-    print(f"Reading {input_txt}...")
-    
-    with open(input_txt, 'r', encoding='utf-8') as f:
-        for line in f:
-            filename = line.strip()
-            if not filename:
+    Collapse ISO/SACD track entries (filename;1, filename;2, etc.) into single base filename.
+    Works on any iterable of paths and yields the collapsed stream in input order; each image is
+    yielded once, at its first track. Only the image paths are remembered, not the whole list.
+    """
+    stats = stats if stats is not None else CollapseStats()
+    tracks = stats.tracks
+    original = entries = collapsed = 0
+
+    try:
+        for filename in paths:
+            original += 1
+
+            # Cheap containment test first: most entries are regular files
+            if ISO_TRACK_SEPARATOR not in filename:
+                entries += 1
+                yield filename
                 continue
-            
-            original_count += 1
-            
-            # Check if filename has semicolon followed by ONLY a number at the end (ISO/SACD track)
-            # Pattern: filename;123 (where 123 is digits only, nothing after)
-            if ';' in filename:
-                parts = filename.rsplit(';', 1)
-                if len(parts) == 2:
-                    base_filename = parts[0]
-                    suffix = parts[1]
-                    # Only collapse if suffix is digits only (ISO/SACD track number)
-                    if suffix.isdigit():
-                        # Only add if we haven't seen this base filename before
-                        if base_filename not in seen:
-                            filenames.append(base_filename)
-                            seen.add(base_filename)
-                        else:
-                            collapsed_count += 1
-                    else:
-                        # Semicolon but not followed by just digits - treat as regular filename
-                        filenames.append(filename)
-                else:
-                    # Multiple semicolons or other issue - treat as regular filename
-                    filenames.append(filename)
+
+            # ISO/SACD track entries look like filename;123 (digits only after the last semicolon)
+            base_filename, track = split_iso_track(filename)
+            if track is None:
+                # Semicolon but not a track number - regular filename, pass through as-is
+                entries += 1
+                yield filename
+            elif base_filename in tracks:
+                tracks[base_filename] += 1
+                collapsed += 1
             else:
-                # Regular filename, add as-is
-                filenames.append(filename)
-    
-    print(f"Original entries: {original_count}")
-    print(f"After collapsing: {len(filenames)}")
-    print(f"Collapsed {collapsed_count} ISO/SACD track entries")
-    
+                tracks[base_filename] = 1
+                entries += 1
+                yield base_filename
+    finally:
+        # Counted in locals to keep the per-entry loop cheap
+        stats.original += original
+        stats.entries += entries
+        stats.collapsed += collapsed
+
+def print_track_counts(stats, report_file=None):
+    """
+    Report how many track entries each ISO/SACD image collapsed into.
+    """
+    print(f"ISO/SACD images: {len(stats.tracks)}")
+    if stats.tracks and len(stats.tracks) <= DISPLAY_LIMIT:
+        for base_filename, count in sorted(stats.tracks.items(), key=lambda item: item[0].lower()):
+            print(f"  {count:4d} tracks: {base_filename}")
+
+    if report_file:
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write(json_backend.dumps(dict(sorted(stats.tracks.items()))) + '\n')
+        print(f"Track counts per image written to {report_file}")
+
+def collapse_iso_file(input_file, output_file, input_format=None, output_format=None, report_file=None):
+    """
+    Collapse ISO/SACD track entries from a path list file (JSON, NDJSON, CSV or text), or from a
+    scan of input_file if it is a directory, and write the result sorted alphabetically.
+    The output may be the input file.
+    """
+    stats = CollapseStats()
+    # Sorted on the way out; spills to temporary files if the list outgrows memory
+    filenames = ExternalSorter(key=str.lower)
+
+    if os.path.isdir(input_file):
+        from file_searcher import iter_file_paths
+        print(f"Scanning {input_file}...")
+        paths = iter_file_paths(os.path.abspath(input_file))
+    else:
+        print(f"Reading {input_file}...")
+        paths = iter_paths(input_file, input_format)
+
+    filenames.extend(collapse_iso_paths(paths, stats))
+
+    print(f"Original entries: {stats.original}")
+    print(f"After collapsing: {stats.entries}")
+    print(f"Collapsed {stats.collapsed} ISO/SACD track entries")
+    print_track_counts(stats, report_file)
+
     print("Sorting alphabetically...")
-    filenames.sort(key=str.lower)
-    
-    print(f"Writing to {output_txt}...")
-    
-    with open(output_txt, 'w', encoding='utf-8') as f:
-        for filename in filenames:
-            f.write(filename + '\n')
-    
-    print(f"Done! {len(filenames)} unique filenames written to {output_txt}")
+    sorted_filenames = filenames.sorted()
+
+    print(f"Writing to {output_file}...")
+
+    write_paths(sorted_filenames, output_file, output_format)
+
+    print(f"Done! {stats.entries} unique filenames written to {output_file}")
+    return stats
+
+def collapse_iso_tracks_text(input_txt, output_txt):
+    """
+    Collapse ISO/SACD track entries (filename;1, filename;2, etc.) in a text file into single base filename.
+    """
+    return collapse_iso_file(input_txt, output_txt, TEXT, TEXT)
 
 def collapse_iso_tracks(input_json, output_json):
     """
     Collapse ISO/SACD track entries (filename;1, filename;2, etc.) into single base filename.
     """
-    filenames = []
-    seen = set()
-    original_count = 0
-    collapsed_count = 0
-    
-    print(f"Reading {input_json}...")
-    
-    with open(input_json, 'r', encoding='utf-8') as f:
-        all_filenames = json.load(f)
-        
-        for filename in all_filenames:
-            original_count += 1
-            
-            # Check if filename has semicolon followed by ONLY a number at the end (ISO/SACD track)
-            # Pattern: filename;123 (where 123 is digits only, nothing after)
-            if ';' in filename:
-                parts = filename.rsplit(';', 1)
-                if len(parts) == 2:
-                    base_filename = parts[0]
-                    suffix = parts[1]
-                    # Only collapse if suffix is digits only (ISO/SACD track number)
-                    if suffix.isdigit():
-                        # Only add if we haven't seen this base filename before
-                        if base_filename not in seen:
-                            filenames.append(base_filename)
-                            seen.add(base_filename)
-                        else:
-                            collapsed_count += 1
-                    else:
-                        # Semicolon but not followed by just digits - treat as regular filename
-                        filenames.append(filename)
-                else:
-                    # Multiple semicolons or other issue - treat as regular filename
-                    filenames.append(filename)
-            else:
-                # Regular filename, add as-is
-                filenames.append(filename)
-    
-    print(f"Original entries: {original_count}")
-    print(f"After collapsing: {len(filenames)}")
-    print(f"Collapsed {collapsed_count} ISO/SACD track entries")
-    
-    print("Sorting alphabetically...")
-    filenames.sort(key=str.lower)
-    
-    print(f"Writing to {output_json}...")
-    
-    with open(output_json, 'w', encoding='utf-8') as f:
-        json.dump(filenames, f, ensure_ascii=False, indent=2)
-    
-    print(f"Done! {len(filenames)} unique filenames written to {output_json}")
+    return collapse_iso_file(input_json, output_json)
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Collapse ISO/SACD track entries (image.iso;1, image.iso;2, ...) into one entry per image.")
+    parser.add_argument("input", nargs='?', default="lib.json", help="Path list to collapse (.json, .ndjson, .csv, .fls or text) or a directory to scan (default: lib.json).")
+    parser.add_argument("output", nargs='?', help="Output file (default: overwrite the input; for a directory, its name plus .json in the current directory).")
+    parser.add_argument("--tracks-report", metavar="FILE", help="Write the number of tracks per ISO/SACD image to this JSON file.")
+
+    args = parser.parse_args(argv)
+
+    output = args.output or args.input
+    if not args.output and os.path.isdir(args.input):
+        output = (os.path.basename(os.path.abspath(args.input)) or 'file_paths') + '.json'
+    collapse_iso_file(args.input, output, report_file=args.tracks_report)
 
 if __name__ == '__main__':
-    import sys
-    
-    if len(sys.argv) > 1:
-        input_file = sys.argv[1]
-        output_file = sys.argv[2] if len(sys.argv) > 2 else input_file
-        
-        if input_file.endswith('.json'):
-            collapse_iso_tracks(input_file, output_file)
-        else:
-            collapse_iso_tracks_text(input_file, output_file)
-    else:
-        # Default: process lib.json
-        collapse_iso_tracks('lib.json', 'lib.json')
+    main()
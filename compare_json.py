@@ -1,100 +1,302 @@
-import json
+from path_stream import PathWriter, iter_paths, write_paths, TEXT, NDJSON
+from external_sort import external_sort, DEFAULT_MEMORY_LIMIT
+from operator import itemgetter
 
-def compare_json_files(file1, file2):
+from path_keys import path_keys, keyed_paths, compute_key
+from path_filter import ExtensionFilter, DEFAULT_EXCLUDED_EXTENSIONS, add_filter_arguments, filter_from_args
+
+# File types that are not part of the music library
+EXCLUDED_EXTENSIONS = DEFAULT_EXCLUDED_EXTENSIONS
+
+DEFAULT_FILTER = ExtensionFilter(EXCLUDED_EXTENSIONS)
+
+# Differences are listed on screen only up to this many entries
+DISPLAY_LIMIT = 20
+
+# With --metadata, modification times this many seconds apart still match (FAT and exFAT store them
+# with 2 second resolution). Defined here rather than in metadata_diff so the option needs no heavy import.
+DEFAULT_TIME_TOLERANCE = 2
+
+DEFAULT_HASH_CACHE = 'hash_cache.sqlite'
+
+CONTENT_MATCHES_FILE = 'content_matches.ndjson'
+
+def should_exclude_file(filename):
+    """Check if filename should be excluded (case-insensitive)."""
+    return not DEFAULT_FILTER.accepts(filename)
+
+def only_in_filename(filename):
+    return f"only_in_{filename.replace('.json', '')}.txt"
+
+def filter_excluded(paths, stats, path_filter=None):
     """
-    Compare two JSON files containing arrays of filenames.
-    Shows what's in file1 but not in file2, and vice versa.
+    Drop excluded file types from a stream of paths, counting kept and filtered entries in stats.
+    path_filter is an ExtensionFilter (default: the EXCLUDED_EXTENSIONS).
     """
-    print(f"Loading {file1}...")
-    with open(file1, 'r', encoding='utf-8') as f:
-        data1 = json.load(f)
-    
-    print(f"Loading {file2}...")
-    with open(file2, 'r', encoding='utf-8') as f:
-        data2 = json.load(f)
-    
-    # Filter out excluded file types
-    excluded_extensions = [
-        '.jpg', '.jpeg', '.log', '.txt', '.png', '.cue',
-        '.m3u', '.tif', '.bmp', '.md5', '.sfv', '.ffp',
-        '.pdf', '.m3u8', '.accurip', '.inf', '.exe', '.qdat', '.diz', '.mov', '.dir', '.ons'
-    ]
-    
-    def should_exclude_file(filename):
-        """Check if filename should be excluded (case-insensitive)."""
-        filename_lower = filename.lower()
-        return any(filename_lower.endswith(ext) for ext in excluded_extensions)
-    
-    print(f"Filtering out {len(excluded_extensions)} file types: {', '.join(excluded_extensions)}...")
-    original_count1 = len(data1)
-    original_count2 = len(data2)
-    data1 = [p for p in data1 if not should_exclude_file(p)]
-    data2 = [p for p in data2 if not should_exclude_file(p)]
-    filtered_count1 = original_count1 - len(data1)
-    filtered_count2 = original_count2 - len(data2)
-    print(f"Filtered out {filtered_count1} files from {file1}")
-    print(f"Filtered out {filtered_count2} files from {file2}")
-    
-    # Normalize paths for comparison (lowercase, standard separators)
-    print("Normalizing paths for comparison...")
-    import os
-    
-    def normalize_path(p):
-        return os.path.normpath(p).lower()
-        
-    set1 = {normalize_path(p) for p in data1}
-    set2 = {normalize_path(p) for p in data2}
-    
-    # Find differences
-    only_in_file1 = set1 - set2
-    only_in_file2 = set2 - set1
-    common = set1 & set2
-    
+    accepts = (DEFAULT_FILTER if path_filter is None else path_filter).accepts
+    for p in paths:
+        if not accepts(p):
+            stats['filtered'] += 1
+            continue
+        stats['kept'] += 1
+        yield p
+
+def iter_keyed(filename, stats, path_filter=None):
+    """
+    Stream (key, path) pairs of a path list (see path_keys.compute_key), skipping excluded files,
+    so differences can be found by key and written as the original paths.
+    Counts of kept and filtered entries are accumulated in stats.
+    """
+    return keyed_paths(filter_excluded(iter_paths(filename), stats, path_filter))
+
+# Key of a (key, path) pair; external_sort hands pairs back as lists, which this also takes
+pair_key = itemgetter(0)
+pair_path = itemgetter(1)
+
+def merge_join(keys1, keys2, key=None):
+    """
+    Walk two sorted streams of keys in one pass.
+    Yields (1, key) for keys only in keys1, (2, key) for keys only in keys2 and (0, key) for common keys.
+    Repeated keys are reported once. Raises ValueError if either stream is out of order.
+    With key (e.g. pair_key for (key, path) pairs), items are compared by key(item) and yielded
+    whole; the first item of a repeated key is the one kept.
+    """
+    def deduplicated(items, side):
+        previous = None
+        for item in items:
+            current = item if key is None else key(item)
+            if previous is not None and current <= previous:
+                if current == previous:
+                    continue
+                raise ValueError(f"Input {side} is not sorted: '{current}' comes after '{previous}'")
+            previous = current
+            yield current, item
+
+    iter1 = deduplicated(keys1, 1)
+    iter2 = deduplicated(keys2, 2)
+    entry1 = next(iter1, None)
+    entry2 = next(iter2, None)
+
+    while entry1 is not None and entry2 is not None:
+        if entry1[0] == entry2[0]:
+            yield 0, entry1[1]
+            entry1 = next(iter1, None)
+            entry2 = next(iter2, None)
+        elif entry1[0] < entry2[0]:
+            yield 1, entry1[1]
+            entry1 = next(iter1, None)
+        else:
+            yield 2, entry2[1]
+            entry2 = next(iter2, None)
+
+    while entry1 is not None:
+        yield 1, entry1[1]
+        entry1 = next(iter1, None)
+    while entry2 is not None:
+        yield 2, entry2[1]
+        entry2 = next(iter2, None)
+
+def write_merge_results(joined, output_file1, output_file2, path=None):
+    """
+    Consume merge_join output, streaming keys found on one side only to output_file1 / output_file2.
+    A file is only created if it gets entries. Returns (counts, previews, saved): counts indexed
+    by side (0 = common), the first DISPLAY_LIMIT keys of each side, and the files written per side.
+    With path (e.g. pair_path), path(item) is written and previewed instead of the item.
+    """
+    counts = [0, 0, 0]
+    previews = {1: [], 2: []}
+    output_files = {1: output_file1, 2: output_file2}
+    writers = {}
+
+    try:
+        for side, item in joined:
+            counts[side] += 1
+            if side == 0:
+                continue
+            if path is not None:
+                item = path(item)
+            if side not in writers:
+                writers[side] = PathWriter(output_files[side], TEXT)
+            writers[side].write(item)
+            if len(previews[side]) < DISPLAY_LIMIT:
+                previews[side].append(item)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return counts, previews, {side: writer.filename for side, writer in writers.items()}
+
+def print_results(file1, file2, count1, count2, common_count, only_count1, only_count2, preview1, preview2):
     print(f"\n{'='*80}")
     print(f"COMPARISON RESULTS")
     print(f"{'='*80}")
-    print(f"\nTotal entries in {file1} (after filtering): {len(data1)}")
-    print(f"Total entries in {file2} (after filtering): {len(data2)}")
-    print(f"Common entries: {len(common)}")
-    print(f"Only in {file1}: {len(only_in_file1)}")
-    print(f"Only in {file2}: {len(only_in_file2)}")
-    
-    if only_in_file1:
-        print(f"\n{'='*80}")
-        print(f"ENTRIES ONLY IN {file1} (missing from {file2}): {len(only_in_file1)} entries")
-        print(f"{'='*80}")
-        if len(only_in_file1) <= 20:
-            sorted_only_1 = sorted(only_in_file1, key=str.lower)
-            for i, entry in enumerate(sorted_only_1, 1):
-                print(f"{i}. {entry}")
-        else:
-            print(f"(Too many to display, saving to file...)")
-    
-    if only_in_file2:
-        print(f"\n{'='*80}")
-        print(f"ENTRIES ONLY IN {file2} (missing from {file1}): {len(only_in_file2)} entries")
-        print(f"{'='*80}")
-        if len(only_in_file2) <= 20:
-            sorted_only_2 = sorted(only_in_file2, key=str.lower)
-            for i, entry in enumerate(sorted_only_2, 1):
-                print(f"{i}. {entry}")
-        else:
-            print(f"(Too many to display, saving to file...)")
-    
-    # Save differences to files
+    print(f"\nTotal entries in {file1} (after filtering): {count1}")
+    print(f"Total entries in {file2} (after filtering): {count2}")
+    print(f"Common entries: {common_count}")
+    print(f"Only in {file1}: {only_count1}")
+    print(f"Only in {file2}: {only_count2}")
+
+    for first, second, only_count, preview in [(file1, file2, only_count1, preview1),
+                                               (file2, file1, only_count2, preview2)]:
+        if only_count:
+            print(f"\n{'='*80}")
+            print(f"ENTRIES ONLY IN {first} (missing from {second}): {only_count} entries")
+            print(f"{'='*80}")
+            if only_count <= DISPLAY_LIMIT:
+                for i, entry in enumerate(preview, 1):
+                    print(f"{i}. {entry}")
+            else:
+                print(f"(Too many to display, saving to file...)")
+
+def match_content(file1, file2, only_keys1, only_keys2, hash_cache=DEFAULT_HASH_CACHE, workers=None):
+    """
+    Match the entries found on only one side by file content, to spot moved/renamed and duplicate files.
+    Hashes are kept in hash_cache so files are not re-read on every run; see content_hash.
+    Matches are written to content_matches.ndjson.
+    """
+    from content_hash import HashCache, find_content_matches
+
+    print(f"\nMatching {len(only_keys1) + len(only_keys2)} unmatched entries by content...")
+    paths1 = [p for p in iter_paths(file1) if compute_key(p) in only_keys1]
+    paths2 = [p for p in iter_paths(file2) if compute_key(p) in only_keys2]
+
+    moved = 0
+    duplicates = 0
+    with HashCache(hash_cache) as cache, PathWriter(CONTENT_MATCHES_FILE, NDJSON) as writer:
+        for match in find_content_matches(paths1, paths2, cache, workers):
+            if match['paths1'] and match['paths2']:
+                match['match'] = 'moved'
+                moved += 1
+                if moved <= DISPLAY_LIMIT:
+                    print(f"Moved: {match['paths1'][0]} -> {match['paths2'][0]}")
+            else:
+                match['match'] = 'duplicate'
+                duplicates += 1
+            writer.write(match)
+        hits = cache.hits
+
+    print(f"Found {moved} moved and {duplicates} duplicate file groups ({hits} hash cache hits)")
+    print(f"Saved content matches to: {CONTENT_MATCHES_FILE}")
+
+def compare_json_files(file1, file2, content=False, hash_cache=DEFAULT_HASH_CACHE, hash_workers=None,
+                       path_filter=None):
+    """
+    Compare two JSON files containing arrays of filenames.
+    Shows what's in file1 but not in file2, and vice versa.
+    With content, entries only on one side are also matched by file content (see match_content).
+    path_filter (an ExtensionFilter) replaces the default EXCLUDED_EXTENSIONS filter.
+    """
+    path_filter = DEFAULT_FILTER if path_filter is None else path_filter
+    print(f"{path_filter.describe().capitalize()}...")
+    stats1 = {'kept': 0, 'filtered': 0}
+    stats2 = {'kept': 0, 'filtered': 0}
+    # {key: first original path}, so differences are reported as paths that can be used as such
+    print(f"Loading and normalizing {file1}...")
+    paths1 = {}
+    for key, path in iter_keyed(file1, stats1, path_filter):
+        paths1.setdefault(key, path)
+    print(f"Loading and normalizing {file2}...")
+    paths2 = {}
+    for key, path in iter_keyed(file2, stats2, path_filter):
+        paths2.setdefault(key, path)
+    print(f"Filtered out {stats1['filtered']} files from {file1}")
+    print(f"Filtered out {stats2['filtered']} files from {file2}")
+
+    # Find differences
+    only_in_file1 = paths1.keys() - paths2.keys()
+    only_in_file2 = paths2.keys() - paths1.keys()
+    common = paths1.keys() & paths2.keys()
+
+    preview1 = [paths1[key] for key in sorted(only_in_file1)] if len(only_in_file1) <= DISPLAY_LIMIT else []
+    preview2 = [paths2[key] for key in sorted(only_in_file2)] if len(only_in_file2) <= DISPLAY_LIMIT else []
+    print_results(file1, file2, stats1['kept'], stats2['kept'], len(common),
+                   len(only_in_file1), len(only_in_file2), preview1, preview2)
+
+    # Save differences to files, in key order like the merge mode
     if only_in_file1:
-        output_file = f"only_in_{file1.replace('.json', '')}.txt"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for entry in sorted(only_in_file1, key=str.lower):
-                f.write(entry + '\n')
+        output_file = only_in_filename(file1)
+        write_paths((paths1[key] for key in external_sort(only_in_file1)), output_file, TEXT)
         print(f"\nSaved entries only in {file1} to: {output_file}")
-    
+
     if only_in_file2:
-        output_file = f"only_in_{file2.replace('.json', '')}.txt"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for entry in sorted(only_in_file2, key=str.lower):
-                f.write(entry + '\n')
+        output_file = only_in_filename(file2)
+        write_paths((paths2[key] for key in external_sort(only_in_file2)), output_file, TEXT)
         print(f"Saved entries only in {file2} to: {output_file}")
 
+    if content and (only_in_file1 or only_in_file2):
+        match_content(file1, file2, only_in_file1, only_in_file2, hash_cache, hash_workers)
+
+def compare_sorted_files(file1, file2, presorted=True, memory_limit=DEFAULT_MEMORY_LIMIT,
+                         content=False, hash_cache=DEFAULT_HASH_CACHE, hash_workers=None, path_filter=None):
+    """
+    Compare two path lists in a single merge pass over their normalized paths.
+    With presorted, both inputs must already be sorted by normalized path; otherwise each side
+    is first put through an external sort limited to memory_limit bytes.
+    Memory use does not depend on the size of the inputs: differences are streamed straight
+    to the only_in_*.txt files. Produces the same results as compare_json_files.
+    With content, the differences are then matched by file content (see match_content).
+    """
+    path_filter = DEFAULT_FILTER if path_filter is None else path_filter
+    print(f"{path_filter.describe().capitalize()}...")
+    stats1 = {'kept': 0, 'filtered': 0}
+    stats2 = {'kept': 0, 'filtered': 0}
+    pairs1 = iter_keyed(file1, stats1, path_filter)
+    pairs2 = iter_keyed(file2, stats2, path_filter)
+    if not presorted:
+        # Stable, so the first path of a repeated key stays first, as in compare_json_files
+        print(f"Sorting {file1}...")
+        pairs1 = external_sort(pairs1, key=pair_key, memory_limit=memory_limit)
+        print(f"Sorting {file2}...")
+        pairs2 = external_sort(pairs2, key=pair_key, memory_limit=memory_limit)
+    print(f"Merging {file1} and {file2}...")
+    counts, previews, saved = write_merge_results(merge_join(pairs1, pairs2, key=pair_key),
+                                                  only_in_filename(file1), only_in_filename(file2), pair_path)
+
+    print(f"Filtered out {stats1['filtered']} files from {file1}")
+    print(f"Filtered out {stats2['filtered']} files from {file2}")
+    print_results(file1, file2, stats1['kept'], stats2['kept'], counts[0],
+                   counts[1], counts[2], previews[1], previews[2])
+
+    if 1 in saved:
+        print(f"\nSaved entries only in {file1} to: {saved[1]}")
+    if 2 in saved:
+        print(f"Saved entries only in {file2} to: {saved[2]}")
+
+    if content and saved:
+        # Only the differences are loaded back, never the full lists
+        only_keys1 = set(path_keys(iter_paths(saved[1]))) if 1 in saved else set()
+        only_keys2 = set(path_keys(iter_paths(saved[2]))) if 2 in saved else set()
+        match_content(file1, file2, only_keys1, only_keys2, hash_cache, hash_workers)
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare two path lists and save the entries found in only one of them.")
+    parser.add_argument("file1", nargs='?', default="lib.json", help="First path list (default: lib.json).")
+    parser.add_argument("file2", nargs='?', default="file_paths.json", help="Second path list (default: file_paths.json).")
+    parser.add_argument("--merge", action="store_true", help="Compare in one streaming merge pass with bounded memory; inputs are sorted externally first unless --presorted.")
+    parser.add_argument("--presorted", action="store_true", help="With --merge: both inputs are already sorted by normalized path.")
+    parser.add_argument("--match-content", action="store_true", help="Match entries found on only one side by file content (size, partial hash, full hash) to find moved and duplicate files.")
+    parser.add_argument("--hash-cache", default=DEFAULT_HASH_CACHE, help="SQLite cache of file hashes for --match-content (default: %(default)s).")
+    parser.add_argument("--hash-workers", type=int, help="Processes hashing files for --match-content (default: CPU count).")
+    parser.add_argument("--memory-limit", type=int, default=DEFAULT_MEMORY_LIMIT // 2**20, help="Memory budget in MB for each in-memory sort run (default: %(default)s).")
+    parser.add_argument("--metadata", action="store_true", help="Compare sizes and modification times instead: file1 is lib.xml or an extract_filenames.py --metadata list, file2 a directory to scan or a snapshot written with --stat.")
+    parser.add_argument("--time-tolerance", type=int, default=DEFAULT_TIME_TOLERANCE, help="With --metadata: seconds modification times may differ by (default: %(default)s).")
+    add_filter_arguments(parser, EXCLUDED_EXTENSIONS)
+
+    args = parser.parse_args(argv)
+    path_filter = filter_from_args(args, EXCLUDED_EXTENSIONS)
+
+    if args.metadata:
+        from metadata_diff import compare_metadata
+        compare_metadata(args.file1, args.file2, memory_limit=args.memory_limit * 2**20,
+                         time_tolerance=args.time_tolerance, path_filter=path_filter)
+    elif args.merge:
+        compare_sorted_files(args.file1, args.file2, args.presorted, args.memory_limit * 2**20,
+                             args.match_content, args.hash_cache, args.hash_workers, path_filter)
+    else:
+        compare_json_files(args.file1, args.file2, args.match_content, args.hash_cache, args.hash_workers,
+                           path_filter)
+
 if __name__ == '__main__':
-    compare_json_files('lib.json', 'file_paths.json')
+    main()
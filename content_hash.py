@@ -0,0 +1,255 @@
+import os
+import sqlite3
+import hashlib
+
+# Bytes hashed from the start and from the end of a file for the partial hash
+PARTIAL_BLOCK = 64 * 1024
+
+HASH_CHUNK = 1 << 20
+
+DIGEST_SIZE = 16
+
+def partial_hash(path, size):
+    """
+    Hash of the first and last PARTIAL_BLOCK bytes: cheap, and enough to tell most same-size files apart.
+    """
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, 'rb') as f:
+        digest.update(f.read(PARTIAL_BLOCK))
+        if size > 2 * PARTIAL_BLOCK:
+            f.seek(-PARTIAL_BLOCK, os.SEEK_END)
+        digest.update(f.read(PARTIAL_BLOCK))
+    return digest.hexdigest()
+
+def full_hash(path):
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _hash_job(job):
+    # Runs in a worker process; unreadable files come back without a hash
+    kind, path, size = job
+    try:
+        if kind == 'partial':
+            return path, partial_hash(path, size)
+        return path, full_hash(path)
+    except OSError:
+        return path, None
+
+class HashCache:
+    """
+    Persistent SQLite cache of file hashes keyed by (path, size, mtime_ns).
+    The last known hashes of a path stay available after the file is moved away,
+    which is what lets a move be matched without the old file.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.hits = 0
+        self._db = sqlite3.connect(filename)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, partial TEXT, full TEXT)"
+        )
+
+    def get(self, path):
+        """
+        Return (size, mtime_ns, partial, full) last recorded for path, or None.
+        """
+        return self._db.execute(
+            "SELECT size, mtime_ns, partial, full FROM hashes WHERE path = ?", (path,)
+        ).fetchone()
+
+    def put(self, path, size, mtime_ns, partial=None, full=None):
+        self._db.execute(
+            "INSERT OR REPLACE INTO hashes (path, size, mtime_ns, partial, full) VALUES (?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, partial, full),
+        )
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class Fingerprint:
+    """
+    What is known about one file's content: its size and, when needed, partial and full hashes.
+    exists is False for files that are gone and are only known from the hash cache.
+    """
+    __slots__ = ('path', 'size', 'mtime_ns', 'partial', 'full', 'exists')
+
+    def __init__(self, path, size, mtime_ns, partial=None, full=None, exists=True):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.partial = partial
+        self.full = full
+        self.exists = exists
+
+def _run_jobs(jobs, workers):
+    if not jobs:
+        return {}
+    if workers <= 1:
+        return dict(map(_hash_job, jobs))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(_hash_job, jobs, chunksize=16))
+
+def fingerprint_files(paths, cache=None, workers=None):
+    """
+    Fingerprint paths just enough to find identical content: size first, then a partial hash
+    for files sharing a size, then a full hash for files sharing the partial hash.
+    Hashes come from cache when (path, size, mtime) is unchanged; new ones are computed in a
+    process pool and stored. Returns {path: Fingerprint}; files that are missing and uncached are left out.
+    """
+    workers = workers or os.cpu_count() or 1
+    fingerprints = {}
+
+    for path in paths:
+        cached = cache.get(path) if cache else None
+        try:
+            st = os.stat(path)
+        except OSError:
+            if cached:
+                cache.hits += 1
+                fingerprints[path] = Fingerprint(path, cached[0], cached[1], cached[2], cached[3], exists=False)
+            continue
+        fingerprint = Fingerprint(path, st.st_size, st.st_mtime_ns)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            cache.hits += 1
+            fingerprint.partial, fingerprint.full = cached[2], cached[3]
+        fingerprints[path] = fingerprint
+
+    def collisions(key):
+        groups = {}
+        for fingerprint in fingerprints.values():
+            group_key = key(fingerprint)
+            if group_key is not None:
+                groups.setdefault(group_key, []).append(fingerprint)
+        return [group for group in groups.values() if len(group) > 1]
+
+    # Partial hashes only for files that share a size with another file
+    jobs = [('partial', f.path, f.size)
+            for group in collisions(lambda f: f.size) for f in group if f.partial is None and f.exists]
+    for path, digest in _run_jobs(jobs, workers).items():
+        fingerprints[path].partial = digest
+
+    # Full hashes only for files that share size and partial hash with another file that has or can get
+    # one: a gone file known only by its cached partial hash can't confirm anything
+    jobs = [('full', f.path, f.size)
+            for group in collisions(lambda f: (f.size, f.partial) if f.partial else None)
+            if sum(1 for f in group if f.exists or f.full) > 1
+            for f in group if f.full is None and f.exists]
+    for path, digest in _run_jobs(jobs, workers).items():
+        fingerprints[path].full = digest
+
+    if cache:
+        for f in fingerprints.values():
+            if f.exists:
+                cache.put(f.path, f.size, f.mtime_ns, f.partial, f.full)
+
+    return fingerprints
+
+def find_content_matches(paths1, paths2, cache=None, workers=None):
+    """
+    Find files with identical content among two path collections (for example the entries found
+    only on one side of a path comparison). Yields dicts with the matching 'paths1' and 'paths2',
+    the 'size', and 'verified' (False when a gone file had no full hash cached, so only size and
+    partial hash matched). A group with paths on both sides is a move; on one side, a duplicate.
+    Files with full hashes are split by them first; a file with only a partial hash is matched,
+    unverified, with each of those groups, so files known to differ are never reported together.
+    """
+    sides = {path: 1 for path in paths1}
+    for path in paths2:
+        sides[path] = 2 if sides.get(path, 2) == 2 else 0
+    fingerprints = fingerprint_files(sides, cache, workers)
+
+    by_partial = {}
+    for f in fingerprints.values():
+        if f.partial:
+            by_partial.setdefault((f.size, f.partial), []).append(f)
+
+    for (size, _), group in sorted(by_partial.items()):
+        if len(group) < 2:
+            continue
+        subgroups = {}
+        unhashed = []
+        for f in group:
+            if f.full:
+                subgroups.setdefault(f.full, []).append(f)
+            else:
+                unhashed.append(f)
+        verified = not unhashed
+        if verified:
+            groups = [g for g in subgroups.values() if len(g) > 1]
+        elif subgroups:
+            groups = [g + unhashed for g in subgroups.values()]
+        else:
+            groups = [unhashed]
+
+        for g in groups:
+            yield {
+                'paths1': sorted(f.path for f in g if sides[f.path] in (0, 1)),
+                'paths2': sorted(f.path for f in g if sides[f.path] in (0, 2)),
+                'size': size,
+                'verified': verified,
+            }
+
+def hash_files(paths, cache, workers=None, full=False):
+    """
+    Record the partial (or full) hash of every file in paths that the cache doesn't have yet,
+    so it can still be matched after it is moved. Returns the number of files hashed.
+    """
+    workers = workers or os.cpu_count() or 1
+    pending = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        fingerprint = Fingerprint(path, st.st_size, st.st_mtime_ns)
+        cached = cache.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            fingerprint.partial, fingerprint.full = cached[2], cached[3]
+        if fingerprint.full if full else fingerprint.partial:
+            continue
+        pending[path] = fingerprint
+
+    jobs = [('full' if full else 'partial', f.path, f.size) for f in pending.values()]
+    for path, digest in _run_jobs(jobs, workers).items():
+        if digest is None:
+            continue
+        f = pending[path]
+        if full:
+            f.full = digest
+        else:
+            f.partial = digest
+        cache.put(f.path, f.size, f.mtime_ns, f.partial, f.full)
+    return len(jobs)
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record content hashes for a path list, so later compares can match moved files.")
+    parser.add_argument("input", help="Path list (.json, .ndjson, .csv, .fls or text).")
+    parser.add_argument("--hash-cache", default="hash_cache.sqlite", help="SQLite hash cache (default: hash_cache.sqlite).")
+    parser.add_argument("--workers", type=int, help="Hashing processes (default: CPU count).")
+    parser.add_argument("--full", action="store_true", help="Compute full hashes instead of partial ones.")
+
+    args = parser.parse_args(argv)
+
+    from path_stream import iter_paths
+
+    with HashCache(args.hash_cache) as cache:
+        hashed = hash_files(iter_paths(args.input), cache, args.workers, args.full)
+    print(f"Hashed {hashed} files into {args.hash_cache}")
+
+if __name__ == '__main__':
+    main()
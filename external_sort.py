@@ -0,0 +1,136 @@
+import os
+import sys
+import heapq
+
+import json_backend
+
+# Default memory budget for the in-memory part of a sort
+DEFAULT_MEMORY_LIMIT = 256 * 2**20
+
+# Most runs merged at once, to stay well below the open file limit
+MAX_MERGE_FAN_IN = 128
+
+# Size of a list slot holding the item
+POINTER_SIZE = 8
+
+def estimate_size(item):
+    """
+    Rough memory footprint of a buffered item: strings, numbers and flat tuples/lists/dicts of them.
+    """
+    size = sys.getsizeof(item) + POINTER_SIZE
+    if isinstance(item, (tuple, list)):
+        size += sum(sys.getsizeof(value) for value in item)
+    elif isinstance(item, dict):
+        size += sum(sys.getsizeof(value) for value in item.values())
+    return size
+
+class ExternalSorter:
+    """
+    Collect items and return them sorted, spilling sorted runs to temporary files whenever
+    the buffered items exceed memory_limit bytes. The runs are k-way merged when read back.
+    Items must be JSON-serializable; tuples come back as lists. Sorting is stable, so the
+    result is the same as list.sort(key=key).
+    """
+
+    def __init__(self, key=None, memory_limit=DEFAULT_MEMORY_LIMIT, tmp_dir=None):
+        self.key = key
+        self.memory_limit = memory_limit
+        self.tmp_dir = tmp_dir
+        self.count = 0
+        self._buffer = []
+        self._buffer_size = 0
+        self._runs = []
+        self._run_dir = None
+        self._run_counter = 0
+
+    def add(self, item):
+        self._buffer.append(item)
+        self._buffer_size += estimate_size(item)
+        self.count += 1
+        if self._buffer_size >= self.memory_limit:
+            self._spill()
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def spilled_runs(self):
+        return len(self._runs)
+
+    def _new_run_file(self):
+        if self._run_dir is None:
+            import tempfile
+            self._run_dir = tempfile.mkdtemp(prefix='fileslist_sort_', dir=self.tmp_dir)
+        self._run_counter += 1
+        return os.path.join(self._run_dir, f"run{self._run_counter:06d}.ndjson")
+
+    def _write_run(self, items):
+        filename = self._new_run_file()
+        dumps = json_backend.encoder()
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.writelines(dumps(item) + '\n' for item in items)
+        self._runs.append(filename)
+
+    def _spill(self):
+        self._buffer.sort(key=self.key)
+        self._write_run(self._buffer)
+        self._buffer = []
+        self._buffer_size = 0
+
+    def sorted(self):
+        """
+        Finish collecting and return an iterator over all items in sorted order.
+        Temporary files are removed once the iterator is exhausted or closed.
+        """
+        if not self._runs:
+            self._buffer.sort(key=self.key)
+            buffer, self._buffer = self._buffer, []
+            return iter(buffer)
+
+        if self._buffer:
+            self._spill()
+
+        # Merge in passes while there are too many runs to open at once
+        while len(self._runs) > MAX_MERGE_FAN_IN:
+            runs, self._runs = self._runs, []
+            for start in range(0, len(runs), MAX_MERGE_FAN_IN):
+                group = runs[start:start + MAX_MERGE_FAN_IN]
+                self._write_run(self._merge_runs(group))
+                for filename in group:
+                    os.remove(filename)
+
+        return self._iter_merged()
+
+    def _merge_runs(self, filenames):
+        files = [open(filename, 'r', encoding='utf-8') for filename in filenames]
+        try:
+            yield from heapq.merge(*[map(json_backend.decoder(), f) for f in files], key=self.key)
+        finally:
+            for f in files:
+                f.close()
+
+    def _iter_merged(self):
+        try:
+            yield from self._merge_runs(self._runs)
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        if self._run_dir is not None:
+            import shutil
+            shutil.rmtree(self._run_dir, ignore_errors=True)
+            self._run_dir = None
+            self._runs = []
+
+def external_sort(items, key=None, memory_limit=DEFAULT_MEMORY_LIMIT, tmp_dir=None):
+    """
+    Sort an iterable that may be larger than memory. The input is consumed immediately;
+    the returned iterator yields the items in sorted order.
+    """
+    sorter = ExternalSorter(key, memory_limit, tmp_dir)
+    sorter.extend(items)
+    return sorter.sorted()
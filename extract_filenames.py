@@ -1,51 +1,228 @@
-import xml.etree.ElementTree as ET
-import json
+from xml.parsers import expat
 
-def extract_filenames_to_json(xml_file, json_file):
+from path_stream import write_paths, detect_format, JSON, NDJSON
+from external_sort import ExternalSorter
+
+ITERPARSE = 'iterparse'
+EXPAT = 'expat'
+ENGINES = (ITERPARSE, EXPAT)
+
+FILENAME_FIELD = 'Filename'
+FILE_SIZE_FIELD = 'File Size'
+DATE_MODIFIED_FIELD = 'Date Modified'
+
+# Fields every LibraryRecord has
+RECORD_FIELDS = (FILENAME_FIELD, FILE_SIZE_FIELD, DATE_MODIFIED_FIELD)
+
+CHUNK_SIZE = 1 << 20
+
+def iter_library_items(xml_file, fields=(FILENAME_FIELD,), engine=ITERPARSE):
+    """
+    Stream the requested fields of every Item in a JRiver lib.xml.
+    Yields one tuple per Item with the field values in the order of fields (None when missing or empty).
+    """
+    if engine == EXPAT:
+        return _iter_items_expat(xml_file, fields)
+    if engine == ITERPARSE:
+        return _iter_items_iterparse(xml_file, fields)
+    raise ValueError(f"Unknown engine '{engine}'")
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+class LibraryRecord:
+    """
+    One library Item: file name, size in bytes and modification time in Unix seconds (as JRiver
+    stores 'Date Modified'), both None when missing. fields holds any extra requested fields.
+    """
+    __slots__ = ('filename', 'size', 'modified', 'fields')
+
+    def __init__(self, filename, size=None, modified=None, fields=None):
+        self.filename = filename
+        self.size = size
+        self.modified = modified
+        self.fields = fields
+
+    @classmethod
+    def from_values(cls, names, values):
+        """
+        Build a record from iter_library_items values for field names starting with RECORD_FIELDS.
+        """
+        fields = dict(zip(names[3:], values[3:])) if len(names) > 3 else None
+        return cls(values[0], _to_int(values[1]), _to_int(values[2]), fields)
+
+    @classmethod
+    def from_dict(cls, entry):
+        """
+        Read back an entry written by extract_filenames_to_json: a record object or a plain filename.
+        """
+        if isinstance(entry, str):
+            return cls(entry)
+        fields = {name: value for name, value in entry.items() if name not in RECORD_FIELDS}
+        return cls(entry[FILENAME_FIELD], _to_int(entry.get(FILE_SIZE_FIELD)),
+                   _to_int(entry.get(DATE_MODIFIED_FIELD)), fields or None)
+
+    def to_dict(self):
+        entry = {FILENAME_FIELD: self.filename, FILE_SIZE_FIELD: self.size, DATE_MODIFIED_FIELD: self.modified}
+        if self.fields:
+            entry.update(self.fields)
+        return entry
+
+def iter_library_records(xml_file, extra_fields=(), engine=ITERPARSE):
+    """
+    Stream a LibraryRecord for every Item of lib.xml that has a Filename.
+    """
+    names = RECORD_FIELDS + tuple(name for name in extra_fields if name not in RECORD_FIELDS)
+    for values in iter_library_items(xml_file, names, engine):
+        if values[0]:
+            yield LibraryRecord.from_values(names, values)
+
+def _item_values(item, fields):
+    values = dict.fromkeys(fields)
+    remaining = len(values)
+    for field in item:
+        name = field.get('Name')
+        if name in values and values[name] is None:
+            values[name] = field.text or None
+            remaining -= 1
+            if not remaining:
+                break
+    return tuple(values.values())
+
+def _iter_items_iterparse(xml_file, fields):
+    # Only 'start' events are requested: an Item is complete once the next one starts,
+    # and the first event gives the root, so processed Items can be dropped from it.
+    import xml.etree.ElementTree as ET
+
+    context = ET.iterparse(xml_file, events=('start',))
+    root = None
+    previous_item = None
+
+    for _, elem in context:
+        if root is None:
+            root = elem
+        elif elem.tag == 'Item':
+            if previous_item is not None:
+                yield _item_values(previous_item, fields)
+                # Drops every finished Item; elem itself is still referenced by the parser
+                root.clear()
+            previous_item = elem
+
+    if previous_item is not None:
+        yield _item_values(previous_item, fields)
+
+def _iter_items_expat(xml_file, fields):
+    # Pure streaming: no elements are built, only the wanted Field texts are kept
+    wanted = {name: i for i, name in enumerate(fields)}
+    items = []
+    values = None
+    field_index = None
+    text = []
+
+    def start_element(name, attrs):
+        nonlocal values, field_index
+        if name == 'Item':
+            values = [None] * len(fields)
+        elif name == 'Field' and values is not None:
+            field_index = wanted.get(attrs.get('Name'))
+            text.clear()
+
+    def end_element(name):
+        nonlocal values, field_index
+        if name == 'Field' and field_index is not None:
+            if values[field_index] is None:
+                values[field_index] = ''.join(text) or None
+            field_index = None
+        elif name == 'Item' and values is not None:
+            items.append(tuple(values))
+            values = None
+
+    def character_data(data):
+        if field_index is not None:
+            text.append(data)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+
+    with open(xml_file, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            parser.Parse(chunk, not chunk)
+            yield from items
+            items.clear()
+            if not chunk:
+                break
+
+def extract_filenames_to_json(xml_file, json_file, fields=None, engine=ITERPARSE, metadata=False):
     """
     Extract filename fields from lib.xml and write to JSON file, sorted alphabetically.
+    With extra fields, each entry is written as an object of field name to value instead of a plain filename.
+    With metadata, entries are LibraryRecord objects: size and modification time as numbers plus the extra fields.
+    Objects can only be written as JSON or NDJSON; other outputs raise ValueError before anything is read.
     """
-    filenames = []
-    
+    base_fields = list(RECORD_FIELDS) if metadata else [FILENAME_FIELD]
+    fields = base_fields + [name for name in fields or [] if name not in base_fields]
+    if len(fields) > 1 and detect_format(json_file) not in (JSON, NDJSON):
+        raise ValueError(f"Entries with fields can only be written to a .json or .ndjson file, not '{json_file}'")
+    # Sorted on the way out; spills to temporary files if the list outgrows memory
+    if len(fields) == 1:
+        filenames = ExternalSorter(key=str.lower)
+    else:
+        filenames = ExternalSorter(key=lambda record: record[FILENAME_FIELD].lower())
+
     print(f"Processing {xml_file}...")
-    
-    # Use iterparse for memory-efficient processing of large XML files
-    context = ET.iterparse(xml_file, events=('start', 'end'))
-    context = iter(context)
-    
+
     item_count = 0
-    
-    for event, elem in context:
-        if event == 'end' and elem.tag == 'Item':
-            # Look for the Filename field within this Item
-            for field in elem.findall('Field'):
-                if field.get('Name') == 'Filename':
-                    filename = field.text
-                    if filename:
-                        filenames.append(filename)
-                    break
-            
-            item_count += 1
-            if item_count % 10000 == 0:
-                print(f"Processed {item_count} items, found {len(filenames)} filenames...")
-            
-            # Clear the element to free memory
-            elem.clear()
-    
+
+    for values in iter_library_items(xml_file, fields, engine):
+        filename = values[0]
+        if filename:
+            if metadata:
+                filenames.add(LibraryRecord.from_values(fields, values).to_dict())
+            elif len(fields) == 1:
+                filenames.add(filename)
+            else:
+                filenames.add(dict(zip(fields, values)))
+
+        item_count += 1
+        if item_count % 10000 == 0:
+            print(f"Processed {item_count} items, found {len(filenames)} filenames...")
+
     print(f"\nTotal items processed: {item_count}")
     print(f"Total filenames found: {len(filenames)}")
     print("Sorting filenames alphabetically...")
-    
+
     # Sort filenames alphabetically (case-insensitive)
-    filenames.sort(key=str.lower)
-    
+    sorted_filenames = filenames.sorted()
+
     print(f"Writing to {json_file}...")
-    
-    # Write to JSON file
-    with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(filenames, f, ensure_ascii=False, indent=2)
-    
+
+    # Stream to the output file (JSON array, NDJSON or text depending on extension)
+    write_paths(sorted_filenames, json_file)
+
     print(f"Done! {len(filenames)} filenames written to {json_file}")
 
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract the file names from a JRiver lib.xml into a sorted path list.")
+    parser.add_argument("xml_file", nargs='?', default="lib.xml", help="The library XML export (default: lib.xml).")
+    parser.add_argument("output", nargs='?', default="lib.json", help="The output file (default: lib.json).")
+    parser.add_argument("--fields", nargs='+', metavar="NAME", help="Extra Item fields to extract, e.g. 'File Size' 'Date Modified'. Entries become objects.")
+    parser.add_argument("--engine", choices=ENGINES, default=ITERPARSE, help="iterparse (ElementTree) or expat (pure streaming, no element tree) (default: iterparse).")
+    parser.add_argument("--metadata", action="store_true", help="Write records with 'File Size' and 'Date Modified' as numbers (plus any --fields), for compare_json.py --metadata.")
+
+    args = parser.parse_args(argv)
+    if (args.fields or args.metadata) and detect_format(args.output) not in (JSON, NDJSON):
+        parser.error("--fields and --metadata write objects, which need a .json or .ndjson output")
+
+    extract_filenames_to_json(args.xml_file, args.output, args.fields, args.engine, args.metadata)
+
 if __name__ == '__main__':
-    extract_filenames_to_json('lib.xml', 'lib.json')
+    main()
@@ -1,12 +1,219 @@
 import os
-import json
-import argparse
-from pathlib import Path
+import time
+import heapq
 
-def search_files(directory, output_file):
+from path_stream import PathWriter, FORMATS, SNAPSHOT, detect_format
+from scan_progress import ScanProgress, previous_file_count
+from path_filter import add_filter_arguments, filter_from_args
+from scan_checkpoint import CHECKPOINT_INTERVAL
+
+# Attempts after the first failed listing of a directory, waiting RETRY_DELAY, then twice as long each time
+RETRIES = 3
+RETRY_DELAY = 1.0
+
+# Listing errors that retrying won't fix; the directory is skipped with a warning
+PERMANENT_ERRORS = (PermissionError, FileNotFoundError, NotADirectoryError)
+
+class ListingFailed(Exception):
+    """
+    A directory still couldn't be listed after every retry. Unlike the OSErrors that
+    scan_directory warns about and skips, this stops the scan.
+    """
+
+def list_directory(directory):
+    """
+    List a single directory with one os.scandir call.
+    Returns the sorted names of the files in it and the paths of its subdirectories.
+    """
+    files = []
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                # DirEntry caches the type from the directory listing, so these
+                # checks don't need a stat call except for symlinks
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    files.append(entry.name)
+            except OSError:
+                continue
+    files.sort()
+    return files, subdirs
+
+def retrying(lister, retries=RETRIES, delay=RETRY_DELAY):
+    """
+    Wrap a list_directory(path) function so transient OSErrors, like a network share dropping out
+    for a moment, are retried with exponential backoff. Errors in PERMANENT_ERRORS are raised
+    right away; a directory that keeps failing raises ListingFailed.
+    """
+    def list_directory_with_retries(directory):
+        for attempt in range(retries + 1):
+            try:
+                return lister(directory)
+            except PERMANENT_ERRORS:
+                raise
+            except OSError as e:
+                if attempt == retries:
+                    raise ListingFailed(f"Could not read directory '{directory}' after {retries + 1} attempts: {e}") from e
+                wait = delay * 2 ** attempt
+                print(f"Warning: Could not read directory '{directory}' ({e}), retrying in {wait:g}s")
+                time.sleep(wait)
+    return list_directory_with_retries
+
+def _take_listing(directory, result):
+    """
+    Call result() to get a directory listing, warning about and skipping unreadable directories.
+    """
+    try:
+        return result()
+    except PermissionError:
+        print(f"Warning: Permission denied for directory '{directory}'")
+    except OSError as e:
+        print(f"Warning: Could not read directory '{directory}': {e}")
+    return None
+
+def scan_directory(directory, workers=1, lister=list_directory):
+    """
+    Walk the tree under directory, listing each directory exactly once.
+    Yields (dirpath, filenames) for every directory that contains files.
+    Directories come out in sorted path order and file names are sorted within each directory.
+    With workers > 1, directories are listed concurrently on a thread pool.
+    lister replaces list_directory, e.g. with a ScanIndex lookup.
+    """
+    if workers > 1:
+        yield from _scan_directory_parallel(directory, workers, lister)
+        return
+    
+    # Every subdirectory sorts after its parent, so always expanding the smallest
+    # pending path produces the same order as sorting the full list of directories.
+    pending = [str(directory)]
+    while pending:
+        current = heapq.heappop(pending)
+        listing = _take_listing(current, lambda: lister(current))
+        if listing is None:
+            continue
+        files, subdirs = listing
+        for subdir in subdirs:
+            heapq.heappush(pending, subdir)
+        if files:
+            yield current, files
+
+def _scan_directory_parallel(directory, workers, lister):
+    """
+    Parallel version of scan_directory with the same output order.
+    Workers always take the smallest directory not yet listed and queue its subdirectories as
+    soon as its listing is done, so they move through the tree in the order the output needs it,
+    deep trees included. The output takes the smallest directory not yet consumed: an unfinished
+    parent sorts before anything it will discover, so nothing can be missed. Workers pause once
+    window listings are waiting to be consumed, except for the one the output needs next.
+    """
+    import threading
+
+    window = workers * 16
+    root = str(directory)
+    todo = [root]          # discovered, not yet being listed
+    unconsumed = [root]    # discovered, not yet yielded
+    results = {}           # path -> (listing, error) of finished listings
+    condition = threading.Condition()
+    stopping = False
+
+    def work():
+        while True:
+            with condition:
+                while not stopping and not (todo and (len(results) < window or todo[0] == unconsumed[0])):
+                    condition.wait()
+                if stopping:
+                    return
+                path = heapq.heappop(todo)
+            try:
+                result = (lister(path), None)
+            except Exception as e:
+                result = (None, e)
+            with condition:
+                results[path] = result
+                if result[0] is not None:
+                    for subdir in result[0][1]:
+                        heapq.heappush(todo, subdir)
+                        heapq.heappush(unconsumed, subdir)
+                condition.notify_all()
+
+    def take(path):
+        listing, error = results.pop(path)
+        if error is not None:
+            raise error
+        return listing
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            with condition:
+                if not unconsumed:
+                    break
+                path = unconsumed[0]
+                while path not in results:
+                    condition.wait()
+                heapq.heappop(unconsumed)
+                # A slot in the window is free again
+                condition.notify_all()
+
+            listing = _take_listing(path, lambda: take(path))
+            if listing is None:
+                continue
+            files, _ = listing
+            if files:
+                yield path, files
+    finally:
+        with condition:
+            stopping = True
+            condition.notify_all()
+        for thread in threads:
+            thread.join()
+
+def iter_file_paths(directory, workers=1, lister=list_directory):
+    """
+    Yield the absolute path of every file under directory, in scan order.
+    """
+    for dirpath, files in scan_directory(directory, workers, lister):
+        for name in files:
+            yield os.path.join(dirpath, name)
+
+def stat_file(path):
+    """
+    Return (path, size, mtime_ns); size and mtime_ns are None if the file can't be stat'ed.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path, None, None
+    return path, st.st_size, st.st_mtime_ns
+
+def iter_file_stats(directory, workers=1, lister=list_directory):
+    """
+    Like iter_file_paths, with the size and mtime of each file taken as it is scanned (see stat_file).
+    """
+    return map(stat_file, iter_file_paths(directory, workers, lister))
+
+def search_files(directory, output_file, workers=1, output_format=None, index_file=None,
+                 quiet=False, metrics_file=None, path_filter=None, stats=False, resume=False,
+                 checkpoint_interval=CHECKPOINT_INTERVAL, retries=RETRIES):
     """
     Recursively searches for files in the given directory and saves their absolute paths to a JSON file.
+    Paths are streamed to the output as they are found; output_format defaults to the file extension.
+    With workers > 1, directories are listed in parallel; the output order is unchanged.
+    With index_file, directory listings are cached by mtime so unchanged directories are not re-listed.
+    Progress is reported periodically unless quiet; metrics_file receives a JSON summary of the run.
+    path_filter (an ExtensionFilter) drops files by extension as directories are listed.
+    With stats, each file is stat'ed and its size and mtime are kept (snapshot output only).
+    Every checkpoint_interval seconds the output is flushed and a checkpoint saved next to it
+    (not for snapshots; None disables it); with resume, a scan continues from the checkpoint of an
+    earlier run that stopped. Directories that fail to list are retried up to retries times.
+    Returns the number of paths written, or None if the scan failed.
     """
+    from pathlib import Path
+
     directory_path = Path(directory).resolve()
     
     if not directory_path.exists():
@@ -17,56 +224,162 @@ def search_files(directory, output_file):
         print(f"Error: '{directory}' is not a directory.")
         return
 
-    print(f"Searching in: {directory_path}")
-    print(f"Outputting to: {output_file}")
+    if not quiet:
+        print(f"Searching in: {directory_path}")
+        print(f"Outputting to: {output_file}")
+        if workers > 1:
+            print(f"Listing directories with {workers} workers")
+
+    expected_files = previous_file_count(metrics_file) if metrics_file else None
+    progress = ScanProgress(expected_files=expected_files, enabled=not quiet)
+    
+    index = None
+    lister = list_directory
+    if index_file:
+        from scan_index import ScanIndex
+        index = ScanIndex(index_file)
+        lister = index.lister(lister)
+        if not quiet:
+            print(f"Using directory index: {index_file}")
+    # Around the index too, so a failing stat of an indexed directory is retried like a listing
+    lister = retrying(lister, retries)
+    if path_filter is not None:
+        # Applied on top of the index so cached listings stay complete for other filters
+        lister = path_filter.lister(lister)
+        if not quiet:
+            print(f"{path_filter.describe().capitalize()}")
+    lister = progress.timed(lister)
+
+    checkpoint = None
+    state = None
+    fmt = output_format or detect_format(output_file)
+    # Only snapshots keep the size and mtime, so other formats would stat every file for nothing
+    stats = stats and fmt == SNAPSHOT
+    if checkpoint_interval is not None and fmt != SNAPSHOT:
+        from scan_checkpoint import ScanCheckpoint
+        checkpoint = ScanCheckpoint(output_file, directory_path, fmt, stats, path_filter, checkpoint_interval)
+        if resume:
+            state = checkpoint.load()
+            if state is None:
+                print(f"No checkpoint of this scan in '{checkpoint.filename}', starting from the beginning.")
+            else:
+                from scan_checkpoint import resume_lister
+                lister = resume_lister(lister, state['last_dir'])
+                print(f"Resuming after '{state['last_dir']}' with {state['count']} file paths already saved.")
+    elif resume:
+        print("Snapshot output can't be resumed, starting from the beginning.")
 
+    last_dir = state['last_dir'] if state else None
     try:
-        # First pass: collect all directories
-        directories = []
-        for root, _, files in os.walk(directory_path):
-            if files:  # Only include directories that have files
-                directories.append(root)
-        
-        # Sort directories
-        directories.sort()
-        
-        # Second pass: process each directory and collect file paths
-        file_paths = []
-        
-        for directory in directories:
-            # Get files in this directory only (not subdirectories)
+        progress.start_phase('scan')
+        with PathWriter(output_file, output_format, stats, (state['offset'], state['count']) if state else None) as writer:
             try:
-                files = sorted([f for f in os.listdir(directory) 
-                               if os.path.isfile(os.path.join(directory, f))])
-                
-                for file in files:
-                    full_path = os.path.join(directory, file)
-                    print(f"Found: {full_path}")
-                    file_paths.append(full_path)
-                    
-            except PermissionError:
-                print(f"Warning: Permission denied for directory '{directory}'")
-                continue
+                for dirpath, files in scan_directory(directory_path, workers, lister):
+                    for name in files:
+                        path = os.path.join(dirpath, name)
+                        if stats:
+                            writer.write(*stat_file(path))
+                        else:
+                            writer.write(path)
+                    progress.add_files(len(files))
+                    last_dir = dirpath
+                    if checkpoint is not None and checkpoint.due():
+                        checkpoint.save(writer, last_dir)
+            except ListingFailed:
+                # Raised between directories, so the output ends with last_dir complete
+                if checkpoint is not None and last_dir is not None:
+                    checkpoint.save(writer, last_dir)
+                raise
+        
+        if checkpoint is not None:
+            checkpoint.remove()
+        # A resumed run never visits the skipped subtrees, so it can't tell which entries are stale
+        if index and state is None:
+            progress.start_phase('index_prune')
+            index.prune(directory_path)
+        progress.end_phase()
         
-        # Write to JSON file
-        with open(output_file, mode='w', encoding='utf-8') as jsonfile:
-            json.dump(file_paths, jsonfile, ensure_ascii=False, indent=2)
+        print(f"Successfully saved {writer.count} file paths to '{output_file}'.")
+        if index and not quiet:
+            print(f"Reused {index.hits} unchanged directories from the index, listed {index.misses}.")
         
-        print(f"Successfully saved {len(file_paths)} file paths to '{output_file}'.")
+        if metrics_file:
+            extra = {'root': str(directory_path), 'output': output_file}
+            if index:
+                extra['index'] = {'hits': index.hits, 'misses': index.misses}
+            progress.write_metrics(metrics_file, **extra)
+            if not quiet:
+                print(f"Metrics written to '{metrics_file}'.")
+        return writer.count
 
+    except ListingFailed as e:
+        print(f"Error: {e}")
+        _print_resume_hint(checkpoint)
     except PermissionError:
         print(f"Error: Permission denied when writing to '{output_file}'.")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+    except OSError as e:
+        print(f"Error: Could not write '{output_file}': {e}")
+        _print_resume_hint(checkpoint)
+    finally:
+        if index:
+            index.close()
+
+def _print_resume_hint(checkpoint):
+    if checkpoint is not None and checkpoint.saved:
+        print(f"Everything up to '{checkpoint.saved['last_dir']}' is saved; run again with --resume to continue.")
+
+def main(argv=None):
+    import argparse
 
-def main():
     parser = argparse.ArgumentParser(description="Recursively search a folder and save full paths of files to a JSON file.")
-    parser.add_argument("directory", nargs='?', default=".", help="The directory to search recursively (default: current directory).")
+    parser.add_argument("directory", nargs='*', default=["."], help="The directory to search recursively (default: current directory). With several, each is scanned into its own partition, one concurrent scan per device, and the partitions are merged into the output.")
     parser.add_argument("-o", "--output", default="file_paths.json", help="The output JSON file name (default: file_paths.json).")
+    parser.add_argument("-f", "--format", choices=FORMATS, help="Output format: json, ndjson, csv, text or snapshot (default: from the output file extension; .fls is a snapshot).")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of threads listing directories in parallel, useful on slow network shares (default: 1).")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Don't print progress while scanning.")
+    parser.add_argument("-m", "--metrics", help="Write a JSON summary (counts, phase timings, slowest directories) to this file. An existing summary provides the expected total for the ETA.")
+    parser.add_argument("-i", "--index", help="SQLite directory index; directories whose mtime is unchanged since the last run are not listed again.")
+    parser.add_argument("-s", "--stat", action="store_true", help="Record the size and modification time of every file (snapshot output only).")
+    parser.add_argument("--watch", action="store_true", help="Keep running and update the output from filesystem events (inotify, or polling where unavailable) instead of scanning once.")
+    parser.add_argument("--library", help="With --watch: lib.xml or path list to keep only_in_lib.txt / only_in_file_paths.txt current against.")
+    parser.add_argument("--diff-interval", type=float, help="With --watch: write the diff every this many seconds (default: only on SIGUSR1).")
+    parser.add_argument("--poll", type=float, metavar="SECONDS", help="With --watch: poll directory mtimes at this interval instead of using inotify.")
+    parser.add_argument("--resume", action="store_true", help="Continue a scan that stopped from its checkpoint (the output name plus .checkpoint) instead of starting over.")
+    parser.add_argument("--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL, metavar="SECONDS", help="Save a checkpoint this often; 0 disables checkpoints (default: %(default)g).")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="Retry a directory this many times, with growing waits, before stopping the scan (default: %(default)s).")
+    parser.add_argument("--partition-dir", help="Where to write the per-directory path lists and manifest.json (default: the output name with a _parts suffix). Also partitions a single directory.")
+    add_filter_arguments(parser)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.stat and (args.format or detect_format(args.output)) != SNAPSHOT:
+        parser.error(f"--stat needs snapshot output (-f {SNAPSHOT} or an output ending in .fls)")
+    path_filter = None
+    if args.exclude_ext or args.include_ext or args.filter_config:
+        path_filter = filter_from_args(args)
+
+    if len(args.directory) > 1 or args.partition_dir:
+        for option, value in [('--watch', args.watch), ('--index', args.index), ('--metrics', args.metrics)]:
+            if value:
+                parser.error(f"{option} supports a single directory without --partition-dir")
+        from multi_scan import scan_roots
+        partition_dir = args.partition_dir or os.path.splitext(args.output)[0] + '_parts'
+        manifest = scan_roots(args.directory, partition_dir, args.output, args.workers, args.format,
+                              path_filter, args.stat, args.quiet, args.resume,
+                              args.checkpoint_interval or None, args.retries)
+        return 1 if manifest is None else 0
+
+    directory = args.directory[0]
+    if args.watch:
+        from inventory_watch import watch
+        watch(directory, args.output, args.library, args.diff_interval, args.poll, path_filter=path_filter)
+        return
 
-    search_files(args.directory, args.output)
+    count = search_files(directory, args.output, args.workers, args.format, args.index,
+                         args.quiet, args.metrics, path_filter, args.stat, args.resume,
+                         args.checkpoint_interval or None, args.retries)
+    # search_files has already printed what went wrong
+    return 1 if count is None else 0
 
 if __name__ == "__main__":
-    main()
+    import sys
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import sys
+
+# Subcommand -> (module, description). A module is only imported when its command runs,
+# so starting the CLI costs the same whichever tool is used.
+COMMANDS = {
+    'search': ('file_searcher', "Scan folders into a path list"),
+    'extract': ('extract_filenames', "Extract the file names from a JRiver lib.xml"),
+    'collapse': ('collapse_tracks', "Collapse ISO/SACD track entries into one per image"),
+    'compare': ('compare_json', "Compare two path lists"),
+    'reconcile': ('reconcile', "Compare lib.xml with the files on disk in one pass"),
+    'hash': ('content_hash', "Record content hashes for a path list"),
+    'snapshot': ('snapshot', "Convert a path list to or from a binary snapshot"),
+    'serve': ('inventory_server', "Serve prefix, substring and difference queries"),
+}
+
+BATCH = 'batch'
+
+def usage():
+    lines = ["usage: fileslist <command> [options]", "", "commands:"]
+    for name, (_, description) in COMMANDS.items():
+        lines.append(f"  {name:<10} {description}")
+    lines.append(f"  {BATCH:<10} Run one command per line from stdin in this process")
+    lines.append("")
+    lines.append("Run 'fileslist <command> --help' for the options of a command.")
+    return '\n'.join(lines)
+
+def run(argv):
+    """
+    Run one command line (without the program name). Returns its exit status:
+    the status the tool's main returns (None counts as 0), the argparse status for
+    usage errors, 1 for an exception.
+    """
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0 if argv else 2
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"fileslist: unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    import importlib
+    module = importlib.import_module(COMMANDS[command][0])
+    try:
+        status = module.main(args)
+    except SystemExit as e:
+        status = e.code
+    if status is None or isinstance(status, int):
+        return status or 0
+    print(status, file=sys.stderr)
+    return 1
+
+def run_batch(lines, keep_going=True):
+    """
+    Run the jobs in lines, one command line per line in shell quoting; blank lines and
+    lines starting with '#' are skipped. Modules are imported once for all jobs.
+    Returns the number of failed jobs.
+    """
+    import shlex
+    import traceback
+
+    jobs = failed = 0
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        jobs += 1
+        argv = shlex.split(line)
+        if argv and argv[0] == BATCH:
+            status = 2
+            print(f"fileslist: line {number}: batch jobs can't start another batch", file=sys.stderr)
+        else:
+            try:
+                status = run(argv)
+            except Exception:
+                traceback.print_exc()
+                status = 1
+        sys.stdout.flush()
+        if status:
+            failed += 1
+            print(f"fileslist: line {number} failed with status {status}: {line}", file=sys.stderr)
+            if not keep_going:
+                break
+
+    print(f"fileslist: {jobs} jobs, {failed} failed", file=sys.stderr)
+    return failed
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == BATCH:
+        if any(arg in ('-h', '--help') for arg in argv[1:]):
+            print("usage: fileslist batch [--stop-on-error] < jobs.txt\n\n"
+                  "Run one fileslist command line per line of stdin (e.g. 'compare lib.json a.json')\n"
+                  "in a single process. Exits with status 1 if any job failed.")
+            return 0
+        failed = run_batch(sys.stdin, keep_going='--stop-on-error' not in argv[1:])
+        return 1 if failed else 0
+    return run(argv)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+import time
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import json_backend
+from path_stream import iter_paths
+from path_keys import keyed_paths
+from path_filter import add_filter_arguments, filter_from_args
+from compare_json import EXCLUDED_EXTENSIONS, DEFAULT_FILTER
+from collapse_tracks import collapse_iso_paths
+
+DEFAULT_PORT = 8765
+
+# Results returned per query unless the request asks for another limit
+DEFAULT_LIMIT = 100
+
+# Raised by a missing, unreadable or malformed path list or lib.xml (ElementTree.ParseError is a SyntaxError)
+LOAD_ERRORS = (OSError, ValueError, SyntaxError)
+
+class ReloadFailed(Exception):
+    pass
+
+def normalize_fragment(text):
+    """
+    Normalize part of a path the way path_keys.compute_key normalizes whole paths
+    ('\\' separators, NFC, case folded), without resolving '.' or '..'.
+    """
+    text = text.replace('/', '\\')
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize('NFC', unicodedata.normalize('NFC', text).casefold())
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class PathIndex:
+    """
+    An in-memory index of a path list: the comparison keys sorted for prefix lookups by bisection,
+    plus a trigram index (trigram -> ascending key positions) for substring search.
+    Each key maps back to the first original path seen for it.
+    """
+
+    def __init__(self, paths, trigrams=True):
+        pairs = sorted(keyed_paths(paths))
+        self.keys = []
+        self.paths = []
+        for key, path in pairs:
+            if not self.keys or self.keys[-1] != key:
+                self.keys.append(key)
+                self.paths.append(path)
+
+        self.trigrams = None
+        if trigrams:
+            self.trigrams = {}
+            for position, key in enumerate(self.keys):
+                for trigram in _trigrams(key):
+                    postings = self.trigrams.get(trigram)
+                    if postings is None:
+                        postings = self.trigrams[trigram] = array('I')
+                    postings.append(position)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def prefix_range(self, prefix):
+        """
+        Positions [start, end) of the keys starting with prefix (already normalized).
+        """
+        start = bisect_left(self.keys, prefix)
+        # Every key with this prefix sorts before prefix followed by the highest code point
+        end = bisect_left(self.keys, prefix + '\U0010ffff', start)
+        return start, end
+
+    def prefix(self, prefix):
+        start, end = self.prefix_range(normalize_fragment(prefix))
+        return range(start, end)
+
+    def substring(self, text):
+        """
+        Positions of the keys containing text, in key order.
+        """
+        text = normalize_fragment(text)
+        if self.trigrams is None or len(text) < 3:
+            return [i for i, key in enumerate(self.keys) if text in key]
+
+        rarest = None
+        for trigram in _trigrams(text):
+            postings = self.trigrams.get(trigram)
+            if postings is None:
+                return []
+            if rarest is None or len(postings) < len(rarest):
+                rarest = postings
+
+        # Checking the candidates of the rarest trigram directly is cheaper than intersecting posting lists
+        keys = self.keys
+        return [position for position in rarest if text in keys[position]]
+
+def difference(index1, index2, prefix=''):
+    """
+    Positions in index1 of the keys under prefix that index2 doesn't have, by walking both sorted ranges once.
+    """
+    prefix = normalize_fragment(prefix)
+    start1, end1 = index1.prefix_range(prefix)
+    start2, end2 = index2.prefix_range(prefix)
+    keys1, keys2 = index1.keys, index2.keys
+    j = start2
+    result = []
+    for i in range(start1, end1):
+        key = keys1[i]
+        while j < end2 and keys2[j] < key:
+            j += 1
+        if j == end2 or keys2[j] != key:
+            result.append(i)
+    return result
+
+def library_paths(filename):
+    """
+    Paths of a lib.xml or path list, with ISO/SACD tracks collapsed into their image.
+    """
+    if filename.lower().endswith('.xml'):
+        from extract_filenames import iter_library_items
+        paths = (values[0] for values in iter_library_items(filename) if values[0])
+    else:
+        paths = iter_paths(filename)
+    return collapse_iso_paths(paths)
+
+class InventoryService:
+    """
+    The loaded indexes, swapped as a whole on reload so queries never see a half-built index.
+    A query takes both indexes at once, so it never pairs an old disk index with a new library.
+    """
+
+    def __init__(self, inventory_file, library_file=None, path_filter=None, trigrams=True):
+        self.inventory_file = inventory_file
+        self.library_file = library_file
+        self.path_filter = DEFAULT_FILTER if path_filter is None else path_filter
+        self.trigrams = trigrams
+        self.disk = None
+        self.library = None
+        self.loaded_at = None
+        self._reload_lock = threading.Lock()
+        # Held only while the indexes are swapped or read, so queries don't wait for a reload
+        self._swap_lock = threading.Lock()
+
+    def load(self):
+        with self._reload_lock:
+            start = time.perf_counter()
+            accepts = self.path_filter.accepts
+            disk = PathIndex(filter(accepts, iter_paths(self.inventory_file)), self.trigrams)
+            library = None
+            if self.library_file:
+                library = PathIndex(filter(accepts, library_paths(self.library_file)), self.trigrams)
+            with self._swap_lock:
+                self.disk, self.library = disk, library
+                self.loaded_at = time.time()
+            return time.perf_counter() - start
+
+    def indexes(self):
+        """
+        The current {'disk': index, 'library': index}, both from the same load.
+        """
+        with self._swap_lock:
+            return {'disk': self.disk, 'library': self.library}
+
+    @staticmethod
+    def _pick(indexes, name):
+        index = indexes.get(name)
+        if index is None:
+            raise ValueError(f"Unknown or unloaded index '{name}'")
+        return index
+
+    def query(self, endpoint, params):
+        """
+        Answer one request: endpoint is the URL path, params the decoded query string.
+        """
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+        if endpoint == '/reload':
+            try:
+                seconds = self.load()
+            except LOAD_ERRORS as e:
+                raise ReloadFailed(f"Reload failed, still serving the previous indexes: {e}") from e
+            return {'seconds': round(seconds, 3), 'disk': len(self.indexes()['disk'])}
+
+        indexes = self.indexes()
+        if endpoint == '/stats':
+            library = indexes['library']
+            return {'disk': len(indexes['disk']), 'library': len(library) if library else None,
+                    'loaded_at': self.loaded_at}
+        if endpoint == '/prefix':
+            index = self._pick(indexes, params.get('in', 'disk'))
+            positions = index.prefix(params.get('q', ''))
+        elif endpoint == '/search':
+            if not params.get('q'):
+                raise ValueError("Missing q parameter")
+            index = self._pick(indexes, params.get('in', 'disk'))
+            positions = index.substring(params['q'])
+        elif endpoint == '/diff':
+            # only=library: in the library but not on disk (missing files); only=disk: not in the library
+            only = params.get('only', 'library')
+            other = 'disk' if only == 'library' else 'library'
+            index = self._pick(indexes, only)
+            positions = difference(index, self._pick(indexes, other), params.get('prefix', ''))
+        else:
+            raise LookupError(f"Unknown endpoint '{endpoint}'")
+
+        return {'count': len(positions), 'results': [index.paths[i] for i in positions[:limit]]}
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    GET /prefix?q=..., /search?q=..., /diff?only=library|disk&prefix=..., /stats; POST /reload.
+    Optional in=disk|library selects the index for prefix and search, limit the number of results.
+    """
+
+    def do_GET(self):
+        self._respond(post=False)
+
+    def do_POST(self):
+        self._respond(post=True)
+
+    def _respond(self, post):
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        start = time.perf_counter()
+        try:
+            if post != (url.path == '/reload'):
+                raise LookupError(f"{self.command} {url.path} is not supported")
+            body = self.server.service.query(url.path, params)
+            status = 200
+        except LookupError as e:
+            body, status = {'error': str(e)}, 404
+        except ValueError as e:
+            body, status = {'error': str(e)}, 400
+        except (ReloadFailed, OSError) as e:
+            body, status = {'error': str(e)}, 500
+        body['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+        data = json_backend.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT, verbose=False):
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve prefix, substring and difference queries over a path inventory from memory.")
+    parser.add_argument("inventory", nargs='?', default="file_paths.json", help="Path list of the files on disk (default: file_paths.json).")
+    parser.add_argument("--library", help="lib.xml or library path list, for /diff and in=library queries.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: %(default)s).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on (default: %(default)s).")
+    parser.add_argument("--no-trigrams", action="store_true", help="Skip the trigram index to save memory; substring queries then scan every key.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request.")
+    add_filter_arguments(parser, EXCLUDED_EXTENSIONS)
+
+    args = parser.parse_args(argv)
+
+    service = InventoryService(args.inventory, args.library, filter_from_args(args, EXCLUDED_EXTENSIONS),
+                               not args.no_trigrams)
+    print(f"Loading {args.inventory}" + (f" and {args.library}" if args.library else "") + "...")
+    seconds = service.load()
+    print(f"Indexed {len(service.disk)} disk paths" +
+          (f" and {len(service.library)} library paths" if service.library else "") + f" in {seconds:.1f}s")
+
+    server = make_server(service, args.host, args.port, args.verbose)
+    print(f"Listening on http://{args.host}:{server.server_address[1]}/ "
+          f"(prefix, search, diff, stats, POST reload); Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
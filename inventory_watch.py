@@ -0,0 +1,520 @@
+import os
+import sys
+import time
+import errno
+import select
+import signal
+import struct
+import ctypes
+import ctypes.util
+
+from file_searcher import list_directory
+from path_stream import iter_paths, write_paths, detect_format, TEXT
+from path_keys import path_key
+from compare_json import DEFAULT_FILTER, EXCLUDED_EXTENSIONS, iter_keyed
+from path_filter import ExtensionFilter
+from extract_filenames import ITERPARSE
+from collapse_tracks import CollapseStats
+from reconcile import keyed_library_paths, LIBRARY_ONLY_FILE, DISK_ONLY_FILE
+
+# Event kinds produced by the watchers
+ADDED = 'added'
+REMOVED = 'removed'
+LISTED = 'listed'      # A directory was listed again; the detail is its file names
+RESCAN = 'rescan'      # Events were lost; everything has to be listed again
+
+# Seconds between directory checks when inotify is not available
+POLL_INTERVAL = 5.0
+
+# inotify constants from <sys/inotify.h>
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR | IN_DONT_FOLLOW
+
+# struct inotify_event: wd, mask, cookie, len, then len bytes of NUL-padded name
+_EVENT = struct.Struct('iIII')
+
+def walk_tree(root, visit=None):
+    """
+    Yield (dirpath, files, subdirs) for root and every directory below it, in no particular order.
+    visit(dirpath) is called before a directory is listed. Directories that vanish or can't be read are skipped.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        if visit:
+            visit(directory)
+        try:
+            files, subdirs = list_directory(directory)
+        except OSError:
+            continue
+        stack.extend(subdirs)
+        yield directory, files, subdirs
+
+class LibraryDiff:
+    """
+    Comparison keys found only in the library and only on disk, updated one file at a time,
+    so keeping the diff current costs O(1) per change instead of a full compare.
+    Keys come from the memoized path_key: the same paths come back on every rename, removal and resync.
+    library maps each key to its path in the library; the diff is written as those paths and the
+    paths found on disk.
+    """
+
+    def __init__(self, library, path_filter=None):
+        self.library = dict(library)
+        self.only_in_library = set(self.library)
+        self.only_on_disk = set()
+        # key -> [number of paths on disk with that key, the first of them]
+        self._disk = {}
+        self._accepts = (DEFAULT_FILTER if path_filter is None else path_filter).accepts
+
+    def added(self, path):
+        if not self._accepts(path):
+            return
+        key = path_key(path)
+        entry = self._disk.get(key)
+        if entry is not None:
+            entry[0] += 1
+        else:
+            self._disk[key] = [1, path]
+            if key in self.library:
+                self.only_in_library.discard(key)
+            else:
+                self.only_on_disk.add(key)
+
+    def removed(self, path):
+        if not self._accepts(path):
+            return
+        key = path_key(path)
+        entry = self._disk.get(key)
+        if entry is not None and entry[0] > 1:
+            entry[0] -= 1
+            return
+        self._disk.pop(key, None)
+        if key in self.library:
+            self.only_in_library.add(key)
+        else:
+            self.only_on_disk.discard(key)
+
+    def write(self, library_only_file, disk_only_file):
+        library, disk = self.library, self._disk
+        write_paths([library[key] for key in sorted(self.only_in_library)], library_only_file, TEXT)
+        write_paths([disk[key][1] for key in sorted(self.only_on_disk)], disk_only_file, TEXT)
+
+class Inventory:
+    """
+    The files under the watched directory as {directory: set of file names}.
+    listener (e.g. a LibraryDiff) is told about every path that is really added or removed.
+    Files rejected by path_filter (an ExtensionFilter) are never added.
+    """
+
+    def __init__(self, listener=None, path_filter=None):
+        self.dirs = {}
+        self.count = 0
+        self.listener = listener
+        self._accepts = path_filter.accepts if path_filter is not None else None
+
+    def add(self, path):
+        if self._accepts is not None and not self._accepts(path):
+            return
+        directory, name = os.path.split(path)
+        names = self.dirs.setdefault(directory, set())
+        if name in names:
+            return
+        names.add(name)
+        self.count += 1
+        if self.listener:
+            self.listener.added(path)
+
+    def remove(self, path):
+        directory, name = os.path.split(path)
+        names = self.dirs.get(directory)
+        if not names or name not in names:
+            return
+        names.remove(name)
+        if not names:
+            del self.dirs[directory]
+        self.count -= 1
+        if self.listener:
+            self.listener.removed(path)
+
+    def sync(self, directory, files):
+        """
+        Make the files of one directory match a fresh listing.
+        """
+        current = self.dirs.get(directory, set())
+        listed = set(files if self._accepts is None else filter(self._accepts, files))
+        for name in listed - current:
+            self.add(os.path.join(directory, name))
+        for name in current - listed:
+            self.remove(os.path.join(directory, name))
+
+    def remove_tree(self, root):
+        prefix = os.path.join(root, '')
+        for directory in [d for d in self.dirs if d == root or d.startswith(prefix)]:
+            for name in list(self.dirs[directory]):
+                self.remove(os.path.join(directory, name))
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # Same order as a scan: directories and names sorted
+        for directory in sorted(self.dirs):
+            for name in sorted(self.dirs[directory]):
+                yield os.path.join(directory, name)
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, 'inotify_init1') else None
+
+def _raise_errno(message):
+    code = ctypes.get_errno()
+    raise OSError(code, f"{message}: {os.strerror(code)}")
+
+class InotifyWatcher:
+    """
+    Linux inotify through ctypes, with one watch per directory.
+    Raises OSError if inotify is not available or the watch limit (fs.inotify.max_user_watches) is reached.
+    """
+
+    def __init__(self):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            _raise_errno("inotify_init1 failed")
+        self._paths = {}
+        self._watches = {}
+
+    def _watch(self, directory):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            if ctypes.get_errno() in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return
+            _raise_errno(f"Could not watch '{directory}'")
+        self._paths[wd] = directory
+        self._watches[directory] = wd
+
+    def add_tree(self, root):
+        """
+        Watch root and everything below it. Returns the (dirpath, files, subdirs) listings, taken after
+        each watch is in place so that no file is missed in between.
+        """
+        return list(walk_tree(root, self._watch))
+
+    def remove_tree(self, root):
+        prefix = os.path.join(root, '')
+        for directory in [d for d in self._watches if d == root or d.startswith(prefix)]:
+            wd = self._watches.pop(directory)
+            self._paths.pop(wd, None)
+            # Fails harmlessly when the kernel already dropped the watch of a deleted directory
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def read_events(self, timeout):
+        """
+        Wait up to timeout seconds and return the (kind, path, is_dir) events that arrived.
+        A rename shows up as the removal of the old path and the addition of the new one.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+
+        events = []
+        while True:
+            try:
+                data = os.read(self._fd, 1 << 16)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].split(b'\0', 1)[0]
+                offset += _EVENT.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    events.append((RESCAN, None, True))
+                    continue
+                directory = self._paths.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    events.append((ADDED, path, bool(mask & IN_ISDIR)))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    events.append((REMOVED, path, bool(mask & IN_ISDIR)))
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+class PollingWatcher:
+    """
+    Fallback for systems without inotify: every interval, stat each known directory and list again
+    only those whose mtime changed. Costs one stat per directory per poll, nothing per file.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self._mtimes = {}
+        self._subdirs = {}
+        self._next_poll = time.monotonic() + interval
+
+    def _record_mtime(self, directory):
+        try:
+            self._mtimes[directory] = os.stat(directory).st_mtime_ns
+        except OSError:
+            pass
+
+    def add_tree(self, root):
+        listings = list(walk_tree(root, self._record_mtime))
+        for directory, _, subdirs in listings:
+            self._subdirs[directory] = set(subdirs)
+        return listings
+
+    def remove_tree(self, root):
+        prefix = os.path.join(root, '')
+        for directory in [d for d in self._mtimes if d == root or d.startswith(prefix)]:
+            del self._mtimes[directory]
+            self._subdirs.pop(directory, None)
+
+    def read_events(self, timeout):
+        wait = self._next_poll - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(wait, 0))
+        self._next_poll = time.monotonic() + self.interval
+
+        events = []
+        for directory, mtime_ns in list(self._mtimes.items()):
+            if directory not in self._mtimes:
+                continue
+            try:
+                current = os.stat(directory).st_mtime_ns
+                if current == mtime_ns:
+                    continue
+                self._mtimes[directory] = current
+                files, subdirs = list_directory(directory)
+            except OSError:
+                events.append((REMOVED, directory, True))
+                self.remove_tree(directory)
+                continue
+            events.append((LISTED, directory, files))
+            listed = set(subdirs)
+            known = self._subdirs.get(directory, set())
+            self._subdirs[directory] = listed
+            events += [(ADDED, subdir, True) for subdir in sorted(listed - known)]
+            events += [(REMOVED, subdir, True) for subdir in sorted(known - listed)]
+        return events
+
+    def close(self):
+        pass
+
+def load_library_paths(library_file, engine=ITERPARSE, path_filter=None):
+    """
+    {comparison key: first path} of a lib.xml (extracted, ISO tracks collapsed, filtered) or of a path list.
+    """
+    stats = {'kept': 0, 'filtered': 0}
+    if library_file.lower().endswith('.xml'):
+        pairs = keyed_library_paths(library_file, engine, CollapseStats(), stats, path_filter)
+    else:
+        pairs = iter_keyed(library_file, stats, path_filter)
+    library = {}
+    for key, path in pairs:
+        library.setdefault(key, path)
+    return library
+
+class InventoryWatcher:
+    """
+    Keep the inventory of directory current from filesystem events and diff it against a library.
+    start() loads the saved inventory and walks the tree once to set up watching, which also picks up
+    whatever changed while nothing was watching; after that, process() only touches what changed.
+    path_filter (an ExtensionFilter) drops files from the inventory the way it does from a scan
+    (default: keep every file), so inventory_file holds what file_searcher would write. The library
+    and the diff also leave out the default non-music types, as compare_json does.
+    """
+
+    def __init__(self, directory, inventory_file, library_file=None, engine=ITERPARSE, path_filter=None,
+                 poll_interval=None, output_dir='.'):
+        self.root = os.path.realpath(directory)
+        self.inventory_file = inventory_file
+        self.library_file = library_file
+        self.engine = engine
+        self.path_filter = path_filter
+        if path_filter is None:
+            self.diff_filter = DEFAULT_FILTER
+        else:
+            self.diff_filter = ExtensionFilter(EXCLUDED_EXTENSIONS + sorted(path_filter.exclude), path_filter.include)
+        self.poll_interval = poll_interval
+        self.library_only_file = os.path.join(output_dir, LIBRARY_ONLY_FILE)
+        self.disk_only_file = os.path.join(output_dir, DISK_ONLY_FILE)
+        self.diff = None
+        self.inventory = None
+        self.watcher = None
+        self.changes = 0
+
+    def _poll_interval(self):
+        return POLL_INTERVAL if self.poll_interval is None else self.poll_interval
+
+    def start(self):
+        if self.library_file:
+            print(f"Loading library {self.library_file}...")
+            self.diff = LibraryDiff(load_library_paths(self.library_file, self.engine, self.diff_filter),
+                                    self.diff_filter)
+        self.inventory = Inventory(self.diff, self.path_filter)
+
+        if os.path.exists(self.inventory_file):
+            for path in iter_paths(self.inventory_file):
+                self.inventory.add(path)
+            print(f"Loaded {len(self.inventory)} files from {self.inventory_file}")
+
+        if self.poll_interval is None:
+            try:
+                self.watcher = InotifyWatcher()
+            except OSError as e:
+                print(f"Warning: {e}; polling every {self._poll_interval():g}s instead")
+        if self.watcher is None:
+            self.watcher = PollingWatcher(self._poll_interval())
+
+        before = len(self.inventory)
+        try:
+            self.resync()
+        except OSError as e:
+            self._poll_instead(e)
+        print(f"Watching {self.root} with {type(self.watcher).__name__}: "
+              f"{len(self.inventory)} files ({len(self.inventory) - before:+d} since the saved inventory)")
+
+    def _poll_instead(self, error):
+        # Typically the inotify watch limit (ENOSPC) on a very large or growing tree
+        print(f"Warning: {error}; polling every {self._poll_interval():g}s instead")
+        self.watcher.close()
+        self.watcher = PollingWatcher(self._poll_interval())
+        self.resync()
+
+    def resync(self):
+        """
+        List the whole tree again and bring the inventory in line with it.
+        """
+        seen = set()
+        for directory, files, _ in self.watcher.add_tree(self.root):
+            seen.add(directory)
+            self.inventory.sync(directory, files)
+        for directory in [d for d in self.inventory.dirs if d not in seen]:
+            self.inventory.remove_tree(directory)
+
+    def process(self, timeout=1.0):
+        """
+        Apply the events that arrive within timeout seconds. Returns the number of events.
+        If watching a new directory fails, switches to polling and lists everything again.
+        """
+        events = self.watcher.read_events(timeout)
+        for kind, path, detail in events:
+            try:
+                self._apply(kind, path, detail)
+            except OSError as e:
+                if isinstance(self.watcher, PollingWatcher):
+                    raise
+                # The resync covers the remaining events too
+                self._poll_instead(e)
+                break
+        self.changes += len(events)
+        return len(events)
+
+    def _apply(self, kind, path, detail):
+        if kind == RESCAN:
+            print("Warning: filesystem events were lost, listing everything again")
+            self.resync()
+        elif kind == LISTED:
+            self.inventory.sync(path, detail)
+        elif detail:
+            if kind == ADDED:
+                for directory, files, _ in self.watcher.add_tree(path):
+                    self.inventory.sync(directory, files)
+            else:
+                self.watcher.remove_tree(path)
+                self.inventory.remove_tree(path)
+        elif kind == ADDED:
+            # Same rule as list_directory: regular files and links to them
+            if os.path.isfile(path):
+                self.inventory.add(path)
+        else:
+            self.inventory.remove(path)
+
+    def save(self):
+        """
+        Write the inventory to inventory_file, replacing it only once the new one is complete.
+        """
+        temporary = self.inventory_file + '.tmp'
+        write_paths(self.inventory, temporary, detect_format(self.inventory_file))
+        os.replace(temporary, self.inventory_file)
+
+    def emit_diff(self):
+        self.save()
+        message = f"{time.strftime('%H:%M:%S')} {len(self.inventory)} files, {self.changes} events since the last report"
+        if self.diff:
+            self.diff.write(self.library_only_file, self.disk_only_file)
+            message += (f"; only in library: {len(self.diff.only_in_library)}, "
+                        f"only on disk: {len(self.diff.only_on_disk)}")
+        print(message)
+        self.changes = 0
+
+    def close(self):
+        if self.watcher:
+            self.watcher.close()
+
+def watch(directory, inventory_file, library_file=None, diff_interval=None, poll_interval=None,
+          engine=ITERPARSE, path_filter=None):
+    """
+    Run until interrupted, keeping inventory_file and the only_in_* diff against library_file current.
+    The diff is written every diff_interval seconds and whenever the process receives SIGUSR1;
+    the inventory is saved on exit (Ctrl+C or SIGTERM).
+    """
+    watcher = InventoryWatcher(directory, inventory_file, library_file, engine, path_filter, poll_interval)
+    watcher.start()
+    watcher.emit_diff()
+
+    requested = False
+    stopping = False
+
+    def request_diff(signum, frame):
+        nonlocal requested
+        requested = True
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, request_diff)
+        print(f"Send SIGUSR1 (kill -USR1 {os.getpid()}) to write the diff now")
+    signal.signal(signal.SIGTERM, stop)
+
+    next_diff = time.monotonic() + diff_interval if diff_interval else None
+    try:
+        while not stopping:
+            watcher.process(1.0)
+            if requested or (next_diff and time.monotonic() >= next_diff):
+                requested = False
+                watcher.emit_diff()
+                if diff_interval:
+                    next_diff = time.monotonic() + diff_interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.save()
+        watcher.close()
+        print(f"Saved {len(watcher.inventory)} files to {inventory_file}")
@@ -0,0 +1,131 @@
+import os
+import json
+
+ORJSON = 'orjson'
+MSGSPEC = 'msgspec'
+STDLIB = 'json'
+
+# Fastest first; the FILESLIST_JSON environment variable can put another one in front
+PREFERENCE = (ORJSON, MSGSPEC, STDLIB)
+
+def _stdlib_dumps(value):
+    # ASCII escapes keep strings that can't be encoded as UTF-8 (undecodable POSIX names) round-tripping
+    return json.dumps(value, separators=(',', ':'))
+
+def _load_stdlib():
+    def dumps(value):
+        text = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        if not text.isascii():
+            try:
+                text.encode('utf-8')
+            except UnicodeEncodeError:
+                return _stdlib_dumps(value)
+        return text
+    return dumps, json.loads
+
+def _load_orjson():
+    import orjson
+    encode = orjson.dumps
+    decode = orjson.loads
+
+    def dumps(value):
+        try:
+            return encode(value).decode('utf-8')
+        except TypeError:
+            # orjson.JSONEncodeError: lone surrogates, integers over 64 bits
+            return _stdlib_dumps(value)
+
+    def loads(text):
+        try:
+            return decode(text)
+        except orjson.JSONDecodeError:
+            # Also raised for the \udcxx escapes _stdlib_dumps writes; json.loads accepts those
+            return json.loads(text)
+    return dumps, loads
+
+def _load_msgspec():
+    import msgspec
+    encode = msgspec.json.Encoder().encode
+    decode = msgspec.json.Decoder().decode
+
+    def dumps(value):
+        try:
+            return encode(value).decode('utf-8')
+        except (TypeError, UnicodeEncodeError, msgspec.EncodeError):
+            return _stdlib_dumps(value)
+
+    def loads(text):
+        try:
+            return decode(text)
+        except msgspec.DecodeError:
+            # Lone surrogate escapes from _stdlib_dumps; json.loads raises ValueError if the text is really invalid
+            return json.loads(text)
+    return dumps, loads
+
+LOADERS = {ORJSON: _load_orjson, MSGSPEC: _load_msgspec, STDLIB: _load_stdlib}
+
+def available():
+    """
+    Names of the backends that can be used here, fastest first.
+    """
+    names = []
+    for name in PREFERENCE:
+        try:
+            LOADERS[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+def use(name=None):
+    """
+    Switch every reader and writer to the named backend, or to the fastest installed one.
+    Returns the name of the backend in use. Raises ImportError if a named backend isn't installed.
+    dumps(value) returns compact JSON text; loads(text) raises ValueError on invalid input.
+    """
+    global backend, dumps, loads
+
+    if name is not None:
+        if name not in LOADERS:
+            raise ValueError(f"Unknown JSON backend '{name}', expected one of {', '.join(PREFERENCE)}")
+        candidates = [name]
+    else:
+        candidates = list(PREFERENCE)
+        requested = os.environ.get('FILESLIST_JSON')
+        if requested in LOADERS:
+            candidates.insert(0, requested)
+
+    for candidate in candidates:
+        try:
+            dumps, loads = LOADERS[candidate]()
+        except ImportError:
+            if name is not None:
+                raise
+            continue
+        backend = candidate
+        return backend
+
+def encoder():
+    """
+    The dumps function of the selected backend, for binding once outside a loop.
+    The backend is only imported on first use, so scripts that never touch JSON don't pay for it.
+    """
+    if backend is None:
+        use()
+    return dumps
+
+def decoder():
+    """
+    The loads function of the selected backend (see encoder).
+    """
+    if backend is None:
+        use()
+    return loads
+
+def dumps(value):
+    return encoder()(value)
+
+def loads(text):
+    return decoder()(text)
+
+backend = None
@@ -0,0 +1,148 @@
+import os
+from operator import itemgetter
+
+from compare_json import DEFAULT_FILTER, DISPLAY_LIMIT, DEFAULT_TIME_TOLERANCE
+from external_sort import external_sort, DEFAULT_MEMORY_LIMIT
+from extract_filenames import iter_library_records, LibraryRecord, ITERPARSE
+from file_searcher import iter_file_stats
+from path_keys import compute_key, split_iso_track, ISO_TRACK_SEPARATOR
+from path_stream import iter_paths, detect_format, PathWriter, NDJSON, SNAPSHOT
+from snapshot import Snapshot
+
+METADATA_DIFF_FILE = 'metadata_diff.ndjson'
+
+def library_records(source, engine=ITERPARSE):
+    """
+    LibraryRecords from a lib.xml, or from a list written by extract_filenames.py --metadata.
+    ISO/SACD track entries are collapsed into one record per image.
+    """
+    if source.lower().endswith('.xml'):
+        records = iter_library_records(source, engine=engine)
+    else:
+        records = map(LibraryRecord.from_dict, iter_paths(source))
+
+    images = set()
+    for record in records:
+        if ISO_TRACK_SEPARATOR in record.filename:
+            base, track = split_iso_track(record.filename)
+            if track is not None:
+                if base in images:
+                    continue
+                images.add(base)
+                record.filename = base
+        yield record
+
+def disk_entries(source, workers=1):
+    """
+    (path, size, mtime_ns) for every file, from a scan of a directory or from a snapshot written with stats.
+    """
+    if os.path.isdir(source):
+        return iter_file_stats(os.path.abspath(source), workers)
+    if detect_format(source) != SNAPSHOT:
+        raise ValueError(f"'{source}' is neither a directory nor a snapshot (.fls)")
+
+    def snapshot_entries():
+        with Snapshot(source) as snapshot:
+            if snapshot.sizes is None:
+                raise ValueError(f"'{source}' has no file sizes; write it with file_searcher.py --stat")
+            yield from snapshot.entries()
+    return snapshot_entries()
+
+def merge_rows(rows1, rows2):
+    """
+    Merge-join two streams of rows sorted by their first element, the key.
+    Yields (row1, row2) per key with None for a side that doesn't have it; repeated keys keep their first row.
+    """
+    iter1 = iter(rows1)
+    iter2 = iter(rows2)
+    row1 = next(iter1, None)
+    row2 = next(iter2, None)
+
+    while row1 is not None or row2 is not None:
+        if row2 is None or (row1 is not None and row1[0] < row2[0]):
+            yield row1, None
+            key, row1 = row1[0], next(iter1, None)
+        elif row1 is None or row2[0] < row1[0]:
+            yield None, row2
+            key, row2 = row2[0], next(iter2, None)
+        else:
+            yield row1, row2
+            key, row1, row2 = row1[0], next(iter1, None), next(iter2, None)
+        while row1 is not None and row1[0] == key:
+            row1 = next(iter1, None)
+        while row2 is not None and row2[0] == key:
+            row2 = next(iter2, None)
+
+def compare_metadata(library_source, disk_source, workers=1, engine=ITERPARSE, memory_limit=DEFAULT_MEMORY_LIMIT,
+                     time_tolerance=DEFAULT_TIME_TOLERANCE, path_filter=None, output_file=METADATA_DIFF_FILE):
+    """
+    Report library entries whose file on disk has a different size or modification time.
+    The library side is a lib.xml or an extract_filenames.py --metadata list; the disk side is a
+    directory, stat'ed while it is scanned, or a snapshot written with file_searcher.py --stat.
+    Both sides are sorted by path key (externally, within memory_limit) and compared in one merge pass;
+    differences are streamed to output_file as NDJSON. Returns the counts per outcome.
+    """
+    path_filter = DEFAULT_FILTER if path_filter is None else path_filter
+    accepts = path_filter.accepts
+
+    # Rows are (key, size, modified seconds, original path); sorted on the key alone because sizes may be None
+    library_rows = ((compute_key(r.filename), r.size, r.modified, r.filename)
+                    for r in library_records(library_source, engine) if accepts(r.filename))
+    disk_rows = ((compute_key(path), size, None if mtime_ns is None else mtime_ns // 10**9, path)
+                 for path, size, mtime_ns in disk_entries(disk_source, workers) if accepts(path))
+
+    print(f"Reading and sorting {library_source}...")
+    library_rows = external_sort(library_rows, key=itemgetter(0), memory_limit=memory_limit // 2)
+    print(f"Reading and sorting {disk_source}...")
+    disk_rows = external_sort(disk_rows, key=itemgetter(0), memory_limit=memory_limit // 2)
+
+    counts = dict.fromkeys(['matching', 'size', 'modified', 'unknown', 'only_library', 'only_disk'], 0)
+    shown = 0
+    print("Comparing sizes and modification times...")
+    with PathWriter(output_file, NDJSON) as writer:
+        for library_row, disk_row in merge_rows(library_rows, disk_rows):
+            if disk_row is None:
+                counts['only_library'] += 1
+                continue
+            if library_row is None:
+                counts['only_disk'] += 1
+                continue
+
+            _, library_size, library_modified, library_path = library_row
+            _, disk_size, disk_modified, disk_path = disk_row
+            if library_size is None or disk_size is None:
+                counts['unknown'] += 1
+                continue
+
+            changed = []
+            if library_size != disk_size:
+                changed.append('size')
+            if library_modified is not None and disk_modified is not None \
+                    and abs(library_modified - disk_modified) > time_tolerance:
+                changed.append('modified')
+            if not changed:
+                counts['matching'] += 1
+                continue
+
+            for reason in changed:
+                counts[reason] += 1
+            writer.write({'path': library_path, 'disk_path': disk_path, 'changed': changed,
+                          'library_size': library_size, 'disk_size': disk_size,
+                          'library_modified': library_modified, 'disk_modified': disk_modified})
+            shown += 1
+            if shown <= DISPLAY_LIMIT:
+                print(f"{'+'.join(changed)} differs: {library_path} "
+                      f"(library {library_size} bytes @ {library_modified}, disk {disk_size} bytes @ {disk_modified})")
+
+    print(f"\n{'='*80}")
+    print(f"METADATA COMPARISON RESULTS")
+    print(f"{'='*80}")
+    print(f"Matching size and date: {counts['matching']}")
+    print(f"Size differs: {counts['size']}")
+    print(f"Modification time differs (by more than {time_tolerance}s): {counts['modified']}")
+    print(f"No size recorded on one side: {counts['unknown']}")
+    print(f"Only in {library_source}: {counts['only_library']}")
+    print(f"Only in {disk_source}: {counts['only_disk']}")
+    if writer.count:
+        print(f"\nSaved {writer.count} changed entries to: {output_file}")
+    return counts
@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import time
+import heapq
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from file_searcher import search_files, RETRIES
+from scan_checkpoint import CHECKPOINT_INTERVAL
+from path_stream import PathWriter, iter_paths, detect_format, JSON, SNAPSHOT
+from snapshot import Snapshot
+
+MANIFEST_FILE = 'manifest.json'
+
+def partition_name(root, taken=()):
+    """
+    A file name stem for the partition of root: its path with separators and other
+    unsafe characters replaced by '_', numbered if another root already took it.
+    """
+    stem = re.sub(r'[^\w.-]+', '_', str(root)).strip('_') or 'root'
+    name, number = stem, 1
+    while name in taken:
+        number += 1
+        name = f"{stem}_{number}"
+    return name
+
+def group_by_device(roots):
+    """
+    Resolve roots and group them by the device they live on ({st_dev: [root, ...]}), dropping
+    roots nested inside another root. Returns (groups, errors) where errors maps each missing or
+    unusable root to a message.
+    """
+    resolved = []
+    errors = {}
+    for root in roots:
+        path = str(Path(root).resolve())
+        if not os.path.isdir(path):
+            errors[root] = 'not a directory' if os.path.exists(path) else 'does not exist'
+        elif path not in resolved:
+            resolved.append(path)
+
+    groups = {}
+    kept = []
+    for path in sorted(resolved):
+        if any(path.startswith(parent.rstrip(os.sep) + os.sep) for parent in kept):
+            errors[path] = 'inside another root'
+            continue
+        kept.append(path)
+        groups.setdefault(os.stat(path).st_dev, []).append(path)
+    return groups, errors
+
+def scan_roots(roots, partition_dir, output_file=None, workers=1, output_format=None,
+               path_filter=None, stats=False, quiet=False, resume=False,
+               checkpoint_interval=CHECKPOINT_INTERVAL, retries=RETRIES):
+    """
+    Scan several directories into one path list each under partition_dir, plus a manifest.json
+    describing them. Roots on the same device are scanned one after another and different devices
+    concurrently, so no disk serves two scans at once; workers is the number of listing threads
+    within each scan. With output_file, the partitions are also merged into one list in scan order.
+    resume, checkpoint_interval and retries apply to each partition as in search_files, so a
+    partition continues from its own checkpoint; quiet leaves only warnings and errors.
+    Returns the manifest, or None if a root failed to scan; the manifest is written either way and
+    records the error of each failed partition, and no merged output is written.
+    """
+    groups, errors = group_by_device(roots)
+    os.makedirs(partition_dir, exist_ok=True)
+    extension = os.path.splitext(output_file)[1] if output_file else '.json'
+
+    taken = set()
+    partitions = []
+    for device, group in groups.items():
+        for root in group:
+            name = partition_name(root, taken)
+            taken.add(name)
+            partitions.append({'root': root, 'device': device, 'file': name + extension})
+    for root, error in errors.items():
+        print(f"Skipping '{root}': {error}")
+
+    if not quiet:
+        print(f"Scanning {len(partitions)} directories on {len(groups)} device(s) into '{partition_dir}'")
+
+    def scan_device(device_partitions):
+        for partition in device_partitions:
+            start = time.perf_counter()
+            count = search_files(partition['root'], os.path.join(partition_dir, partition['file']), workers,
+                                 output_format, quiet=True, path_filter=path_filter, stats=stats, resume=resume,
+                                 checkpoint_interval=checkpoint_interval, retries=retries)
+            partition['seconds'] = round(time.perf_counter() - start, 3)
+            partition['count'] = count
+            if count is None:
+                partition['error'] = 'scan failed'
+
+    if partitions:
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            jobs = [pool.submit(scan_device, [p for p in partitions if p['device'] == device]) for device in groups]
+            for job in jobs:
+                job.result()
+
+    # Listed in scan order, which is the order the merged view interleaves them in
+    partitions.sort(key=lambda partition: partition['root'])
+    manifest = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'format': output_format or (detect_format(output_file) if output_file else JSON),
+        'stats': stats,
+        'partitions': partitions,
+        'skipped': errors,
+    }
+    manifest_file = os.path.join(partition_dir, MANIFEST_FILE)
+    with open(manifest_file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_file + '.tmp', manifest_file)
+
+    if not quiet:
+        total = sum(partition['count'] or 0 for partition in partitions)
+        print(f"Wrote {total} file paths in {len(partitions)} partitions; manifest: '{manifest_file}'")
+
+    failed = [partition for partition in partitions if partition['count'] is None]
+    if failed:
+        for partition in failed:
+            print(f"Error: scanning '{partition['root']}' failed; its partition is incomplete.")
+        if output_file:
+            print(f"Not writing the merged view '{output_file}' while partitions are missing.")
+        return None
+
+    if output_file:
+        with PathWriter(output_file, output_format, stats) as writer:
+            for entry in iter_merged(manifest_file, stats=stats):
+                if stats:
+                    writer.write(*entry)
+                else:
+                    writer.write(entry)
+        if not quiet:
+            print(f"Merged view: {writer.count} file paths in '{output_file}'")
+    return manifest
+
+def load_manifest(manifest_file):
+    """
+    Read a manifest written by scan_roots; a partition directory stands for its manifest.json.
+    """
+    if os.path.isdir(manifest_file):
+        manifest_file = os.path.join(manifest_file, MANIFEST_FILE)
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['dir'] = os.path.dirname(os.path.abspath(manifest_file))
+    return manifest
+
+def select_partitions(manifest, prefix=None):
+    """
+    The partitions that can hold paths under prefix (all of them without a prefix):
+    those whose root is inside prefix or contains it.
+    """
+    selected = []
+    for partition in manifest['partitions']:
+        root = partition['root'].rstrip(os.sep) + os.sep
+        if prefix is None or root.startswith(prefix) or prefix.startswith(root):
+            selected.append(partition)
+    return selected
+
+def _iter_partition(filename, fmt, stats):
+    if not stats:
+        yield from iter_paths(filename, fmt)
+    elif fmt == SNAPSHOT:
+        with Snapshot(filename) as snapshot:
+            yield from snapshot.entries()
+    else:
+        for path in iter_paths(filename, fmt):
+            yield path, None, None
+
+def iter_merged(manifest_file, prefix=None, stats=False):
+    """
+    Yield the paths of a partitioned scan as one list, in the order a single scan of all roots
+    would produce (directory, then file name). With prefix, only the partitions that can hold
+    matching paths are read, and only the matching paths are yielded. With stats, yields
+    (path, size, mtime_ns) tuples, with None where a partition has no stats.
+    Raises ValueError if a partition it needs failed to scan, rather than leaving its paths out.
+    """
+    manifest = load_manifest(manifest_file)
+    selected = select_partitions(manifest, prefix)
+    for partition in selected:
+        if partition.get('count') is None:
+            raise ValueError(f"Partition of '{partition['root']}' is incomplete: {partition.get('error', 'not scanned')}")
+    streams = [_iter_partition(os.path.join(manifest['dir'], partition['file']), manifest['format'], stats)
+               for partition in selected]
+    if stats:
+        merged = heapq.merge(*streams, key=lambda entry: os.path.split(entry[0]))
+    else:
+        merged = heapq.merge(*streams, key=os.path.split)
+
+    for entry in merged:
+        if prefix is None or (entry[0] if stats else entry).startswith(prefix):
+            yield entry
@@ -0,0 +1,96 @@
+import json
+
+# File types that are not part of the music library
+DEFAULT_EXCLUDED_EXTENSIONS = [
+    '.jpg', '.jpeg', '.log', '.txt', '.png', '.cue',
+    '.m3u', '.tif', '.bmp', '.md5', '.sfv', '.ffp',
+    '.pdf', '.m3u8', '.accurip', '.inf', '.exe', '.qdat', '.diz', '.mov', '.dir', '.ons'
+]
+
+def _normalize_extension(extension):
+    extension = extension.strip().lower()
+    return extension if extension.startswith('.') else '.' + extension
+
+class ExtensionFilter:
+    """
+    Keep or drop paths by extension (case-insensitive) with set lookups instead of testing every
+    extension with endswith. With include extensions, only those are kept; exclude always wins.
+    Multi-part extensions such as '.tar.gz' are supported.
+    """
+
+    def __init__(self, exclude=(), include=()):
+        self.exclude = frozenset(_normalize_extension(e) for e in exclude)
+        self.include = frozenset(_normalize_extension(e) for e in include)
+        # How many dots to look back from the end of a name
+        self._max_dots = max((e.count('.') for e in self.exclude | self.include), default=1)
+
+    def _suffixes(self, filename):
+        start = max(filename.rfind('/'), filename.rfind('\\')) + 1
+        end = len(filename)
+        for _ in range(self._max_dots):
+            end = filename.rfind('.', start, end)
+            if end < 0:
+                return
+            yield filename[end:].lower()
+
+    def accepts(self, filename):
+        """True if filename passes the filter. Works on bare names and full paths."""
+        if self._max_dots == 1:
+            # Common case: a single lookup of the last extension
+            start = max(filename.rfind('/'), filename.rfind('\\')) + 1
+            dot = filename.rfind('.', start)
+            extension = filename[dot:].lower() if dot >= 0 else ''
+            if extension in self.exclude:
+                return False
+            return not self.include or extension in self.include
+
+        suffixes = list(self._suffixes(filename))
+        if any(suffix in self.exclude for suffix in suffixes):
+            return False
+        return not self.include or any(suffix in self.include for suffix in suffixes)
+
+    __call__ = accepts
+
+    def describe(self):
+        parts = []
+        if self.include:
+            parts.append(f"keeping only {len(self.include)} file types: {', '.join(sorted(self.include))}")
+        if self.exclude:
+            parts.append(f"filtering out {len(self.exclude)} file types: {', '.join(sorted(self.exclude))}")
+        return '; '.join(parts) or 'no file type filter'
+
+    def lister(self, list_directory):
+        """
+        Wrap a list_directory(path) -> (files, subdirs) function so rejected files are dropped at scan time.
+        """
+        def filtered_list_directory(directory):
+            files, subdirs = list_directory(directory)
+            return [name for name in files if self.accepts(name)], subdirs
+        return filtered_list_directory
+
+def load_filter_config(filename):
+    """
+    Read {"exclude": [...], "include": [...]} from a JSON file.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return config.get('exclude', []), config.get('include', [])
+
+def add_filter_arguments(parser, default_exclude=()):
+    parser.add_argument("--exclude-ext", nargs='+', default=[], metavar="EXT", help="File extensions to leave out, e.g. .jpg .log.")
+    parser.add_argument("--include-ext", nargs='+', default=[], metavar="EXT", help="Only keep files with these extensions, e.g. .flac .dsf.")
+    parser.add_argument("--filter-config", metavar="FILE", help='JSON file with {"exclude": [...], "include": [...]} extension lists.')
+    if default_exclude:
+        parser.add_argument("--no-default-excludes", action="store_true", help=f"Don't exclude the {len(default_exclude)} default non-music file types.")
+
+def filter_from_args(args, default_exclude=()):
+    """
+    Build an ExtensionFilter from the options added by add_filter_arguments.
+    """
+    exclude = [] if getattr(args, 'no_default_excludes', False) else list(default_exclude)
+    include = []
+    if args.filter_config:
+        config_exclude, config_include = load_filter_config(args.filter_config)
+        exclude += config_exclude
+        include += config_include
+    return ExtensionFilter(exclude + args.exclude_ext, include + args.include_ext)
@@ -0,0 +1,62 @@
+import ntpath
+import unicodedata
+from functools import lru_cache
+
+# Number of recent keys remembered by path_key
+KEY_CACHE_SIZE = 1 << 17
+
+ISO_TRACK_SEPARATOR = ';'
+
+_LONG_PATH_PREFIX = '\\\\?\\'
+
+def compute_key(path):
+    """
+    Canonical comparison key for a path, the same on every platform:
+    Windows separators ('/' becomes '\\', duplicates and '.'/'..' collapsed), no \\\\?\\ prefix,
+    Unicode NFC and case folding, so drive letter case, '/' versus '\\' and precomposed versus
+    decomposed accents don't matter.
+    """
+    key = ntpath.normpath(path.replace('/', '\\'))
+    if key.startswith(_LONG_PATH_PREFIX) and key[5:6] == ':':
+        key = key[len(_LONG_PATH_PREFIX):]
+
+    if key.isascii():
+        return key.lower()
+    # Case folding can leave decomposed characters behind, so compose again afterwards
+    return unicodedata.normalize('NFC', unicodedata.normalize('NFC', key).casefold())
+
+# Memoized compute_key, for lookups where the same paths come up repeatedly
+path_key = lru_cache(maxsize=KEY_CACHE_SIZE)(compute_key)
+
+def path_keys(paths):
+    """
+    Batched keys for a stream of paths. Streams are usually seen once, so this skips the
+    path_key cache instead of filling it with entries that are never looked up again.
+    """
+    return map(compute_key, paths)
+
+def keyed_paths(paths):
+    """
+    Yield (key, path) pairs so later stages can compare by key without normalizing again.
+    """
+    for path in paths:
+        yield compute_key(path), path
+
+def split_iso_track(path):
+    """
+    Split an ISO/SACD track entry 'image.iso;3' into ('image.iso', 3).
+    Paths without a purely numeric ';N' suffix are returned as (path, None).
+    """
+    base, separator, suffix = path.rpartition(ISO_TRACK_SEPARATOR)
+    if separator and suffix.isdecimal():
+        return base, int(suffix)
+    return path, None
+
+def unquote_path(text):
+    """
+    Clean a path as exported to CSV: strip surrounding quotes and undo doubled backslashes.
+    """
+    text = text.strip()
+    if len(text) >= 2 and text.startswith('"') and text.endswith('"'):
+        text = text[1:-1]
+    return text.replace('\\\\', '\\')
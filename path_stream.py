@@ -0,0 +1,261 @@
+import os
+import re
+import csv
+import json
+
+import json_backend
+from snapshot import SnapshotWriter, Snapshot, SNAPSHOT_EXTENSION
+
+JSON = 'json'
+NDJSON = 'ndjson'
+CSV = 'csv'
+TEXT = 'text'
+SNAPSHOT = 'snapshot'
+
+FORMATS = (JSON, NDJSON, CSV, TEXT, SNAPSHOT)
+
+CSV_HEADER = 'File Path'
+
+CHUNK_SIZE = 1 << 16
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+def detect_format(filename):
+    """
+    Pick the path list format from the file extension (.json, .ndjson/.jsonl, .csv, .fls snapshot,
+    anything else is text).
+    """
+    lower = filename.lower()
+    if lower.endswith(SNAPSHOT_EXTENSION):
+        return SNAPSHOT
+    if lower.endswith(('.ndjson', '.jsonl')):
+        return NDJSON
+    if lower.endswith('.json'):
+        return JSON
+    if lower.endswith('.csv'):
+        return CSV
+    return TEXT
+
+class PathWriter:
+    """
+    Write paths to a file one at a time, so the full list never has to be held in memory.
+    JSON output is a compact array with one entry per line; NDJSON has one JSON value per line;
+    CSV has a 'File Path' header; text has one raw path per line; a snapshot is the binary
+    format from snapshot.py, which can also keep the size and mtime of each file (with stats).
+    resume=(offset, count) continues a text-based file that held count entries at offset (see sync),
+    dropping anything written after that point.
+    """
+
+    def __init__(self, filename, fmt=None, stats=False, resume=None):
+        self.filename = filename
+        self.format = fmt or detect_format(filename)
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown output format '{self.format}'")
+        self.count = 0
+        # Only JSON output needs the encoder, and importing a fast backend takes a few milliseconds
+        self._dumps = json_backend.encoder() if self.format in (JSON, NDJSON) else None
+        if self.format == SNAPSHOT:
+            if resume is not None:
+                raise ValueError("Snapshots can't be resumed")
+            self._file = SnapshotWriter(filename, stats)
+            return
+
+        mode = 'w'
+        if resume is not None:
+            offset, self.count = resume
+            os.truncate(filename, offset)
+            mode = 'a'
+        self._file = open(filename, mode, encoding='utf-8', newline='' if self.format == CSV else None)
+
+        if self.format == CSV:
+            self._csv = csv.writer(self._file, lineterminator='\n')
+        if resume is not None:
+            return
+        if self.format == JSON:
+            self._file.write('[')
+        elif self.format == CSV:
+            self._csv.writerow([CSV_HEADER])
+
+    def write(self, path, size=None, mtime_ns=None):
+        """
+        Write one entry. size and mtime_ns are only recorded by snapshots written with stats.
+        """
+        if self.format == SNAPSHOT:
+            self._file.write(path, size, mtime_ns)
+        elif self.format == JSON:
+            self._file.write(',\n' if self.count else '\n')
+            self._file.write(self._dumps(path))
+        elif self.format == NDJSON:
+            self._file.write(self._dumps(path) + '\n')
+        elif self.format == CSV:
+            self._csv.writerow([path])
+        else:
+            self._file.write(path + '\n')
+        self.count += 1
+
+    def write_all(self, paths):
+        for path in paths:
+            self.write(path)
+
+    def sync(self):
+        """
+        Flush everything written so far to disk and return the file size, which a later
+        PathWriter(..., resume=(size, count)) can continue from. Not available for snapshots.
+        """
+        if self.format == SNAPSHOT:
+            raise ValueError("Snapshots are only complete once closed")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        if self.format == SNAPSHOT:
+            self._file.close()
+            return
+        if self._file.closed:
+            return
+        if self.format == JSON:
+            self._file.write('\n]\n' if self.count else ']\n')
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def write_paths(paths, filename, fmt=None):
+    """
+    Stream an iterable of paths to filename. Returns the number of entries written.
+    """
+    with PathWriter(filename, fmt) as writer:
+        writer.write_all(paths)
+    return writer.count
+
+def iter_paths(filename, fmt=None):
+    """
+    Read entries back from a file written by PathWriter (or any JSON array, NDJSON, CSV or text list)
+    one at a time, without loading the whole file.
+    """
+    fmt = fmt or detect_format(filename)
+
+    if fmt == SNAPSHOT:
+        with Snapshot(filename) as snapshot:
+            yield from snapshot
+        return
+
+    with open(filename, 'r', encoding='utf-8', newline='' if fmt == CSV else None) as f:
+        if fmt == JSON:
+            yield from _iter_json_values(f)
+        elif fmt == NDJSON:
+            loads = json_backend.decoder()
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield loads(line)
+        elif fmt == CSV:
+            reader = csv.reader(f)
+            next(reader, None)  # Skip header
+            for row in reader:
+                if row:
+                    yield row[0]
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+class _NotOnePerLine(Exception):
+    pass
+
+def _iter_json_lines(f):
+    """
+    Decode a JSON array laid out with one element per line, as PathWriter and json.dump(indent=...)
+    write flat lists, handing each line to the fast backend. Raises _NotOnePerLine at the first
+    line that doesn't fit that layout.
+    """
+    loads = json_backend.decoder()
+    opened = False
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if not opened:
+            if line != '[':
+                raise _NotOnePerLine
+            opened = True
+            continue
+        if line == ']':
+            return
+        if line[-1] == ',':
+            line = line[:-1]
+        try:
+            value = loads(line)
+        except ValueError:
+            raise _NotOnePerLine from None
+        yield value
+    raise _NotOnePerLine
+
+def _iter_json_values(f):
+    """
+    Elements of a top-level JSON array: line by line when the layout allows it, otherwise with
+    the chunked decoder, skipping whatever the line-based pass already produced.
+    """
+    count = 0
+    try:
+        for value in _iter_json_lines(f):
+            yield value
+            count += 1
+        return
+    except _NotOnePerLine:
+        pass
+
+    f.seek(0)
+    values = _iter_json_array(f)
+    for _ in range(count):
+        next(values)
+    yield from values
+
+def _iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """
+    Incrementally decode the elements of a top-level JSON array, reading the file in chunks.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError(f"{getattr(f, 'name', 'input')} does not contain a JSON array")
+                started = True
+                pos += 1
+                continue
+
+            if buffer[pos] == ']':
+                return
+
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+
+            # A value that ends exactly at the buffer end may continue in the next chunk
+            if end is not None and (end < len(buffer) or eof):
+                yield value
+                pos = end
+                continue
+        elif eof:
+            raise ValueError(f"Unexpected end of JSON array in {getattr(f, 'name', 'input')}")
+
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
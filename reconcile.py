@@ -0,0 +1,110 @@
+import os
+import time
+
+from extract_filenames import iter_library_items, ENGINES, ITERPARSE
+from collapse_tracks import collapse_iso_paths, CollapseStats
+from compare_json import (filter_excluded, merge_join, write_merge_results, print_results, pair_key, pair_path,
+                          EXCLUDED_EXTENSIONS, DEFAULT_FILTER)
+from file_searcher import iter_file_paths
+from external_sort import external_sort, DEFAULT_MEMORY_LIMIT
+from path_keys import keyed_paths
+from path_filter import add_filter_arguments, filter_from_args
+
+LIBRARY_ONLY_FILE = 'only_in_lib.txt'
+DISK_ONLY_FILE = 'only_in_file_paths.txt'
+
+def keyed_library_paths(xml_file, engine, collapse_stats, stats, path_filter=None):
+    """
+    Library side of the pipeline: extract Filename -> collapse ISO tracks -> filter -> (key, path) pairs.
+    """
+    filenames = (values[0] for values in iter_library_items(xml_file, engine=engine) if values[0])
+    return keyed_paths(filter_excluded(collapse_iso_paths(filenames, collapse_stats), stats, path_filter))
+
+def keyed_disk_paths(directory, workers, stats, path_filter=None):
+    """
+    Disk side of the pipeline: scan -> filter -> (key, path) pairs.
+    """
+    return keyed_paths(filter_excluded(iter_file_paths(directory, workers), stats, path_filter))
+
+def _timed_sort(pairs, memory_limit):
+    start = time.perf_counter()
+    sorted_pairs = external_sort(pairs, key=pair_key, memory_limit=memory_limit)
+    return sorted_pairs, time.perf_counter() - start
+
+def reconcile(xml_file, directory, output_dir='.', workers=1, engine=ITERPARSE, memory_limit=DEFAULT_MEMORY_LIMIT,
+              path_filter=None):
+    """
+    Compare a JRiver lib.xml against the files on disk in one run, without intermediate files.
+    The XML parse and the disk scan run at the same time, each feeding its own external sort;
+    the two sorted streams are then merge-joined and the differences written to
+    only_in_lib.txt and only_in_file_paths.txt in output_dir, as the paths each side spelled them.
+    path_filter (an ExtensionFilter) replaces the default EXCLUDED_EXTENSIONS filter on both sides.
+    """
+    if not os.path.isfile(xml_file):
+        print(f"Error: Library file '{xml_file}' does not exist.")
+        return None
+
+    from pathlib import Path
+    from concurrent.futures import ThreadPoolExecutor
+
+    directory_path = Path(directory).resolve()
+    if not directory_path.is_dir():
+        print(f"Error: '{directory}' is not a directory.")
+        return None
+
+    path_filter = DEFAULT_FILTER if path_filter is None else path_filter
+    print(f"{path_filter.describe().capitalize()}...")
+    print(f"Parsing {xml_file} and scanning {directory_path} in parallel...")
+
+    collapse_stats = CollapseStats()
+    library_stats = {'kept': 0, 'filtered': 0}
+    disk_stats = {'kept': 0, 'filtered': 0}
+    start = time.perf_counter()
+
+    # Each side gets half of the memory budget since both sorts fill up at the same time
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        library_future = pool.submit(_timed_sort, keyed_library_paths(xml_file, engine, collapse_stats, library_stats, path_filter),
+                                     memory_limit // 2)
+        disk_future = pool.submit(_timed_sort, keyed_disk_paths(directory_path, workers, disk_stats, path_filter),
+                                  memory_limit // 2)
+        sorted_library, library_seconds = library_future.result()
+        sorted_disk, disk_seconds = disk_future.result()
+
+    print(f"Library: {library_seconds:.1f}s, disk: {disk_seconds:.1f}s, both done after {time.perf_counter() - start:.1f}s")
+    print(f"Collapsed {collapse_stats.collapsed} ISO/SACD track entries into {len(collapse_stats.tracks)} images")
+    print(f"Filtered out {library_stats['filtered']} files from {xml_file}")
+    print(f"Filtered out {disk_stats['filtered']} files from {directory_path}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    counts, previews, saved = write_merge_results(merge_join(sorted_library, sorted_disk, key=pair_key),
+                                                  os.path.join(output_dir, LIBRARY_ONLY_FILE),
+                                                  os.path.join(output_dir, DISK_ONLY_FILE), pair_path)
+
+    print_results(xml_file, str(directory_path), library_stats['kept'], disk_stats['kept'], counts[0],
+                  counts[1], counts[2], previews[1], previews[2])
+
+    if 1 in saved:
+        print(f"\nSaved entries only in {xml_file} to: {saved[1]}")
+    if 2 in saved:
+        print(f"Saved entries only in {directory_path} to: {saved[2]}")
+    return counts
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reconcile a JRiver lib.xml with the files on disk in a single streaming pass.")
+    parser.add_argument("xml_file", nargs='?', default="lib.xml", help="The library XML export (default: lib.xml).")
+    parser.add_argument("directory", nargs='?', default=".", help="The music folder to scan (default: current directory).")
+    parser.add_argument("-o", "--output-dir", default=".", help="Where to write only_in_lib.txt and only_in_file_paths.txt (default: current directory).")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of threads listing directories in parallel (default: 1).")
+    parser.add_argument("--engine", choices=ENGINES, default=ITERPARSE, help="XML extraction engine (default: iterparse).")
+    parser.add_argument("--memory-limit", type=int, default=DEFAULT_MEMORY_LIMIT // 2**20, help="Total memory budget in MB for sorting both sides (default: %(default)s).")
+    add_filter_arguments(parser, EXCLUDED_EXTENSIONS)
+
+    args = parser.parse_args(argv)
+
+    reconcile(args.xml_file, args.directory, args.output_dir, args.workers, args.engine, args.memory_limit * 2**20,
+              filter_from_args(args, EXCLUDED_EXTENSIONS))
+
+if __name__ == '__main__':
+    main()
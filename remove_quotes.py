@@ -1,4 +1,4 @@
-import csv
+from path_keys import unquote_path
 
 def fix_backslashes_in_csv(input_csv, output_csv):
     """
@@ -14,13 +14,9 @@ def fix_backslashes_in_csv(input_csv, output_csv):
     
     # Skip header
     for line in lines[1:]:
-        line = line.strip()
+        # Remove quotes if present and replace double backslashes with single backslashes
+        line = unquote_path(line)
         if line:
-            # Remove quotes if present
-            if line.startswith('"') and line.endswith('"'):
-                line = line[1:-1]
-            # Replace double backslashes with single backslashes
-            line = line.replace('\\\\', '\\')
             filenames.append(line)
     
     print(f"Total filenames: {len(filenames)}")
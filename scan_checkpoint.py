@@ -0,0 +1,93 @@
+import os
+import json
+import time
+
+CHECKPOINT_SUFFIX = '.checkpoint'
+
+# Seconds between checkpoints of a running scan
+CHECKPOINT_INTERVAL = 30.0
+
+def resume_lister(lister, last_dir):
+    """
+    Wrap a list_directory(path) function to continue a scan that completed every directory up to
+    last_dir in sorted order. Directories sort after all of their ancestors, so a directory at or
+    before last_dir has already had its files written: it is listed only for its subdirectories,
+    and skipped entirely when its whole subtree sorts before last_dir.
+    """
+    sep = os.sep
+
+    def resumed_list_directory(directory):
+        if directory > last_dir:
+            return lister(directory)
+        prefix = directory if directory.endswith(sep) else directory + sep
+        # Every path under prefix sorts before last_dir unless last_dir is itself under it or
+        # sorts between directory and prefix (a sibling like 'a b' between 'a' and 'a/')
+        if prefix < last_dir and not last_dir.startswith(prefix):
+            return [], []
+        _, subdirs = lister(directory)
+        return [], subdirs
+    return resumed_list_directory
+
+class ScanCheckpoint:
+    """
+    Periodic record of how far a scan has got: the last directory whose files are all in the output,
+    the number of entries written and the output size at that point. Resuming truncates the output
+    to that size and continues after that directory. The checkpoint is kept next to the output
+    (output + '.checkpoint') and only matches a scan of the same root into the same output.
+    """
+
+    def __init__(self, output_file, root, fmt, stats=False, path_filter=None, interval=CHECKPOINT_INTERVAL):
+        self.filename = output_file + CHECKPOINT_SUFFIX
+        self.output_file = output_file
+        self.interval = interval
+        self.scan = {
+            'root': str(root),
+            'output': os.path.abspath(output_file),
+            'format': fmt,
+            'stats': stats,
+            'filter': path_filter.describe() if path_filter is not None else None,
+        }
+        self.saved = None
+        self._next_save = time.monotonic() + interval
+
+    def load(self):
+        """
+        Return the saved state if it belongs to this scan and the output still holds everything it
+        covers, otherwise None.
+        """
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or any(state.get(name) != value for name, value in self.scan.items()):
+            return None
+        try:
+            if os.path.getsize(self.output_file) < state['offset']:
+                return None
+        except (OSError, KeyError, TypeError):
+            return None
+        self.saved = state
+        return state
+
+    def due(self):
+        return time.monotonic() >= self._next_save
+
+    def save(self, writer, last_dir):
+        """
+        Flush the output to disk and record that everything up to last_dir is in it.
+        """
+        offset = writer.sync()
+        state = dict(self.scan, last_dir=last_dir, count=writer.count, offset=offset, saved_at=time.time())
+        temp_file = self.filename + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.filename)
+        self.saved = state
+        self._next_save = time.monotonic() + self.interval
+
+    def remove(self):
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,104 @@
+import os
+import time
+import sqlite3
+import threading
+
+# Directories modified this close to the scan start are not cached: another change
+# within the filesystem's timestamp granularity would leave the mtime unchanged.
+RACY_WINDOW_NS = 2_000_000_000
+
+COMMIT_EVERY = 5000
+
+class ScanIndex:
+    """
+    Persistent SQLite index of each directory's mtime and listing.
+    A rescan only stats directories whose mtime is unchanged instead of listing them again.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.hits = 0
+        self.misses = 0
+        self._visited = set()
+        self._pending_writes = 0
+        self._scan_start_ns = time.time_ns()
+        self._lock = threading.Lock()
+        # Listings can come from several scanner threads; every access goes through the lock
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS directories ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, files TEXT NOT NULL, subdirs TEXT NOT NULL)"
+        )
+
+    def lister(self, list_directory):
+        """
+        Wrap a list_directory(path) -> (files, subdirs) function so unchanged directories come from the index.
+        """
+        def cached_list_directory(directory):
+            return self.list_directory(directory, list_directory)
+        return cached_list_directory
+
+    def list_directory(self, directory, list_directory):
+        """
+        Return (files, subdirs) for directory, calling list_directory only if its mtime changed.
+        """
+        mtime_ns = os.stat(directory).st_mtime_ns
+
+        with self._lock:
+            self._visited.add(directory)
+            row = self._db.execute(
+                "SELECT mtime_ns, files, subdirs FROM directories WHERE path = ?", (directory,)
+            ).fetchone()
+
+        if row is not None and row[0] == mtime_ns:
+            with self._lock:
+                self.hits += 1
+            return _split_names(row[1]), [os.path.join(directory, name) for name in _split_names(row[2])]
+
+        files, subdirs = list_directory(directory)
+
+        with self._lock:
+            self.misses += 1
+            if mtime_ns < self._scan_start_ns - RACY_WINDOW_NS:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO directories (path, mtime_ns, files, subdirs) VALUES (?, ?, ?, ?)",
+                    (directory, mtime_ns, '\0'.join(files), '\0'.join(os.path.basename(d) for d in subdirs)),
+                )
+            else:
+                self._db.execute("DELETE FROM directories WHERE path = ?", (directory,))
+            self._pending_writes += 1
+            if self._pending_writes >= COMMIT_EVERY:
+                self._db.commit()
+                self._pending_writes = 0
+
+        return files, subdirs
+
+    def prune(self, root):
+        """
+        Drop entries under root that were not visited by this scan (deleted or unreadable directories).
+        Only call this after a complete scan of root.
+        """
+        root = str(root)
+        prefix = os.path.join(root, '')
+        with self._lock:
+            stale = [
+                (path,) for (path,) in self._db.execute("SELECT path FROM directories")
+                if (path == root or path.startswith(prefix)) and path not in self._visited
+            ]
+            self._db.executemany("DELETE FROM directories WHERE path = ?", stale)
+        return len(stale)
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def _split_names(joined):
+    # NUL can't appear in file names, so it separates the stored names
+    return joined.split('\0') if joined else []
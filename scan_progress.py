@@ -0,0 +1,123 @@
+import sys
+import json
+import time
+import heapq
+import threading
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+class ScanProgress:
+    """
+    Throttled progress reporting and metrics for a scan.
+    Prints at most one status line per interval (dirs/sec, files/sec, elapsed, ETA when the
+    expected file count is known) and keeps per-phase timings and the slowest directories.
+    """
+
+    def __init__(self, interval=2.0, expected_files=None, slowest=10, enabled=True, stream=None):
+        self.interval = interval
+        self.expected_files = expected_files
+        self.enabled = enabled
+        self.stream = stream or sys.stderr
+        self.directories = 0
+        self.files = 0
+        self.phases = {}
+        self._slowest_count = slowest
+        self._slowest = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._last_report = self._start
+        self._phase = None
+        self._phase_start = None
+
+    def timed(self, lister):
+        """
+        Wrap a list_directory(path) function to count and time each directory listing.
+        Safe to call from scanner worker threads.
+        """
+        def timed_list_directory(directory):
+            start = time.perf_counter()
+            try:
+                return lister(directory)
+            finally:
+                self.directory_listed(directory, time.perf_counter() - start)
+        return timed_list_directory
+
+    def directory_listed(self, directory, seconds):
+        with self._lock:
+            self.directories += 1
+            entry = (seconds, directory)
+            if len(self._slowest) < self._slowest_count:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def add_files(self, count):
+        self.files += count
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def start_phase(self, name):
+        self.end_phase()
+        self._phase = name
+        self._phase_start = time.perf_counter()
+
+    def end_phase(self):
+        if self._phase is not None:
+            elapsed = time.perf_counter() - self._phase_start
+            self.phases[self._phase] = self.phases.get(self._phase, 0.0) + elapsed
+            self._phase = None
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def report(self):
+        if not self.enabled:
+            return
+        elapsed = self.elapsed
+        rate = self.files / elapsed if elapsed else 0.0
+        line = (f"Scanned {self.directories} dirs ({self.directories / elapsed if elapsed else 0.0:.0f}/s), "
+                f"{self.files} files ({rate:.0f}/s), elapsed {format_duration(elapsed)}")
+        if self.expected_files and rate:
+            remaining = max(self.expected_files - self.files, 0)
+            line += f", ETA {format_duration(remaining / rate)}"
+        print(line, file=self.stream, flush=True)
+
+    def summary(self, **extra):
+        """
+        Return the final metrics as a JSON-serializable dict.
+        """
+        self.end_phase()
+        elapsed = self.elapsed
+        metrics = {
+            'directories': self.directories,
+            'files': self.files,
+            'elapsed_seconds': round(elapsed, 3),
+            'dirs_per_second': round(self.directories / elapsed, 1) if elapsed else None,
+            'files_per_second': round(self.files / elapsed, 1) if elapsed else None,
+            'phases': {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            'slowest_directories': [
+                {'path': directory, 'seconds': round(seconds, 4)}
+                for seconds, directory in sorted(self._slowest, reverse=True)
+            ],
+        }
+        metrics.update(extra)
+        return metrics
+
+    def write_metrics(self, filename, **extra):
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(**extra), f, ensure_ascii=False, indent=2)
+
+def previous_file_count(metrics_file):
+    """
+    Read the file count from an earlier metrics summary, used as the expected total for the ETA.
+    """
+    try:
+        with open(metrics_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('files')
+    except (OSError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,245 @@
+import os
+import sys
+import mmap
+import struct
+from array import array
+
+SNAPSHOT_EXTENSION = '.fls'
+
+MAGIC = b'FLSNAP\x00\x01'
+VERSION = 1
+
+# Header flag: the snapshot has size and mtime columns
+HAS_STATS = 1
+
+# Size or mtime of a file that could not be stat'ed
+UNKNOWN = -1
+
+# magic, version, flags, file count, directory count, then the offsets of the sections:
+# file names, directory names, directory name offsets, file directories, file name offsets, sizes, mtimes
+_HEADER = struct.Struct('<8sII2Q7Q')
+
+_ALIGNMENT = 8
+
+def _split(path):
+    # The directory keeps its trailing separator so directory + name gives back the exact path
+    cut = max(path.rfind('/'), path.rfind('\\')) + 1
+    return path[:cut], path[cut:]
+
+def _encode(text):
+    # surrogateescape round-trips file names that are not valid UTF-8 on POSIX
+    return text.encode('utf-8', 'surrogateescape')
+
+def _write_array(f, values):
+    # Columns are stored little-endian
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    values.tofile(f)
+
+class SnapshotWriter:
+    """
+    Stream paths into a binary snapshot. File names go straight to disk; the directory table and
+    the fixed-width columns (directory index and name offset per file, optional size and mtime)
+    are kept as compact arrays and written at close, when the header is filled in.
+    Each directory prefix is stored once instead of once per file.
+    """
+
+    def __init__(self, filename, stats=False):
+        self.filename = filename
+        self.stats = stats
+        self.count = 0
+        self._directories = {}
+        self._file_dirs = array('I')
+        self._name_offsets = array('Q', [0])
+        self._sizes = array('q')
+        self._mtimes = array('q')
+        self._names_size = 0
+        self._file = open(filename, 'wb')
+        self._file.write(bytes(_HEADER.size))
+
+    def write(self, path, size=None, mtime_ns=None):
+        directory, name = _split(path)
+        index = self._directories.get(directory)
+        if index is None:
+            index = self._directories[directory] = len(self._directories)
+        name = _encode(name)
+        self._file.write(name)
+        self._names_size += len(name)
+        self._file_dirs.append(index)
+        self._name_offsets.append(self._names_size)
+        if self.stats:
+            self._sizes.append(UNKNOWN if size is None else size)
+            self._mtimes.append(UNKNOWN if mtime_ns is None else mtime_ns)
+        self.count += 1
+
+    def _align(self):
+        padding = -self._file.tell() % _ALIGNMENT
+        self._file.write(bytes(padding))
+        return self._file.tell()
+
+    def close(self):
+        if self._file.closed:
+            return
+        f = self._file
+        offsets = [_HEADER.size]
+
+        # Directory names in index order (dicts keep insertion order)
+        offsets.append(self._align())
+        directory_offsets = array('Q', [0])
+        for directory in self._directories:
+            encoded = _encode(directory)
+            f.write(encoded)
+            directory_offsets.append(directory_offsets[-1] + len(encoded))
+
+        for column in (directory_offsets, self._file_dirs, self._name_offsets):
+            offsets.append(self._align())
+            _write_array(f, column)
+
+        for column in (self._sizes, self._mtimes):
+            offsets.append(self._align() if self.stats else 0)
+            if self.stats:
+                _write_array(f, column)
+
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, HAS_STATS if self.stats else 0,
+                             self.count, len(self._directories), *offsets))
+        f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class Snapshot:
+    """
+    Read a snapshot through mmap. Opening only reads the header; columns are views into the
+    mapped file and names are decoded when an entry is accessed, so single entries can be
+    looked up without parsing the whole file. Iterating yields full paths in the order written.
+    sizes and mtimes are sequences (UNKNOWN for files that could not be stat'ed), or None.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        self._views = []
+        try:
+            if os.fstat(self._file.fileno()).st_size < _HEADER.size:
+                raise ValueError(f"{filename} is not a path snapshot")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, flags, count, directory_count, *offsets = _HEADER.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise ValueError(f"{filename} is not a path snapshot")
+            if version != VERSION:
+                raise ValueError(f"{filename} has unsupported snapshot version {version}")
+        except Exception:
+            self.close()
+            raise
+
+        names, directory_names, directory_offsets, file_dirs, name_offsets, sizes, mtimes = offsets
+        self._count = count
+        self._directory_offsets = self._column('Q', directory_offsets, directory_count + 1)
+        self._file_dirs = self._column('I', file_dirs, count)
+        self._name_offsets = self._column('Q', name_offsets, count + 1)
+        self._names = self._bytes(names, self._name_offsets[count])
+        self._directory_names = self._bytes(directory_names, self._directory_offsets[directory_count])
+        self.sizes = self._column('q', sizes, count) if flags & HAS_STATS else None
+        self.mtimes = self._column('q', mtimes, count) if flags & HAS_STATS else None
+        # Decoded on first use
+        self._directories = [None] * directory_count
+
+    def _bytes(self, offset, length):
+        view = memoryview(self._mmap)[offset:offset + length]
+        self._views.append(view)
+        return view
+
+    def _column(self, typecode, offset, length):
+        width = array(typecode).itemsize
+        view = self._bytes(offset, length * width)
+        if sys.byteorder == 'big':
+            values = array(typecode, view.tobytes())
+            values.byteswap()
+            return values
+        column = view.cast(typecode)
+        self._views.append(column)
+        return column
+
+    def __len__(self):
+        return self._count
+
+    def directory(self, index):
+        directory = self._directories[index]
+        if directory is None:
+            start, end = self._directory_offsets[index], self._directory_offsets[index + 1]
+            directory = self._directories[index] = str(self._directory_names[start:end], 'utf-8', 'surrogateescape')
+        return directory
+
+    def directories(self):
+        """
+        All distinct directory prefixes, in the order they were first seen.
+        """
+        return [self.directory(i) for i in range(len(self._directories))]
+
+    def name(self, index):
+        return str(self._names[self._name_offsets[index]:self._name_offsets[index + 1]], 'utf-8', 'surrogateescape')
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('snapshot index out of range')
+        return self.directory(self._file_dirs[index]) + self.name(index)
+
+    def __iter__(self):
+        names, name_offsets, file_dirs = self._names, self._name_offsets, self._file_dirs
+        directory = self.directory
+        start = 0
+        for i in range(self._count):
+            end = name_offsets[i + 1]
+            yield directory(file_dirs[i]) + str(names[start:end], 'utf-8', 'surrogateescape')
+            start = end
+
+    def entries(self):
+        """
+        Yield (path, size, mtime_ns) for every file; size and mtime_ns are None when not recorded.
+        """
+        for i, path in enumerate(self):
+            if self.sizes is None or self.sizes[i] == UNKNOWN:
+                yield path, None, None
+            else:
+                yield path, self.sizes[i], self.mtimes[i]
+
+    def close(self):
+        # Views into the map must be released before it can be closed
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if getattr(self, '_mmap', None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a path list to or from a binary snapshot (.fls).")
+    parser.add_argument("input", help="Path list to read (.json, .ndjson, .csv, .fls or text).")
+    parser.add_argument("output", help="Path list to write; the format follows the extension.")
+
+    args = parser.parse_args(argv)
+
+    from path_stream import write_paths, iter_paths
+
+    count = write_paths(iter_paths(args.input), args.output)
+    print(f"Wrote {count} paths to {args.output} "
+          f"({os.path.getsize(args.input):,} -> {os.path.getsize(args.output):,} bytes)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import os
+
+# Name parts for realistic=True: non-Latin scripts, accents and the punctuation real tags contain
+# (only characters that are valid in Windows file names)
+GENRES = ['Rock', 'Классика', 'Jazz & Blues', 'Électronique', 'Pop (80s)', 'Русский рок']
+ARTIST_NAMES = ['ABBA', 'Кино', 'Sigur Rós', "Guns N' Roses", 'Mötley Crüe', 'AC-DC', 'Аквариум',
+                'Godspeed You! Black Emperor', 'Sunn O)))', '!!!', 'Björk', 'Ляпис Трубецкой',
+                "The B-52's", 'Belle & Sebastian', 'Jean-Michel Jarre', 'ДДТ']
+ALBUM_TITLES = ['Arrival', 'Группа крови', 'Ágætis byrjun', '...And Justice for All', 'Hits, Vol. 1',
+                'Live [Remastered]', 'Ночь', "Don't Stop", 'Nr. 5 (Deluxe Edition)', 'Чёрный альбом']
+TRACK_TITLES = ['Intro', 'Звезда по имени Солнце', 'Svefn-g-englar', "Rock 'n' Roll", 'Part II - The Return',
+                'Ça plane pour moi', 'Лето', '#1 Crush', 'Untitled (Bonus Track)', '1, 2, 3, 4',
+                'Перемен!', 'Hey; Jude', 'Señorita', '100% Pure Love', 'Song #9 {Demo}', 'Ёжик в тумане']
+
+def _realistic_names(artist, album, track):
+    """
+    Genre, artist, album and track file names for the realistic layout. Numbers keep them unique.
+    """
+    return (GENRES[artist % len(GENRES)],
+            f"{ARTIST_NAMES[artist % len(ARTIST_NAMES)]} {artist:05d}",
+            f"{1960 + album} - {ALBUM_TITLES[(artist + album) % len(ALBUM_TITLES)]}",
+            f"{track + 1:02d} - {TRACK_TITLES[(artist * 7 + album * 3 + track) % len(TRACK_TITLES)]}.flac")
+
+def make_music_tree(root, file_count, files_per_album=12, albums_per_artist=8, realistic=False):
+    """
+    Create a synthetic music library of empty files under root: root/artist/album/track.flac.
+    With realistic, the tree is one level deeper (root/genre/artist/album/track.flac) and names
+    mix Cyrillic, accented Latin and punctuation.
+    Returns the number of files created.
+    """
+    created = 0
+    artist = 0
+    
+    while created < file_count:
+        artist_dir = os.path.join(root, f"artist {artist:05d}")
+        for album in range(albums_per_artist):
+            if created >= file_count:
+                break
+            album_dir = os.path.join(artist_dir, f"{1960 + album} - album {album:02d}")
+            if realistic:
+                album_dir = os.path.join(root, *_realistic_names(artist, album, 0)[:3])
+            os.makedirs(album_dir, exist_ok=True)
+            for track in range(min(files_per_album, file_count - created)):
+                name = _realistic_names(artist, album, track)[3] if realistic else f"{track + 1:02d} - track.flac"
+                with open(os.path.join(album_dir, name), 'wb'):
+                    pass
+                created += 1
+        artist += 1
+    
+    return created
+
+def iter_library_paths(count, drive='d:\\music', files_per_album=12, albums_per_artist=8, skip_every=0,
+                       realistic=False):
+    """
+    Yield count Windows-style library paths in sorted order: drive\\artist\\album\\track.flac.
+    With skip_every=n, every n-th path is left out, to make a second list that differs from the first.
+    With realistic, paths use the names of make_music_tree(realistic=True) and are not sorted.
+    """
+    per_artist = files_per_album * albums_per_artist
+    for i in range(count):
+        if skip_every and i % skip_every == 0:
+            continue
+        artist, rest = divmod(i, per_artist)
+        album, track = divmod(rest, files_per_album)
+        if realistic:
+            yield '\\'.join((drive,) + _realistic_names(artist, album, track))
+            continue
+        yield f"{drive}\\artist {artist:06d}\\{1960 + album} - album {album:02d}\\{track + 1:02d} - track.flac"
+
+def write_library_xml(filename, item_count, drive='D:\\Music', realistic=False):
+    """
+    Write a JRiver Media Center style lib.xml with item_count Items (paths from iter_library_paths).
+    Returns the size of the file in bytes.
+    """
+    from xml.sax.saxutils import escape
+    
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>\n')
+        f.write('<MPL Version="2.0" Title="JRiver Media Center" PathSeparator="\\">\n')
+        for i, path in enumerate(iter_library_paths(item_count, drive, realistic=realistic)):
+            artist = path.split('\\')[-3]
+            f.write('<Item>\n')
+            f.write(f'<Field Name="Filename">{escape(path)}</Field>\n')
+            f.write(f'<Field Name="Name">Track {i % 12 + 1} &amp; more</Field>\n')
+            f.write(f'<Field Name="Artist">{escape(artist)}</Field>\n')
+            f.write(f'<Field Name="Album">Album {i // 12}</Field>\n')
+            f.write(f'<Field Name="Media Type">Audio</Field>\n')
+            f.write(f'<Field Name="File Type">flac</Field>\n')
+            f.write(f'<Field Name="File Size">{20_000_000 + i * 7919 % 30_000_000}</Field>\n')
+            f.write(f'<Field Name="Duration">{180 + i % 240}.5</Field>\n')
+            f.write(f'<Field Name="Date Modified">{1_500_000_000 + i * 37}</Field>\n')
+            f.write(f'<Field Name="Date Imported">{1_600_000_000 + i * 11}</Field>\n')
+            f.write('</Item>\n')
+        f.write('</MPL>\n')
+        return f.tell()
+
+def iter_iso_library_paths(count, iso_every=10, tracks_per_iso=8, drive='d:\\music', realistic=False):
+    """
+    Yield about count library paths in which every iso_every-th album is a SACD image listed
+    once per track as 'image.iso;N', the way JRiver exports them.
+    With realistic, folder and track names are those of make_music_tree(realistic=True).
+    """
+    produced = 0
+    album = 0
+    while produced < count:
+        album_dir = f"{drive}\\artist {album // 8:05d}\\{1970 + album % 8} - album {album:06d}"
+        if realistic:
+            album_dir = '\\'.join((drive,) + _realistic_names(album // 8, album % 8, 0)[:3])
+        if iso_every and album % iso_every == 0:
+            for track in range(1, tracks_per_iso + 1):
+                yield f"{album_dir}\\album.iso;{track}"
+            produced += tracks_per_iso
+        else:
+            for track in range(1, 13):
+                name = _realistic_names(album // 8, album % 8, track - 1)[3] if realistic else f"{track:02d} - track.flac"
+                yield f"{album_dir}\\{name}"
+            produced += 12
+        album += 1
@@ -0,0 +1,82 @@
+import unittest
+import os
+import io
+import tempfile
+import shutil
+from contextlib import redirect_stdout
+from pathlib import Path
+from collapse_tracks import collapse_iso_paths, collapse_iso_tracks, collapse_iso_tracks_text, CollapseStats, main
+from path_stream import write_paths, iter_paths
+
+
+PATHS = [
+    'd:\\music\\b\\disc.iso;1',
+    'd:\\music\\A\\01.flac',
+    'd:\\music\\b\\disc.iso;2',
+    'd:\\music\\b\\disc.iso;3',
+    'd:\\music\\c;live.flac',
+]
+
+
+class TestCollapseTracks(unittest.TestCase):
+    
+    def setUp(self):
+        """Create a temporary directory for input and output files"""
+        self.test_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+    
+    def test_collapse_stream(self):
+        """Test that track entries collapse to one image entry at the first track"""
+        stats = CollapseStats()
+        result = list(collapse_iso_paths(PATHS, stats))
+        
+        self.assertEqual(result, ['d:\\music\\b\\disc.iso', 'd:\\music\\A\\01.flac', 'd:\\music\\c;live.flac'])
+        self.assertEqual((stats.original, stats.entries, stats.collapsed), (5, 3, 2))
+        self.assertEqual(stats.tracks, {'d:\\music\\b\\disc.iso': 3})
+    
+    def test_json_in_place(self):
+        """Test that a JSON list can be collapsed onto itself and comes out sorted"""
+        lib_json = os.path.join(self.test_dir, 'lib.json')
+        write_paths(PATHS, lib_json)
+        
+        with redirect_stdout(io.StringIO()):
+            collapse_iso_tracks(lib_json, lib_json)
+        
+        self.assertEqual(list(iter_paths(lib_json)),
+                         ['d:\\music\\A\\01.flac', 'd:\\music\\b\\disc.iso', 'd:\\music\\c;live.flac'])
+    
+    def test_text_matches_json(self):
+        """Test that the text and JSON variants share the same results"""
+        lib_txt = os.path.join(self.test_dir, 'lib.txt')
+        out_txt = os.path.join(self.test_dir, 'out.txt')
+        write_paths(PATHS, lib_txt)
+        
+        with redirect_stdout(io.StringIO()):
+            stats = collapse_iso_tracks_text(lib_txt, out_txt)
+        
+        self.assertEqual(stats.collapsed, 2)
+        self.assertEqual(list(iter_paths(out_txt)),
+                         ['d:\\music\\A\\01.flac', 'd:\\music\\b\\disc.iso', 'd:\\music\\c;live.flac'])
+
+    def test_directory_default_output(self):
+        """Test that a scanned directory is written to a list named after it, not over the directory"""
+        music = os.path.join(self.test_dir, 'Music')
+        os.makedirs(os.path.join(music, 'b'))
+        Path(music, 'b', 'disc.iso').touch()
+        old_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        try:
+            with redirect_stdout(io.StringIO()):
+                main([music])
+        finally:
+            os.chdir(old_cwd)
+        
+        self.assertEqual(list(iter_paths(os.path.join(self.test_dir, 'Music.json'))),
+                         [os.path.join(os.path.realpath(music), 'b', 'disc.iso')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import os
+import io
+import tempfile
+import shutil
+from contextlib import redirect_stdout
+from compare_json import merge_join, compare_json_files, compare_sorted_files
+from path_stream import write_paths, iter_paths
+
+
+class TestMergeJoin(unittest.TestCase):
+    
+    def test_merge_join(self):
+        """Test that keys are split into common, left-only and right-only"""
+        result = list(merge_join(['a', 'b', 'b', 'd'], ['b', 'c', 'd', 'e']))
+        self.assertEqual(result, [(1, 'a'), (0, 'b'), (2, 'c'), (0, 'd'), (2, 'e')])
+    
+    def test_unsorted_input(self):
+        """Test that unsorted input is rejected instead of giving wrong results"""
+        with self.assertRaises(ValueError):
+            list(merge_join(['b', 'a'], ['a']))
+
+
+class TestCompareFiles(unittest.TestCase):
+    
+    def setUp(self):
+        """Create two overlapping sorted path lists in a temporary working directory"""
+        self.test_dir = tempfile.mkdtemp()
+        self.old_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        
+        write_paths(['d:\\music\\a\\01.flac', 'd:\\music\\a\\02.flac', 'd:\\music\\a\\cover.jpg',
+                     'd:\\music\\b\\01.flac'], 'lib.json')
+        write_paths(['D:\\Music\\a\\01.flac', 'd:\\music\\b\\01.flac', 'd:\\music\\c\\01.flac'],
+                    'file_paths.json')
+    
+    def tearDown(self):
+        """Clean up temporary directory"""
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.test_dir)
+    
+    def read_results(self):
+        return {name: list(iter_paths(name)) for name in ['only_in_lib.txt', 'only_in_file_paths.txt']}
+    
+    def test_merge_matches_set_comparison(self):
+        """Test that the merge-join mode writes the same differences as the set mode"""
+        with redirect_stdout(io.StringIO()):
+            compare_json_files('lib.json', 'file_paths.json')
+        expected = self.read_results()
+        for name in expected:
+            os.remove(name)
+        
+        with redirect_stdout(io.StringIO()):
+            compare_sorted_files('lib.json', 'file_paths.json')
+        
+        self.assertEqual(self.read_results(), expected)
+        self.assertEqual(expected['only_in_lib.txt'], ['d:\\music\\a\\02.flac'])
+        self.assertEqual(expected['only_in_file_paths.txt'], ['d:\\music\\c\\01.flac'])
+
+    
+    def test_merge_with_external_sort(self):
+        """Test that unsorted inputs are sorted before merging when not presorted"""
+        write_paths(['d:\\music\\z.flac', 'd:\\music\\a\\01.flac'], 'lib.json')
+        write_paths(['d:\\music\\b.flac', 'd:\\music\\a\\01.flac'], 'file_paths.json')
+        
+        with redirect_stdout(io.StringIO()):
+            compare_sorted_files('lib.json', 'file_paths.json', presorted=False)
+        
+        self.assertEqual(self.read_results(), {'only_in_lib.txt': ['d:\\music\\z.flac'],
+                                               'only_in_file_paths.txt': ['d:\\music\\b.flac']})
+
+    def test_differences_keep_original_paths(self):
+        """Test that both modes write and show the paths as spelled in the input, not their keys"""
+        write_paths(['/home/U/Music/A.flac', '/home/U/Music/B.flac'], 'lib.json')
+        write_paths(['/home/u/music/a.flac'], 'file_paths.json')
+        
+        for compare in [compare_json_files, compare_sorted_files]:
+            with redirect_stdout(io.StringIO()) as stdout:
+                compare('lib.json', 'file_paths.json')
+            self.assertEqual(list(iter_paths('only_in_lib.txt')), ['/home/U/Music/B.flac'], compare.__name__)
+            self.assertIn('1. /home/U/Music/B.flac', stdout.getvalue())
+            os.remove('only_in_lib.txt')
+
+
+if __name__ == '__main__':
+    unittest.main()
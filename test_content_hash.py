@@ -0,0 +1,110 @@
+import unittest
+import os
+import tempfile
+import shutil
+from unittest import mock
+import content_hash
+from content_hash import HashCache, fingerprint_files, find_content_matches, hash_files, PARTIAL_BLOCK
+
+
+class TestContentHash(unittest.TestCase):
+    
+    def setUp(self):
+        """Create files where some share a size but not their content"""
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.test_dir, 'hashes.sqlite')
+        
+        body = os.urandom(3 * PARTIAL_BLOCK)
+        self.files = {
+            'a.flac': body,
+            'copy of a.flac': body,
+            # Same size and same first/last blocks, different middle
+            'b.flac': body[:PARTIAL_BLOCK] + os.urandom(PARTIAL_BLOCK) + body[-PARTIAL_BLOCK:],
+            'c.flac': os.urandom(100),
+        }
+        for name, content in self.files.items():
+            with open(self.path(name), 'wb') as f:
+                f.write(content)
+    
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+    
+    def path(self, name):
+        return os.path.join(self.test_dir, name)
+    
+    def test_hashes_only_on_collision(self):
+        """Test that partial hashes need a size collision and full hashes a partial collision"""
+        fingerprints = fingerprint_files([self.path(name) for name in self.files], workers=2)
+        
+        self.assertIsNone(fingerprints[self.path('c.flac')].partial)
+        self.assertEqual(fingerprints[self.path('a.flac')].partial, fingerprints[self.path('b.flac')].partial)
+        self.assertNotEqual(fingerprints[self.path('a.flac')].full, fingerprints[self.path('b.flac')].full)
+        self.assertEqual(fingerprints[self.path('a.flac')].full, fingerprints[self.path('copy of a.flac')].full)
+    
+    def test_duplicates(self):
+        """Test that identical files on one side are reported as a verified duplicate"""
+        matches = list(find_content_matches([], [self.path(name) for name in self.files], workers=1))
+        
+        self.assertEqual(matches, [{'paths1': [], 'paths2': [self.path('a.flac'), self.path('copy of a.flac')],
+                                    'size': 3 * PARTIAL_BLOCK, 'verified': True}])
+    
+    def test_move_matched_from_cache(self):
+        """Test that a moved file is matched through the cached hashes of its old path"""
+        old_path = self.path('c.flac')
+        new_path = self.path('renamed.flac')
+        with HashCache(self.cache_file) as cache:
+            self.assertEqual(hash_files([old_path], cache, workers=1), 1)
+        os.rename(old_path, new_path)
+        
+        with HashCache(self.cache_file) as cache:
+            matches = list(find_content_matches([old_path], [new_path], cache, workers=1))
+            self.assertEqual(cache.hits, 1)
+        
+        self.assertEqual(len(matches), 1)
+        self.assertEqual((matches[0]['paths1'], matches[0]['paths2']), ([old_path], [new_path]))
+    
+    def test_gone_partial_never_joins_files_known_to_differ(self):
+        """Test that a gone file with only a partial hash is matched separately with each full-hash group"""
+        gone = self.path('copy of a.flac')
+        with HashCache(self.cache_file) as cache:
+            self.assertEqual(hash_files([gone, self.path('c.flac')], cache, workers=1), 2)
+        os.remove(gone)
+        
+        with HashCache(self.cache_file) as cache:
+            matches = list(find_content_matches([gone], [self.path('a.flac'), self.path('b.flac')], cache, workers=1))
+        
+        self.assertEqual(sorted(matches, key=lambda match: match['paths2']), [
+            {'paths1': [gone], 'paths2': [self.path('a.flac')], 'size': 3 * PARTIAL_BLOCK, 'verified': False},
+            {'paths1': [gone], 'paths2': [self.path('b.flac')], 'size': 3 * PARTIAL_BLOCK, 'verified': False},
+        ])
+    
+    def test_no_full_hash_against_a_gone_partial(self):
+        """Test that a file is not fully hashed when its only partial match is gone and has no full hash"""
+        old_path = self.path('copy of a.flac')
+        with HashCache(self.cache_file) as cache:
+            fingerprint_files([self.path('c.flac'), old_path], cache, workers=1)
+            cache.put(old_path, 3 * PARTIAL_BLOCK, 0, content_hash.partial_hash(old_path, 3 * PARTIAL_BLOCK))
+        os.remove(old_path)
+        
+        with HashCache(self.cache_file) as cache, mock.patch.object(content_hash, 'full_hash', wraps=content_hash.full_hash) as full:
+            fingerprints = fingerprint_files([old_path, self.path('a.flac')], cache, workers=1)
+            self.assertEqual(full.call_count, 0)
+            self.assertIsNotNone(fingerprints[self.path('a.flac')].partial)
+            
+            fingerprint_files([old_path, self.path('a.flac'), self.path('b.flac')], cache, workers=1)
+            self.assertEqual(full.call_count, 2)
+    
+    def test_cache_reused(self):
+        """Test that unchanged files are not hashed again"""
+        paths = [self.path(name) for name in self.files]
+        with HashCache(self.cache_file) as cache:
+            fingerprint_files(paths, cache, workers=1)
+        with HashCache(self.cache_file) as cache:
+            self.assertEqual(hash_files(paths, cache, workers=1), 1)  # only c.flac never needed a hash
+            fingerprint_files(paths, cache, workers=1)
+            self.assertEqual(cache.hits, len(paths))
+
+
+if __name__ == '__main__':
+    unittest.main()
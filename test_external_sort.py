@@ -0,0 +1,44 @@
+import unittest
+import os
+import random
+import external_sort
+from external_sort import ExternalSorter, external_sort as sort_external
+
+
+class TestExternalSort(unittest.TestCase):
+    
+    def setUp(self):
+        """Generate mixed-case paths with duplicates"""
+        rng = random.Random(1)
+        self.items = [f"{rng.choice('abcABC')}\\{rng.randrange(500)}.flac" for _ in range(3000)]
+    
+    def test_in_memory(self):
+        """Test that a small input is sorted without spilling"""
+        sorter = ExternalSorter(key=str.lower)
+        sorter.extend(self.items)
+        self.assertEqual(list(sorter.sorted()), sorted(self.items, key=str.lower))
+        self.assertEqual(sorter.spilled_runs, 0)
+    
+    def test_spilled_runs_match_list_sort(self):
+        """Test that merged runs give the same stable order as list.sort"""
+        sorter = ExternalSorter(key=str.lower, memory_limit=10000)
+        sorter.extend(self.items)
+        self.assertGreater(sorter.spilled_runs, 1)
+        
+        run_dir = sorter._run_dir
+        self.assertEqual(list(sorter.sorted()), sorted(self.items, key=str.lower))
+        self.assertFalse(os.path.exists(run_dir))
+    
+    def test_multiple_merge_passes(self):
+        """Test that more runs than the merge fan-in are merged in several passes"""
+        fan_in = external_sort.MAX_MERGE_FAN_IN
+        external_sort.MAX_MERGE_FAN_IN = 3
+        try:
+            result = list(sort_external(self.items, memory_limit=5000))
+        finally:
+            external_sort.MAX_MERGE_FAN_IN = fan_in
+        self.assertEqual(result, sorted(self.items))
+
+
+if __name__ == '__main__':
+    unittest.main()
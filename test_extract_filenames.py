@@ -0,0 +1,101 @@
+import unittest
+import os
+import io
+import tempfile
+import shutil
+from unittest import mock
+from contextlib import redirect_stdout
+from extract_filenames import iter_library_items, iter_library_records, extract_filenames_to_json, LibraryRecord, ENGINES, main
+from path_stream import iter_paths
+
+
+LIB_XML = '''<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>
+<MPL Version="2.0" Title="JRiver Media Center" PathSeparator="\\">
+<Item>
+<Field Name="Name">Зеленые глаза</Field>
+<Field Name="Filename">D:\\Music\\Кино\\b.flac</Field>
+<Field Name="File Size">123</Field>
+</Item>
+<Item>
+<Field Name="Filename">D:\\Music\\AC&amp;DC\\a.flac</Field>
+</Item>
+<Item>
+<Field Name="Name">No file</Field>
+<Field Name="Filename"></Field>
+</Item>
+</MPL>
+'''
+
+
+class TestExtractFilenames(unittest.TestCase):
+    
+    def setUp(self):
+        """Write a small lib.xml to a temporary directory"""
+        self.test_dir = tempfile.mkdtemp()
+        self.xml_file = os.path.join(self.test_dir, 'lib.xml')
+        with open(self.xml_file, 'w', encoding='utf-8') as f:
+            f.write(LIB_XML)
+    
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+    
+    def test_engines_agree(self):
+        """Test that both engines extract the same fields from every Item"""
+        expected = [
+            ('D:\\Music\\Кино\\b.flac', '123'),
+            ('D:\\Music\\AC&DC\\a.flac', None),
+            (None, None),
+        ]
+        for engine in ENGINES:
+            items = list(iter_library_items(self.xml_file, ('Filename', 'File Size'), engine))
+            self.assertEqual(items, expected, engine)
+    
+    def test_sorted_filenames(self):
+        """Test that the output holds the non-empty filenames sorted case-insensitively"""
+        output = os.path.join(self.test_dir, 'lib.json')
+        with redirect_stdout(io.StringIO()):
+            extract_filenames_to_json(self.xml_file, output)
+        
+        self.assertEqual(list(iter_paths(output)), ['D:\\Music\\AC&DC\\a.flac', 'D:\\Music\\Кино\\b.flac'])
+    
+    def test_extra_fields(self):
+        """Test that extra fields turn entries into objects"""
+        output = os.path.join(self.test_dir, 'lib.ndjson')
+        with redirect_stdout(io.StringIO()):
+            extract_filenames_to_json(self.xml_file, output, fields=['File Size'], engine='expat')
+        
+        self.assertEqual(list(iter_paths(output)), [
+            {'Filename': 'D:\\Music\\AC&DC\\a.flac', 'File Size': None},
+            {'Filename': 'D:\\Music\\Кино\\b.flac', 'File Size': '123'},
+        ])
+    
+    def test_metadata_records(self):
+        """Test that records carry numeric size and date plus extra fields, and round-trip through the output"""
+        records = list(iter_library_records(self.xml_file, extra_fields=['Name']))
+        self.assertEqual([(r.filename, r.size, r.modified, r.fields) for r in records], [
+            ('D:\\Music\\Кино\\b.flac', 123, None, {'Name': 'Зеленые глаза'}),
+            ('D:\\Music\\AC&DC\\a.flac', None, None, {'Name': None}),
+        ])
+        
+        output = os.path.join(self.test_dir, 'lib.ndjson')
+        with redirect_stdout(io.StringIO()):
+            extract_filenames_to_json(self.xml_file, output, metadata=True)
+        entries = list(iter_paths(output))
+        self.assertEqual(entries[1], {'Filename': 'D:\\Music\\Кино\\b.flac', 'File Size': 123, 'Date Modified': None})
+        self.assertEqual(LibraryRecord.from_dict(entries[1]).size, 123)
+
+    def test_records_need_json_output(self):
+        """Test that --fields and --metadata refuse outputs that can't hold objects, without touching them"""
+        for name in ['lib.txt', 'lib.csv', 'lib.fls']:
+            output = os.path.join(self.test_dir, name)
+            with mock.patch('sys.stderr'), self.assertRaises(SystemExit) as raised:
+                main([self.xml_file, output, '--metadata'])
+            self.assertEqual(raised.exception.code, 2)
+            with self.assertRaises(ValueError):
+                extract_filenames_to_json(self.xml_file, output, fields=['File Size'])
+            self.assertFalse(os.path.exists(output))
+
+
+if __name__ == '__main__':
+    unittest.main()
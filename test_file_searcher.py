@@ -1,10 +1,16 @@
 import unittest
 import os
 import csv
+import json
 import tempfile
 import shutil
+import time
 from pathlib import Path
-from file_searcher import search_files
+from unittest import mock
+import file_searcher
+from file_searcher import search_files, iter_file_paths, list_directory, scan_directory
+from scan_index import ScanIndex
+from path_stream import iter_paths
 
 
 class TestFileSearcher(unittest.TestCase):
@@ -147,6 +153,30 @@ class TestFileSearcher(unittest.TestCase):
         # Should not create output file for non-existent directory
         self.assertFalse(os.path.exists(self.output_file))
     
+    def test_metrics_summary(self):
+        """Test that the metrics file records the scan counts and slowest directories"""
+        metrics_file = os.path.join(self.test_dir, 'metrics.json')
+        search_files(self.test_dir, self.output_file, quiet=True, metrics_file=metrics_file)
+        
+        with open(metrics_file, 'r', encoding='utf-8') as f:
+            metrics = json.load(f)
+        
+        # Root, a_folder, b_folder, c_folder and c_folder/nested; the output file is in the root
+        self.assertEqual(metrics['directories'], 5)
+        self.assertEqual(metrics['files'], 6)
+        self.assertIn('scan', metrics['phases'])
+        self.assertEqual(len(metrics['slowest_directories']), 5)
+    
+    def test_stats_only_for_snapshots(self):
+        """Test that --stat is refused without snapshot output and search_files doesn't stat for other formats"""
+        with mock.patch('sys.stderr'), self.assertRaises(SystemExit) as raised:
+            file_searcher.main([self.test_dir, '-o', self.output_file, '--stat'])
+        self.assertEqual(raised.exception.code, 2)
+        
+        with mock.patch.object(file_searcher, 'stat_file') as stat_file:
+            self.assertEqual(search_files(self.test_dir, self.output_file, quiet=True, stats=True), 6)
+        stat_file.assert_not_called()
+    
     def test_empty_directory(self):
         """Test handling of empty directory"""
         empty_dir = os.path.join(self.test_dir, 'empty')
@@ -164,5 +194,112 @@ class TestFileSearcher(unittest.TestCase):
         self.assertEqual(rows[0], ['File Path'])
 
 
+class TestScanDirectory(unittest.TestCase):
+    
+    def setUp(self):
+        """Create a tree whose sorted path order differs from a depth-first walk"""
+        self.test_dir = tempfile.mkdtemp()
+        
+        # 'a b' sorts before 'a/x' because ' ' < '/'
+        for folder in ['a', 'a b', os.path.join('a', 'x'), os.path.join('a', 'x', 'deep')]:
+            os.makedirs(os.path.join(self.test_dir, folder), exist_ok=True)
+            Path(os.path.join(self.test_dir, folder, 'track.flac')).touch()
+        os.makedirs(os.path.join(self.test_dir, 'empty'))
+    
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+    
+    def test_matches_sorted_directory_order(self):
+        """Test that the single-pass scan keeps the sorted-directories output order"""
+        directories = sorted(root for root, _, files in os.walk(self.test_dir) if files)
+        expected = [os.path.join(d, f) for d in directories for f in sorted(os.listdir(d))
+                    if os.path.isfile(os.path.join(d, f))]
+        
+        self.assertEqual(list(iter_file_paths(self.test_dir)), expected)
+    
+    def test_parallel_scan_same_order(self):
+        """Test that listing directories on several workers keeps the output order"""
+        for i in range(40):
+            os.makedirs(os.path.join(self.test_dir, 'a', f'sub{i % 7}', f'album{i}'))
+            Path(os.path.join(self.test_dir, 'a', f'sub{i % 7}', f'album{i}', 'track.flac')).touch()
+        
+        self.assertEqual(list(iter_file_paths(self.test_dir, workers=4)),
+                         list(iter_file_paths(self.test_dir)))
+    
+    def test_parallel_scan_scales_with_listing_latency(self):
+        """Test that slow listings (like a network share) overlap across workers, deep trees included"""
+        def slow_lister(path):
+            time.sleep(0.003)
+            depth = path.count('/')
+            return ['track.flac'], [f'{path}/{i}' for i in range(3)] if depth < 5 else []
+        
+        timings = {}
+        for workers in [1, 8]:
+            start = time.perf_counter()
+            timings[workers] = list(scan_directory('r', workers, slow_lister)), time.perf_counter() - start
+        
+        self.assertEqual(timings[8][0], timings[1][0])
+        # 364 directories: 8 workers should come close to 8x, allow for scheduling noise
+        self.assertGreater(timings[1][1] / timings[8][1], 5)
+
+
+class TestScanIndex(unittest.TestCase):
+    
+    def setUp(self):
+        """Create a small library whose directories were last modified a day ago"""
+        self.test_dir = tempfile.mkdtemp()
+        self.library = os.path.join(self.test_dir, 'library')
+        self.index_file = os.path.join(self.test_dir, 'index.sqlite')
+        self.output_file = os.path.join(self.test_dir, 'output.json')
+        
+        for album in ['album1', 'album2']:
+            os.makedirs(os.path.join(self.library, album))
+            Path(os.path.join(self.library, album, 'track.flac')).touch()
+        self.age_directories()
+    
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+    
+    def age_directories(self):
+        yesterday = time.time() - 86400
+        for root, dirs, _ in os.walk(self.library):
+            os.utime(root, (yesterday, yesterday))
+    
+    def scan(self):
+        with ScanIndex(self.index_file) as index:
+            paths = list(iter_file_paths(self.library, lister=index.lister(list_directory)))
+            index.prune(self.library)
+            return paths, index.hits, index.misses
+    
+    def test_unchanged_directories_come_from_index(self):
+        """Test that a rescan of an unchanged tree lists nothing"""
+        first, hits, misses = self.scan()
+        second, hits, misses = self.scan()
+        
+        self.assertEqual(first, second)
+        self.assertEqual((hits, misses), (3, 0))
+    
+    def test_changed_directory_is_relisted(self):
+        """Test that a new file shows up once its directory mtime changes"""
+        self.scan()
+        Path(os.path.join(self.library, 'album2', 'bonus.flac')).touch()
+        
+        paths, hits, misses = self.scan()
+        
+        self.assertIn(os.path.join(self.library, 'album2', 'bonus.flac'), paths)
+        self.assertEqual(misses, 1)
+    
+    def test_search_files_with_index(self):
+        """Test that search_files output is the same with and without the index"""
+        search_files(self.library, self.output_file)
+        expected = list(iter_paths(self.output_file))
+        
+        for _ in range(2):
+            search_files(self.library, self.output_file, index_file=self.index_file)
+            self.assertEqual(list(iter_paths(self.output_file)), expected)
+
+
 if __name__ == '__main__':
     unittest.main()
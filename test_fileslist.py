@@ -0,0 +1,69 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+
+from fileslist import run, run_batch, main
+from path_stream import write_paths, iter_paths
+
+
+class TestFilesList(unittest.TestCase):
+
+    def setUp(self):
+        """Create two small path lists in a temporary working directory"""
+        self.test_dir = tempfile.mkdtemp()
+        self.old_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        write_paths(['d:\\music\\a\\01.flac', 'd:\\music\\a\\02.flac'], 'lib.json')
+        write_paths(['d:\\music\\a\\02.flac', 'd:\\music\\b\\01.flac'], 'disk.json')
+
+    def tearDown(self):
+        """Clean up temporary directory"""
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.test_dir)
+
+    def test_run_dispatches_to_the_tool(self):
+        """Test that a subcommand runs the tool's main with its arguments"""
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(run(['compare', 'lib.json', 'disk.json']), 0)
+        self.assertEqual(list(iter_paths('only_in_lib.txt')), ['d:\\music\\a\\01.flac'])
+
+    def test_errors_become_statuses(self):
+        """Test that unknown commands and bad options give an exit status instead of exiting"""
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            self.assertEqual(run(['nothing']), 2)
+            self.assertEqual(run(['compare', '--no-such-option']), 2)
+            self.assertEqual(run(['compare', '--help']), 0)
+            self.assertEqual(run([]), 2)
+
+    def test_batch(self):
+        """Test that batch mode runs every job, skips comments and counts failures"""
+        jobs = io.StringIO("# nightly checks\n"
+                           "compare lib.json disk.json\n"
+                           "\n"
+                           "compare --no-such-option\n"
+                           "search no-such-folder -o paths.json\n"
+                           "collapse lib.json 'lib collapsed.json'\n")
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as stderr:
+            self.assertEqual(run_batch(jobs), 2)
+        self.assertIn('4 jobs, 2 failed', stderr.getvalue())
+        self.assertIn('failed with status 1: search no-such-folder', stderr.getvalue())
+        self.assertTrue(os.path.exists('lib collapsed.json'))
+
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as stderr:
+            self.assertEqual(run_batch(io.StringIO("compare --no-such-option\ncompare lib.json disk.json\n"),
+                                       keep_going=False), 1)
+        self.assertIn('1 jobs, 1 failed', stderr.getvalue())
+
+    def test_help_lists_commands(self):
+        """Test that the top-level help lists every subcommand"""
+        with redirect_stdout(io.StringIO()) as stdout:
+            self.assertEqual(main(['--help']), 0)
+        for command in ['search', 'extract', 'compare', 'batch']:
+            self.assertIn(command, stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from urllib.request import urlopen
+from urllib.error import HTTPError
+
+from inventory_server import PathIndex, InventoryService, difference, make_server
+from path_stream import write_paths
+
+
+DISK = [
+    'D:\\Music\\ABBA\\Arrival\\01 - When I Kissed the Teacher.flac',
+    'D:\\Music\\ABBA\\Arrival\\02 - Dancing Queen.flac',
+    'D:\\Music\\ABBA2\\01.flac',
+    'd:/music/Кино/Группа крови/01 - Группа крови.flac',
+    'D:\\Music\\Кино\\Группа крови\\cover.jpg',
+]
+
+LIBRARY = [
+    'D:\\Music\\ABBA\\Arrival\\01 - When I Kissed the Teacher.flac',
+    'D:\\Music\\ABBA\\Arrival\\03 - Dum Dum Diddle.flac',
+    'D:\\Music\\SACD\\disc.iso;1',
+    'D:\\Music\\SACD\\disc.iso;2',
+]
+
+
+class TestPathIndex(unittest.TestCase):
+
+    def test_prefix(self):
+        """Test that prefix queries ignore case and separators and respect folder boundaries"""
+        index = PathIndex(DISK)
+        self.assertEqual(len(index.prefix('d:/MUSIC/abba/')), 2)
+        self.assertEqual(len(index.prefix('D:\\Music\\ABBA')), 3)
+        self.assertEqual([index.paths[i] for i in index.prefix('d:\\music\\кино\\')], DISK[3:])
+        self.assertEqual(len(index.prefix('e:\\')), 0)
+
+    def test_substring(self):
+        """Test that trigram search and a plain scan find the same keys"""
+        with_trigrams = PathIndex(DISK)
+        without = PathIndex(DISK, trigrams=False)
+        for text in ['queen', 'ГРУППА', 'ab', '\\01', 'nothing here', 'flac']:
+            self.assertEqual(with_trigrams.substring(text), without.substring(text), text)
+        self.assertEqual([with_trigrams.paths[i] for i in with_trigrams.substring('DANCING')], [DISK[1]])
+
+    def test_difference(self):
+        """Test set differences, optionally restricted to a folder"""
+        disk, library = PathIndex(DISK), PathIndex(LIBRARY)
+        self.assertEqual([library.paths[i] for i in difference(library, disk, 'd:\\music\\abba\\')],
+                         [LIBRARY[1]])
+        self.assertEqual(len(difference(disk, library)), 4)
+
+
+class TestInventoryServer(unittest.TestCase):
+
+    def setUp(self):
+        """Write the path lists and start a server on a free port"""
+        self.test_dir = tempfile.mkdtemp()
+        self.inventory = inventory = os.path.join(self.test_dir, 'file_paths.json')
+        library = os.path.join(self.test_dir, 'lib.json')
+        write_paths(DISK, inventory)
+        write_paths(LIBRARY, library)
+        service = InventoryService(inventory, library)
+        service.load()
+        self.server = make_server(service, port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        """Stop the server and clean up"""
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir)
+
+    def get(self, path):
+        with urlopen(self.url + path) as response:
+            return json.loads(response.read())
+
+    def test_queries(self):
+        """Test the endpoints over HTTP; excluded types are filtered and ISO tracks collapsed"""
+        self.assertEqual(self.get('/stats')['disk'], 4)
+        self.assertEqual(self.get('/prefix?q=d:/music/abba/&limit=1')['count'], 2)
+        self.assertEqual(self.get('/search?q=queen')['results'], [DISK[1]])
+        missing = self.get('/diff?only=library')
+        self.assertEqual(missing['results'], [LIBRARY[1], 'D:\\Music\\SACD\\disc.iso'])
+        self.assertEqual(self.get('/search?q=dum&in=library')['count'], 1)
+        with self.assertRaises(HTTPError) as raised:
+            self.get('/nothing')
+        self.assertEqual(raised.exception.code, 404)
+        with urlopen(self.url + '/reload', data=b'') as response:
+            self.assertEqual(json.loads(response.read())['disk'], 4)
+
+    def test_failed_reload_keeps_serving(self):
+        """Test that a reload of a missing or malformed inventory answers 500 and keeps the old indexes"""
+        os.remove(self.inventory)
+        with self.assertRaises(HTTPError) as raised:
+            urlopen(self.url + '/reload', data=b'')
+        self.assertEqual(raised.exception.code, 500)
+        self.assertIn('Reload failed', json.loads(raised.exception.read())['error'])
+
+        with open(self.inventory, 'w', encoding='utf-8') as f:
+            f.write('["D:\\\\Music\\\\01.flac", ')
+        with self.assertRaises(HTTPError) as raised:
+            urlopen(self.url + '/reload', data=b'')
+        self.assertEqual(raised.exception.code, 500)
+        self.assertEqual(self.get('/stats')['disk'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import os
+import errno
+import io
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from contextlib import redirect_stdout
+
+from inventory_watch import (Inventory, LibraryDiff, InventoryWatcher, InotifyWatcher, PollingWatcher,
+                             ADDED, REMOVED, LISTED)
+from path_stream import write_paths, iter_paths
+from path_keys import compute_key, keyed_paths
+from path_filter import ExtensionFilter
+
+
+class TestInventory(unittest.TestCase):
+
+    def test_incremental_diff(self):
+        """Test that adds and removes keep the only-in sets in step with a full compare"""
+        diff = LibraryDiff(keyed_paths(['/m/a/01.flac', '/m/a/02.flac']))
+        inventory = Inventory(diff)
+        inventory.sync('/m/a', ['01.flac', 'cover.jpg'])
+        inventory.add('/m/b/01.flac')
+        inventory.add('/m/b/01.flac')
+        self.assertEqual(diff.only_in_library, {compute_key('/m/a/02.flac')})
+        self.assertEqual(diff.only_on_disk, {compute_key('/m/b/01.flac')})
+        self.assertEqual(len(inventory), 3)
+
+        inventory.remove_tree('/m/b')
+        inventory.remove('/m/a/01.flac')
+        self.assertEqual(diff.only_in_library, {compute_key('/m/a/01.flac'), compute_key('/m/a/02.flac')})
+        self.assertEqual(diff.only_on_disk, set())
+        self.assertEqual(list(inventory), ['/m/a/cover.jpg'])
+
+
+class TestWatchers(unittest.TestCase):
+
+    def setUp(self):
+        """Create a small music folder"""
+        self.test_dir = tempfile.mkdtemp()
+        self.music = os.path.realpath(os.path.join(self.test_dir, 'Music'))
+        os.makedirs(os.path.join(self.music, 'Album'))
+        Path(self.music, 'Album', '01.flac').touch()
+
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+
+    def test_polling_watcher(self):
+        """Test that polling relists changed directories and reports new and removed subdirectories"""
+        watcher = PollingWatcher(interval=0)
+        watcher.add_tree(self.music)
+        album = os.path.join(self.music, 'Album')
+        os.utime(album, ns=(0, 0))
+        watcher._mtimes[album] = 0
+        Path(album, '02.flac').touch()
+        os.makedirs(os.path.join(self.music, 'New'))
+        shutil.rmtree(album)
+
+        events = watcher.read_events(0)
+        self.assertIn((REMOVED, album, True), events)
+        self.assertIn((ADDED, os.path.join(self.music, 'New'), True), events)
+        self.assertIn((LISTED, self.music, []), events)
+
+    def test_watch_session(self):
+        """Test a watch session: catch up with a stale inventory, follow changes, write the diff"""
+        inventory_file = os.path.join(self.test_dir, 'file_paths.fls')
+        library_file = os.path.join(self.test_dir, 'lib.txt')
+        write_paths([os.path.join(self.music, 'Album', '01.flac'), os.path.join(self.music, 'Album', '02.flac')],
+                    library_file)
+        write_paths([os.path.join(self.music, 'Old', '01.flac')], inventory_file)
+
+        try:
+            InotifyWatcher().close()
+            poll_interval = None
+        except OSError:
+            poll_interval = 0
+
+        with redirect_stdout(io.StringIO()):
+            watcher = InventoryWatcher(self.music, inventory_file, library_file, poll_interval=poll_interval,
+                                       output_dir=self.test_dir)
+            watcher.start()
+            try:
+                self.assertEqual(list(watcher.inventory), [os.path.join(self.music, 'Album', '01.flac')])
+
+                Path(self.music, 'Album', '02.flac').touch()
+                os.makedirs(os.path.join(self.music, 'New', 'CD1'))
+                Path(self.music, 'New', 'CD1', '01.flac').touch()
+                os.rename(os.path.join(self.music, 'Album', '01.flac'), os.path.join(self.music, 'Album', '01 - Intro.flac'))
+                for _ in range(5):
+                    watcher.process(0.2)
+                watcher.emit_diff()
+            finally:
+                watcher.close()
+
+        self.assertEqual(list(iter_paths(inventory_file)), [
+            os.path.join(self.music, 'Album', '01 - Intro.flac'),
+            os.path.join(self.music, 'Album', '02.flac'),
+            os.path.join(self.music, 'New', 'CD1', '01.flac'),
+        ])
+        self.assertEqual(list(iter_paths(os.path.join(self.test_dir, 'only_in_lib.txt'))),
+                         [os.path.join(self.music, 'Album', '01.flac')])
+        self.assertEqual(len(list(iter_paths(os.path.join(self.test_dir, 'only_in_file_paths.txt')))), 2)
+
+    def test_watch_limit_falls_back_to_polling(self):
+        """Test that running out of inotify watches on a new directory switches to polling instead of stopping"""
+        new_dir = os.path.join(self.music, 'New')
+        os.makedirs(new_dir)
+        Path(new_dir, '01.flac').touch()
+
+        class FullWatcher:
+            closed = False
+
+            def read_events(self, timeout):
+                return [(ADDED, new_dir, True), (REMOVED, os.path.join(self.music, 'Album', '01.flac'), False)]
+
+            def add_tree(self, root):
+                raise OSError(errno.ENOSPC, 'inotify watch limit reached')
+
+            def close(self):
+                self.closed = True
+
+        full = FullWatcher()
+        full.music = self.music
+        with redirect_stdout(io.StringIO()) as stdout:
+            watcher = InventoryWatcher(self.music, os.path.join(self.test_dir, 'file_paths.fls'), poll_interval=0)
+            watcher.start()
+            watcher.watcher.close()
+            watcher.watcher = full
+            try:
+                self.assertEqual(watcher.process(0), 2)
+            finally:
+                watcher.close()
+
+        self.assertTrue(full.closed)
+        self.assertIsInstance(watcher.watcher, PollingWatcher)
+        self.assertIn('polling', stdout.getvalue())
+        self.assertEqual(list(watcher.inventory), [os.path.join(self.music, 'Album', '01.flac'),
+                                                   os.path.join(new_dir, '01.flac')])
+
+    def test_filter_applies_to_inventory_and_diff(self):
+        """Test that a user filter applies to the inventory as in a scan, and extends the default excludes for the diff"""
+        inventory_file = os.path.join(self.test_dir, 'file_paths.fls')
+        library_file = os.path.join(self.test_dir, 'lib.txt')
+        write_paths([os.path.join(self.music, 'Album', '01.flac')], library_file)
+        Path(self.music, 'Album', 'cover.jpg').touch()
+        Path(self.music, 'Album', 'rip.log').touch()
+        path_filter = ExtensionFilter(['.jpg'])
+
+        with redirect_stdout(io.StringIO()):
+            watcher = InventoryWatcher(self.music, inventory_file, library_file, path_filter=path_filter,
+                                       poll_interval=0, output_dir=self.test_dir)
+            watcher.start()
+            try:
+                self.assertEqual(list(watcher.inventory), [os.path.join(self.music, 'Album', '01.flac'),
+                                                           os.path.join(self.music, 'Album', 'rip.log')])
+                watcher.emit_diff()
+            finally:
+                watcher.close()
+
+        self.assertEqual(list(iter_paths(os.path.join(self.test_dir, 'only_in_file_paths.txt'))), [])
+        self.assertEqual(list(iter_paths(os.path.join(self.test_dir, 'only_in_lib.txt'))), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from xml.sax.saxutils import escape
+
+from metadata_diff import compare_metadata, merge_rows
+from file_searcher import search_files
+from path_stream import iter_paths
+
+
+class TestMetadataDiff(unittest.TestCase):
+    
+    def setUp(self):
+        """Create a music folder and a lib.xml whose sizes and dates disagree on some files"""
+        self.test_dir = tempfile.mkdtemp()
+        self.music = os.path.join(self.test_dir, 'Music')
+        os.makedirs(os.path.join(self.music, 'Album'))
+        
+        # name: (bytes on disk, library size, library date offset in seconds)
+        files = {'01.flac': (10, 10, 0), '02.flac': (10, 20, 0), '03.flac': (10, 10, 3600),
+                 '04.flac': (10, 10, 1), 'disc.iso': (30, 30, 0)}
+        self.mtime = 1_600_000_000
+        items = []
+        for name, (size, library_size, offset) in files.items():
+            path = os.path.join(self.music, 'Album', name)
+            with open(path, 'wb') as f:
+                f.write(b'x' * size)
+            os.utime(path, (self.mtime, self.mtime))
+            if name.endswith('.iso'):
+                path += ';1'
+            items.append((path, library_size, self.mtime + offset))
+        items.append((os.path.join(self.music, 'Gone', '01.flac'), 5, self.mtime))
+        
+        self.xml_file = os.path.join(self.test_dir, 'lib.xml')
+        with open(self.xml_file, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<MPL Version="2.0">\n')
+            for path, size, modified in items:
+                f.write(f'<Item><Field Name="Filename">{escape(path)}</Field>'
+                        f'<Field Name="File Size">{size}</Field><Field Name="Date Modified">{modified}</Field></Item>\n')
+            f.write('</MPL>\n')
+        self.output = os.path.join(self.test_dir, 'metadata_diff.ndjson')
+    
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+    
+    def check(self, disk_source):
+        with redirect_stdout(io.StringIO()):
+            counts = compare_metadata(self.xml_file, disk_source, output_file=self.output)
+        self.assertEqual(counts, {'matching': 3, 'size': 1, 'modified': 1, 'unknown': 0,
+                                  'only_library': 1, 'only_disk': 0})
+        changed = {os.path.basename(entry['path']): entry['changed'] for entry in iter_paths(self.output)}
+        self.assertEqual(changed, {'02.flac': ['size'], '03.flac': ['modified']})
+    
+    def test_against_scan(self):
+        """Test comparing the library against files stat'ed during a scan"""
+        self.check(self.music)
+    
+    def test_against_snapshot(self):
+        """Test comparing the library against a snapshot written with stats"""
+        snapshot = os.path.join(self.test_dir, 'file_paths.fls')
+        with redirect_stdout(io.StringIO()):
+            search_files(self.music, snapshot, quiet=True, stats=True)
+        self.check(snapshot)
+    
+    def test_merge_rows(self):
+        """Test that rows are paired by key, with repeated keys reported once"""
+        rows = list(merge_rows([('a', 1), ('a', 2), ('c', 3)], [('b', 4), ('c', 5), ('c', 6)]))
+        self.assertEqual(rows, [(('a', 1), None), (None, ('b', 4)), (('c', 3), ('c', 5))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from contextlib import redirect_stdout
+
+import multi_scan
+import file_searcher
+from multi_scan import scan_roots, iter_merged, load_manifest, select_partitions, partition_name, group_by_device
+from file_searcher import iter_file_paths
+from path_stream import iter_paths
+
+
+class TestMultiScan(unittest.TestCase):
+
+    def setUp(self):
+        """Create three music roots, one with a name that sorts between the others' files"""
+        self.test_dir = os.path.realpath(tempfile.mkdtemp())
+        self.music = os.path.join(self.test_dir, 'music')
+        for root, album in [('a', 'Album'), ('a b', 'Live'), ('b', 'Кино')]:
+            os.makedirs(os.path.join(self.music, root, album))
+            for name in ['01.flac', '02.flac']:
+                Path(self.music, root, album, name).touch()
+            Path(self.music, root, 'cover.jpg').touch()
+        self.roots = [os.path.join(self.music, root) for root in ['b', 'a', 'a b']]
+
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+
+    def test_merged_view_matches_single_scan(self):
+        """Test that the merged partitions come out exactly as one scan of the common parent"""
+        parts = os.path.join(self.test_dir, 'parts')
+        output = os.path.join(self.test_dir, 'file_paths.json')
+        with redirect_stdout(io.StringIO()):
+            manifest = scan_roots(self.roots + [os.path.join(self.music, 'a', 'Album'), 'missing'],
+                                  parts, output, workers=2)
+
+        self.assertEqual([p['root'] for p in manifest['partitions']], sorted(self.roots))
+        self.assertEqual(set(manifest['skipped'].values()), {'inside another root', 'does not exist'})
+        self.assertEqual([p['count'] for p in manifest['partitions']], [3, 3, 3])
+        expected = list(iter_file_paths(self.music))
+        self.assertEqual(list(iter_paths(output)), expected)
+        self.assertEqual(list(iter_merged(parts)), expected)
+
+    def test_prefix_reads_only_matching_partitions(self):
+        """Test that a prefix selects the partition holding it, and stats survive the merge"""
+        parts = os.path.join(self.test_dir, 'parts')
+        with redirect_stdout(io.StringIO()):
+            scan_roots(self.roots, parts, os.path.join(self.test_dir, 'file_paths.fls'), stats=True)
+
+        prefix = os.path.join(self.music, 'b', 'Кино') + os.sep
+        selected = select_partitions(load_manifest(parts), prefix)
+        self.assertEqual([p['root'] for p in selected], [os.path.join(self.music, 'b')])
+        entries = list(iter_merged(parts, prefix, stats=True))
+        self.assertEqual([path for path, _, _ in entries], [prefix + '01.flac', prefix + '02.flac'])
+        self.assertEqual([size for _, size, _ in entries], [0, 0])
+
+    def test_failed_partition_is_reported(self):
+        """Test that a root that fails to scan makes scan_roots fail and the merged view refuse to read it"""
+        parts = os.path.join(self.test_dir, 'parts')
+        output = os.path.join(self.test_dir, 'file_paths.json')
+        failing = os.path.join(self.music, 'a b')
+        real_search_files = multi_scan.search_files
+
+        def search_files(directory, *args, **kwargs):
+            return None if directory == failing else real_search_files(directory, *args, **kwargs)
+
+        with redirect_stdout(io.StringIO()) as stdout:
+            with mock.patch.object(multi_scan, 'search_files', search_files):
+                self.assertIsNone(scan_roots(self.roots, parts, output))
+        self.assertIn(f"scanning '{failing}' failed", stdout.getvalue())
+        self.assertFalse(os.path.exists(output))
+
+        manifest = load_manifest(parts)
+        self.assertEqual([p.get('error') for p in manifest['partitions']], [None, 'scan failed', None])
+        with self.assertRaises(ValueError):
+            list(iter_merged(parts))
+        prefix = os.path.join(self.music, 'b') + os.sep
+        self.assertEqual(len(list(iter_merged(parts, prefix))), 3)
+
+    def test_command_line_options_reach_every_partition(self):
+        """Test that the scan options apply to each partition and a failed one gives a non-zero exit"""
+        output = os.path.join(self.test_dir, 'file_paths.json')
+        real_search_files = multi_scan.search_files
+        calls = []
+
+        def search_files(directory, *args, **kwargs):
+            calls.append(kwargs)
+            return real_search_files(directory, *args, **kwargs)
+
+        with redirect_stdout(io.StringIO()) as stdout:
+            with mock.patch.object(multi_scan, 'search_files', search_files):
+                status = file_searcher.main(self.roots + ['-o', output, '-q', '--resume', '--retries', '0',
+                                                          '--checkpoint-interval', '0'])
+        self.assertEqual(status, 0)
+        self.assertEqual(len(calls), 3)
+        for kwargs in calls:
+            self.assertEqual((kwargs['resume'], kwargs['retries'], kwargs['checkpoint_interval']), (True, 0, None))
+        self.assertNotIn('Merged view', stdout.getvalue())
+        self.assertEqual(list(iter_paths(output)), list(iter_file_paths(self.music)))
+
+        with redirect_stdout(io.StringIO()):
+            with mock.patch.object(multi_scan, 'search_files', lambda *args, **kwargs: None):
+                self.assertEqual(file_searcher.main(self.roots + ['-o', output]), 1)
+
+    def test_partition_names_and_devices(self):
+        """Test that partition names are file-safe and unique, and roots on one device share a group"""
+        self.assertEqual(partition_name('D:\\Music'), 'D_Music')
+        self.assertEqual(partition_name('/mnt/a b', {'mnt_a_b'}), 'mnt_a_b_2')
+        groups, errors = group_by_device(self.roots)
+        self.assertEqual(list(groups.values()), [sorted(self.roots)])
+        self.assertEqual(errors, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from path_filter import ExtensionFilter, DEFAULT_EXCLUDED_EXTENSIONS, load_filter_config
+from file_searcher import search_files
+from path_stream import iter_paths
+
+
+class TestExtensionFilter(unittest.TestCase):
+
+    def test_matches_old_endswith_rule(self):
+        """Test that the default filter agrees with the original any(endswith) check"""
+        path_filter = ExtensionFilter(DEFAULT_EXCLUDED_EXTENSIONS)
+        names = ['D:\\Music\\cover.JPG', 'd:\\a\\01.flac', 'd:\\a\\list.m3u8', 'd:\\a\\list.m3u',
+                 'd:\\a.log\\01.flac', 'd:\\a\\.txt', 'd:\\a\\notxt', 'd:/a/disc.iso;1', 'rip.accurip']
+        for name in names:
+            expected = not any(name.lower().endswith(ext) for ext in DEFAULT_EXCLUDED_EXTENSIONS)
+            self.assertEqual(path_filter.accepts(name), expected, name)
+
+    def test_include_and_multi_dot(self):
+        """Test include lists, extensions without a dot and multi-part extensions"""
+        path_filter = ExtensionFilter(exclude=['tar.gz'], include=['.flac', 'DSF', '.gz'])
+        self.assertTrue(path_filter('d:\\a\\01.FLAC'))
+        self.assertTrue(path_filter('d:\\a\\02.dsf'))
+        self.assertTrue(path_filter('d:\\a\\scans.gz'))
+        self.assertFalse(path_filter('d:\\a\\scans.tar.gz'))
+        self.assertFalse(path_filter('d:\\a\\cover.jpg'))
+        self.assertFalse(path_filter('d:\\a.flac\\readme'))
+
+    def test_config_file(self):
+        """Test reading extension lists from a JSON config file"""
+        test_dir = tempfile.mkdtemp()
+        try:
+            config = os.path.join(test_dir, 'filter.json')
+            with open(config, 'w', encoding='utf-8') as f:
+                json.dump({'exclude': ['.cue'], 'include': ['.flac']}, f)
+            self.assertEqual(load_filter_config(config), (['.cue'], ['.flac']))
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_applied_during_scan(self):
+        """Test that search_files never writes filtered files"""
+        test_dir = tempfile.mkdtemp()
+        try:
+            music = os.path.join(test_dir, 'music')
+            os.makedirs(os.path.join(music, 'album'))
+            for name in ['01.flac', 'cover.jpg', 'rip.LOG']:
+                open(os.path.join(music, 'album', name), 'w').close()
+            output = os.path.join(test_dir, 'out.txt')
+            with redirect_stdout(io.StringIO()):
+                search_files(music, output, quiet=True, path_filter=ExtensionFilter(['.jpg', '.log']))
+            self.assertEqual([os.path.basename(p) for p in iter_paths(output)], ['01.flac'])
+        finally:
+            shutil.rmtree(test_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
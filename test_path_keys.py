@@ -0,0 +1,38 @@
+import unittest
+import unicodedata
+from path_keys import path_key, keyed_paths, split_iso_track, unquote_path
+
+
+class TestPathKeys(unittest.TestCase):
+    
+    def test_windows_paths_on_any_platform(self):
+        """Test that separators, drive letter case and dot segments are normalized"""
+        self.assertEqual(path_key('D:/Music//ABBA/./Arrival/../Arrival/01.flac'),
+                         'd:\\music\\abba\\arrival\\01.flac')
+        self.assertEqual(path_key('\\\\?\\D:\\Music\\01.flac'), 'd:\\music\\01.flac')
+    
+    def test_unicode_forms_and_case(self):
+        """Test that NFC/NFD spellings and case differences give the same key"""
+        composed = 'd:\\Music\\Beyoncé\\Déjà Vu.flac'
+        decomposed = unicodedata.normalize('NFD', composed.upper())
+        self.assertEqual(path_key(composed), path_key(decomposed))
+        self.assertEqual(path_key('D:\\Кино\\Звезда.flac'), 'd:\\кино\\звезда.flac')
+    
+    def test_keyed_paths(self):
+        """Test that the original path travels with its key"""
+        self.assertEqual(list(keyed_paths(['D:\\A.flac'])), [('d:\\a.flac', 'D:\\A.flac')])
+    
+    def test_split_iso_track(self):
+        """Test that only a purely numeric suffix is treated as a track number"""
+        self.assertEqual(split_iso_track('d:\\sacd\\disc.iso;12'), ('d:\\sacd\\disc.iso', 12))
+        self.assertEqual(split_iso_track('d:\\a;b;3'), ('d:\\a;b', 3))
+        self.assertEqual(split_iso_track('d:\\a;b.flac'), ('d:\\a;b.flac', None))
+        self.assertEqual(split_iso_track('d:\\a.flac'), ('d:\\a.flac', None))
+    
+    def test_unquote_path(self):
+        """Test that CSV quoting and doubled backslashes are removed"""
+        self.assertEqual(unquote_path('"D:\\\\Music\\\\a.flac"\n'), 'D:\\Music\\a.flac')
+
+
+if __name__ == '__main__':
+    unittest.main()
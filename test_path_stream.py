@@ -0,0 +1,117 @@
+import unittest
+import os
+import io
+import json
+import tempfile
+import shutil
+import json_backend
+from path_stream import PathWriter, write_paths, iter_paths, detect_format, _iter_json_array, _iter_json_values
+
+
+PATHS = [
+    'd:\\music\\ABBA\\1976 - Arrival\\01 - When I Kissed the Teacher.flac',
+    'd:\\music\\Кино\\1988 - Группа крови\\01 - "Группа крови".flac',
+    'd:\\music\\sacd\\disc.iso;3',
+]
+
+
+class TestPathStream(unittest.TestCase):
+    
+    def setUp(self):
+        """Create a temporary directory for output files"""
+        self.test_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+    
+    def test_detect_format(self):
+        """Test that the format is chosen from the file extension"""
+        self.assertEqual(detect_format('lib.json'), 'json')
+        self.assertEqual(detect_format('lib.NDJSON'), 'ndjson')
+        self.assertEqual(detect_format('lib.jsonl'), 'ndjson')
+        self.assertEqual(detect_format('file_paths.csv'), 'csv')
+        self.assertEqual(detect_format('only_in_lib.txt'), 'text')
+        self.assertEqual(detect_format('file_paths.FLS'), 'snapshot')
+    
+    def test_round_trip(self):
+        """Test that every format reads back exactly what was written"""
+        for name in ['paths.json', 'paths.ndjson', 'paths.csv', 'paths.txt', 'paths.fls']:
+            filename = os.path.join(self.test_dir, name)
+            self.assertEqual(write_paths(PATHS, filename), len(PATHS))
+            self.assertEqual(list(iter_paths(filename)), PATHS, name)
+    
+    def test_json_output_is_valid_json(self):
+        """Test that streamed JSON output is a plain, unindented JSON array"""
+        filename = os.path.join(self.test_dir, 'paths.json')
+        write_paths(PATHS, filename)
+        
+        with open(filename, 'r', encoding='utf-8') as f:
+            text = f.read()
+        self.assertEqual(json.loads(text), PATHS)
+        self.assertNotIn('  ', text)
+    
+    def test_empty_json(self):
+        """Test that an empty list round-trips"""
+        filename = os.path.join(self.test_dir, 'empty.json')
+        with PathWriter(filename):
+            pass
+        self.assertEqual(list(iter_paths(filename)), [])
+    
+    def test_reads_indented_and_single_line_json(self):
+        """Test that the incremental reader handles json.dump output in any layout"""
+        for indent in [None, 2]:
+            text = json.dumps(PATHS * 50, ensure_ascii=False, indent=indent)
+            # A tiny chunk size forces values to be split across reads
+            self.assertEqual(list(_iter_json_array(io.StringIO(text), chunk_size=7)), PATHS * 50)
+    
+    def test_line_reader_falls_back(self):
+        """Test that arrays not laid out one value per line are read by the chunked decoder, even midway"""
+        layouts = [
+            json.dumps(PATHS),
+            '[\n' + ',\n'.join(json.dumps(path) for path in PATHS) + ',\n"a", "b"\n]',
+            '[\n"x",\n  {\n    "a": [1, 2]\n  }\n]',
+        ]
+        for text in layouts:
+            self.assertEqual(list(_iter_json_values(io.StringIO(text))), json.loads(text))
+
+    def test_every_backend_round_trips(self):
+        """Test that each installed JSON backend writes and reads the same lists"""
+        try:
+            for name in json_backend.available():
+                json_backend.use(name)
+                for extension in ['json', 'ndjson']:
+                    filename = os.path.join(self.test_dir, f'{name}.{extension}')
+                    write_paths(PATHS, filename)
+                    self.assertEqual(list(iter_paths(filename)), PATHS, filename)
+                self.assertEqual(json_backend.loads(json_backend.dumps({'a': [1, 'b']})), {'a': [1, 'b']})
+                with self.assertRaises(ValueError):
+                    json_backend.loads('"a", "b"')
+        finally:
+            json_backend.use()
+
+    def test_undecodable_names_round_trip(self):
+        """Test that names that aren't valid UTF-8 survive every backend, in path lists and sort runs"""
+        from external_sort import external_sort
+        names = [os.fsdecode(b'\xff.flac'), 'Кино.flac', os.fsdecode(b'caf\xe9.flac')]
+        try:
+            for name in json_backend.available():
+                json_backend.use(name)
+                for extension in ['json', 'ndjson']:
+                    filename = os.path.join(self.test_dir, f'{name}.{extension}')
+                    write_paths(names, filename)
+                    self.assertEqual(list(iter_paths(filename)), names, filename)
+                # A tiny memory limit spills every item to its own run
+                self.assertEqual(list(external_sort(names * 3, memory_limit=1, tmp_dir=self.test_dir)),
+                                 sorted(names * 3), name)
+        finally:
+            json_backend.use()
+
+    def test_rejects_non_array(self):
+        """Test that a JSON object is reported instead of silently misread"""
+        with self.assertRaises(ValueError):
+            list(_iter_json_array(io.StringIO('{"a": 1}')))
+
+
+if __name__ == '__main__':
+    unittest.main()
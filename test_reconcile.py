@@ -0,0 +1,51 @@
+import unittest
+import os
+import io
+import tempfile
+import shutil
+from pathlib import Path
+from contextlib import redirect_stdout
+from xml.sax.saxutils import escape
+from reconcile import reconcile
+from path_stream import iter_paths
+
+
+class TestReconcile(unittest.TestCase):
+    
+    def setUp(self):
+        """Create a music folder and a lib.xml that disagree on a few files"""
+        self.test_dir = tempfile.mkdtemp()
+        self.music = os.path.join(self.test_dir, 'Music')
+        self.output_dir = os.path.join(self.test_dir, 'out')
+        
+        for name in ['Album/01.flac', 'Album/02.flac', 'Album/cover.jpg', 'SACD/disc.iso', 'New/01.flac']:
+            os.makedirs(os.path.dirname(os.path.join(self.music, name)), exist_ok=True)
+            Path(os.path.join(self.music, name)).touch()
+        
+        library = ['Album/01.flac', 'Album/02.flac', 'SACD/disc.iso;1', 'SACD/disc.iso;2', 'Gone/01.flac']
+        self.xml_file = os.path.join(self.test_dir, 'lib.xml')
+        with open(self.xml_file, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<MPL Version="2.0">\n')
+            for name in library:
+                f.write(f'<Item><Field Name="Filename">{escape(os.path.join(self.music, name))}</Field></Item>\n')
+            f.write('</MPL>\n')
+    
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+    
+    def test_pipeline(self):
+        """Test that extract, collapse, filter and compare run end to end without intermediate files"""
+        with redirect_stdout(io.StringIO()):
+            counts = reconcile(self.xml_file, self.music, self.output_dir, workers=2)
+        
+        self.assertEqual(counts, [3, 1, 1])
+        self.assertEqual(list(iter_paths(os.path.join(self.output_dir, 'only_in_lib.txt'))),
+                         [os.path.join(self.music, 'Gone', '01.flac')])
+        self.assertEqual(list(iter_paths(os.path.join(self.output_dir, 'only_in_file_paths.txt'))),
+                         [os.path.join(self.music, 'New', '01.flac')])
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ['only_in_file_paths.txt', 'only_in_lib.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
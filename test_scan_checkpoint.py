@@ -0,0 +1,133 @@
+import io
+import os
+import errno
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from contextlib import redirect_stdout
+
+import file_searcher
+from file_searcher import search_files, scan_directory, list_directory, retrying, ListingFailed
+from scan_checkpoint import resume_lister, CHECKPOINT_SUFFIX
+from path_stream import iter_paths
+
+
+class TestResume(unittest.TestCase):
+
+    def setUp(self):
+        """Create a tree where a sibling ('a b') sorts between a folder ('a') and its subfolders"""
+        self.test_dir = tempfile.mkdtemp()
+        self.music = os.path.realpath(os.path.join(self.test_dir, 'music'))
+        for folder in ['a', 'a/x', 'a/x/deep', 'a b', 'a b/y', 'b', 'c/z']:
+            os.makedirs(os.path.join(self.music, folder))
+            Path(self.music, folder, '01.flac').touch()
+            Path(self.music, folder, '02.flac').touch()
+        self.expected = [os.path.join(d, name) for d, files in scan_directory(self.music) for name in files]
+
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+
+    def test_resume_after_every_directory(self):
+        """Test that resuming after any completed directory yields exactly the rest of the scan"""
+        directories = [d for d, _ in scan_directory(self.music)]
+        for i, last_dir in enumerate(directories):
+            resumed = [d for d, _ in scan_directory(self.music, lister=resume_lister(list_directory, last_dir))]
+            self.assertEqual(resumed, directories[i + 1:], last_dir)
+
+    def test_interrupted_scan_resumes(self):
+        """Test that a scan stopped by a failing directory resumes to the same output in every text format"""
+        failing = os.path.join(self.music, 'a b', 'y')
+
+        def flaky(directory):
+            if directory == failing:
+                raise OSError(errno.EIO, 'Input/output error')
+            return list_directory(directory)
+
+        for name in ['paths.json', 'paths.ndjson', 'paths.csv', 'paths.txt']:
+            output = os.path.join(self.test_dir, name)
+            with redirect_stdout(io.StringIO()):
+                with mock.patch.object(file_searcher, 'list_directory', flaky):
+                    self.assertIsNone(search_files(self.music, output, quiet=True, checkpoint_interval=0, retries=0))
+                self.assertTrue(os.path.exists(output + CHECKPOINT_SUFFIX))
+                self.assertEqual(list(iter_paths(output)), self.expected[:4])
+
+                count = search_files(self.music, output, quiet=True, resume=True)
+            self.assertEqual(count, len(self.expected))
+            self.assertEqual(list(iter_paths(output)), self.expected, name)
+            self.assertFalse(os.path.exists(output + CHECKPOINT_SUFFIX))
+
+    def test_checkpoint_of_another_scan_is_ignored(self):
+        """Test that --resume starts over when the checkpoint was saved for a different root"""
+        output = os.path.join(self.test_dir, 'paths.json')
+        failing = os.path.join(self.music, 'a', 'x')
+
+        def flaky(directory):
+            if directory == failing:
+                raise OSError(errno.EIO, 'Input/output error')
+            return list_directory(directory)
+
+        with redirect_stdout(io.StringIO()) as stdout:
+            with mock.patch.object(file_searcher, 'list_directory', flaky):
+                search_files(os.path.join(self.music, 'a'), output, quiet=True, checkpoint_interval=0, retries=0)
+            self.assertTrue(os.path.exists(output + CHECKPOINT_SUFFIX))
+            search_files(self.music, output, quiet=True, resume=True)
+        self.assertIn('starting from the beginning', stdout.getvalue())
+        self.assertEqual(list(iter_paths(output)), self.expected)
+
+
+class TestRetries(unittest.TestCase):
+
+    def test_transient_errors_are_retried(self):
+        """Test that a listing failing twice succeeds on the third attempt, and a permanent error is not retried"""
+        attempts = []
+
+        def lister(directory):
+            attempts.append(directory)
+            if directory == 'denied':
+                raise PermissionError(errno.EACCES, 'Permission denied')
+            if len(attempts) < 3:
+                raise OSError(errno.ETIMEDOUT, 'Connection timed out')
+            return ['01.flac'], []
+
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(retrying(lister, retries=2, delay=0)('share'), (['01.flac'], []))
+            self.assertEqual(len(attempts), 3)
+            with self.assertRaises(PermissionError):
+                retrying(lister, retries=2, delay=0)('denied')
+            self.assertEqual(len(attempts), 4)
+            attempts.clear()
+            with self.assertRaises(ListingFailed):
+                retrying(lister, retries=1, delay=0)('share')
+
+    def test_index_stat_is_retried(self):
+        """Test that a transient error statting a directory for the index is retried, not skipped"""
+        test_dir = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, test_dir)
+        music = os.path.join(test_dir, 'm')
+        for folder in ['a', 'b']:
+            os.makedirs(os.path.join(music, folder))
+            Path(music, folder, '01.flac').touch()
+        output = os.path.join(test_dir, 'paths.json')
+        index_file = os.path.join(test_dir, 'index.sqlite')
+        flaky = os.path.join(music, 'b')
+        real_stat = os.stat
+        failures = []
+
+        def stat(path, *args, **kwargs):
+            if path == flaky and not failures:
+                failures.append(path)
+                raise OSError(errno.EIO, 'Input/output error')
+            return real_stat(path, *args, **kwargs)
+
+        with redirect_stdout(io.StringIO()):
+            with mock.patch('os.stat', stat), mock.patch('time.sleep'):
+                self.assertEqual(search_files(music, output, quiet=True, index_file=index_file), 2)
+        self.assertEqual(failures, [flaky])
+        self.assertEqual(list(iter_paths(output)), [os.path.join(music, 'a', '01.flac'), os.path.join(flaky, '01.flac')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from snapshot import SnapshotWriter, Snapshot
+from path_stream import write_paths, iter_paths
+from file_searcher import search_files
+
+
+PATHS = [
+    'd:\\music\\ABBA\\1976 - Arrival\\01 - When I Kissed the Teacher.flac',
+    'd:\\music\\ABBA\\1976 - Arrival\\02 - Dancing Queen.flac',
+    'd:\\music\\Кино\\1988 - Группа крови\\01 - "Группа крови".flac',
+    'd:\\music\\ABBA\\1976 - Arrival\\03 - My Love, My Life.flac',
+    '/mnt/music/sacd/disc.iso;3',
+    'no directory.flac',
+]
+
+
+class TestSnapshot(unittest.TestCase):
+    
+    def setUp(self):
+        """Create a temporary directory for snapshot files"""
+        self.test_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.test_dir)
+    
+    def test_directory_table_and_random_access(self):
+        """Test that directories are stored once and entries can be read by index"""
+        filename = os.path.join(self.test_dir, 'paths.fls')
+        write_paths(PATHS, filename)
+        
+        with Snapshot(filename) as snapshot:
+            self.assertEqual(len(snapshot), len(PATHS))
+            self.assertEqual(list(snapshot), PATHS)
+            self.assertEqual(snapshot[2], PATHS[2])
+            self.assertEqual(snapshot[-1], PATHS[-1])
+            self.assertEqual(len(snapshot.directories()), 4)
+            self.assertIsNone(snapshot.sizes)
+    
+    def test_stats_columns(self):
+        """Test that sizes and mtimes round-trip, with None for unknown entries"""
+        filename = os.path.join(self.test_dir, 'stats.fls')
+        with SnapshotWriter(filename, stats=True) as writer:
+            writer.write('d:\\a\\01.flac', 1234, 1700000000123456789)
+            writer.write('d:\\a\\02.flac')
+        
+        with Snapshot(filename) as snapshot:
+            self.assertEqual(list(snapshot.entries()), [('d:\\a\\01.flac', 1234, 1700000000123456789),
+                                                        ('d:\\a\\02.flac', None, None)])
+    
+    def test_empty_and_invalid(self):
+        """Test an empty snapshot and a file that is not a snapshot"""
+        filename = os.path.join(self.test_dir, 'empty.fls')
+        write_paths([], filename)
+        self.assertEqual(list(iter_paths(filename)), [])
+        
+        bogus = os.path.join(self.test_dir, 'bogus.fls')
+        with open(bogus, 'w') as f:
+            f.write('[]')
+        with self.assertRaises(ValueError):
+            Snapshot(bogus)
+    
+    def test_search_files_with_stats(self):
+        """Test that search_files can write a snapshot with file sizes"""
+        music = os.path.join(self.test_dir, 'music')
+        os.makedirs(os.path.join(music, 'album'))
+        with open(os.path.join(music, 'album', '01.flac'), 'wb') as f:
+            f.write(b'x' * 10)
+        output = os.path.join(self.test_dir, 'file_paths.fls')
+        with redirect_stdout(io.StringIO()):
+            search_files(music, output, quiet=True, stats=True)
+        
+        with Snapshot(output) as snapshot:
+            [(path, size, mtime_ns)] = snapshot.entries()
+        self.assertEqual(path, os.path.join(os.path.realpath(music), 'album', '01.flac'))
+        self.assertEqual(size, 10)
+        self.assertEqual(mtime_ns, os.stat(path).st_mtime_ns)
+
+
+if __name__ == '__main__':
+    unittest.main()